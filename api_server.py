@@ -0,0 +1,369 @@
+# Asyncio HTTP/JSON front-end for RentalService.
+# Every SQLite and bcrypt call runs in a thread pool (each worker thread owns one RentalService
+# with its own pooled connection), so the event loop only parses requests and writes responses.
+#   python api_server.py --host 127.0.0.1 --port 8080
+import argparse # For command line options
+import asyncio # Event loop, streams and timeouts
+import json # Request and response bodies
+import os # For environment variable handling
+import re # Route matching
+import signal # Graceful shutdown on SIGINT/SIGTERM
+import threading # Per-thread RentalService instances
+from concurrent.futures import ThreadPoolExecutor # Runs blocking service calls off the loop
+from datetime import date # Bookings can't start in the past
+from urllib.parse import urlsplit, parse_qs # Query string parsing
+
+from db_connection import initialize_database, ConnectionPool
+from services.rental_service import RentalService, CAR_LIST_COLUMNS, BOOKING_LIST_COLUMNS, PAGE_SIZE
+from services.availability import to_date
+from services.auth_service import get_auth_service
+from services.email_service import OutboxWorker
+from services import metrics
+
+REQUEST_TIMEOUT = 10.0 # Seconds allowed for reading a request and producing its response
+MAX_BODY = 1024 * 1024 # Largest accepted request body in bytes
+SHUTDOWN_GRACE = 10.0 # Seconds in-flight requests get to finish on shutdown
+
+CAR_FIELDS = [name.strip() for name in CAR_LIST_COLUMNS.split(",")]
+BOOKING_FIELDS = [name.strip() for name in BOOKING_LIST_COLUMNS.split(",")]
+STATUS_TEXT = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+               404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+               500: "Internal Server Error", 503: "Service Unavailable", 504: "Gateway Timeout"}
+
+class ApiError(Exception):
+    # Raised by handlers to return an error status with a JSON message
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class RentalApi:
+    """JSON endpoints over RentalService, served with asyncio streams."""
+
+    def __init__(self, pool=None, workers=16, request_timeout=REQUEST_TIMEOUT):
+        self.pool = pool or ConnectionPool(max_size=workers + 1) # One connection per worker thread, plus the email sender
+        self.request_timeout = request_timeout
+        self.outbox_worker = None # Sends the emails that bookings and approvals queue, while the server runs
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rental-api")
+        self._local = threading.local()
+        self._services = [] # Every per-thread service, closed on shutdown
+        self._services_lock = threading.Lock()
+        self._inflight = set()
+        self._server = None
+        self._routes = [
+            ("POST", re.compile(r"^/login$"), self.login),
+            ("GET", re.compile(r"^/cars$"), self.list_cars),
+            ("GET", re.compile(r"^/cars/search$"), self.search_cars),
+            ("GET", re.compile(r"^/cars/autocomplete$"), self.autocomplete_cars),
+            ("GET", re.compile(r"^/bookings$"), self.list_bookings),
+            ("POST", re.compile(r"^/bookings$"), self.create_booking),
+            ("POST", re.compile(r"^/bookings/(\d+)/(approve|reject)$"), self.manage_booking),
+            ("GET", re.compile(r"^/bookings/(\d+)/bill$"), self.bill),
+            ("GET", re.compile(r"^/health$"), self.health),
+            ("GET", re.compile(r"^/metrics$"), self.metrics),
+        ]
+
+    # --- plumbing -----------------------------------------------------------------
+
+    def _service(self):
+        # RentalService owned by the calling executor thread
+        service = getattr(self._local, "service", None)
+        if service is None:
+            service = RentalService(self.pool)
+            service.outbox_worker = self.outbox_worker
+            self._local.service = service
+            with self._services_lock:
+                self._services.append(service)
+        return service
+
+    def _call(self, method_name, *args, **kwargs):
+        # Runs inside an executor thread
+        return getattr(self._service(), method_name)(*args, **kwargs)
+
+    async def run(self, method_name, *args, **kwargs):
+        # Await a RentalService method without blocking the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: self._call(method_name, *args, **kwargs))
+
+    async def start(self, host="127.0.0.1", port=8080):
+        self.outbox_worker = OutboxWorker(self.pool, dry_run=os.getenv("EMAIL_DRY_RUN", "False").lower() == "true")
+        self.outbox_worker.start()
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    async def shutdown(self, grace=SHUTDOWN_GRACE):
+        # Stop accepting, let in-flight requests finish, then release every pooled connection
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._inflight:
+            await asyncio.wait(self._inflight, timeout=grace)
+        self._executor.shutdown(wait=True)
+        if self.outbox_worker is not None:
+            self.outbox_worker.stop() # Flush emails that are already due
+        with self._services_lock:
+            for service in self._services:
+                service.close()
+            self._services.clear()
+
+    async def _handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self._inflight.add(task)
+        try:
+            try:
+                status, payload = await asyncio.wait_for(self._handle_request(reader), self.request_timeout)
+            except asyncio.TimeoutError:
+                status, payload = 504, {"error": "Request timed out."}
+            if isinstance(payload, str): # Plain-text endpoints such as /metrics
+                body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+            else:
+                body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+            writer.write((f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'OK')}\r\n"
+                          f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                          "Connection: close\r\n\r\n").encode("latin-1") + body)
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._inflight.discard(task)
+            writer.close()
+
+    async def _handle_request(self, reader):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            method, target, _ = request_line.split(" ", 2)
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1")
+                if line in ("\r\n", "\n", ""):
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            return 400, {"error": "Malformed HTTP request."}
+        if length > MAX_BODY:
+            return 413, {"error": "Request body too large."}
+        body = None
+        if length:
+            try:
+                body = json.loads(await reader.readexactly(length))
+            except ValueError:
+                return 400, {"error": "Request body must be JSON."}
+            if not isinstance(body, dict):
+                return 400, {"error": "Request body must be a JSON object."}
+
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        for route_method, pattern, handler in self._routes:
+            match = pattern.match(url.path)
+            if match:
+                if route_method != method:
+                    continue
+                try:
+                    request = {"headers": headers, "query": query, "body": body or {}}
+                    return await handler(*match.groups(), request=request)
+                except ApiError as e:
+                    return e.status, {"error": e.message}
+                except Exception as e:
+                    print(f"❌ API error on {method} {url.path}: {e!r}") # Details stay in the server log
+                    return 500, {"error": "Internal server error."}
+        if any(pattern.match(url.path) for _, pattern, _ in self._routes):
+            return 405, {"error": "Method not allowed."}
+        return 404, {"error": "Not found."}
+
+    async def _session(self, request, role=None):
+        # (username, role) from the bearer token; checking a signed token needs no bcrypt work
+        auth = request["headers"].get("authorization", "")
+        if not auth.lower().startswith("bearer "):
+            raise ApiError(401, "Missing bearer token.")
+        session = await self.run("validate_session", auth[7:].strip())
+        if not session:
+            raise ApiError(401, "Invalid or expired token.")
+        if role and session[1] != role:
+            raise ApiError(403, f"Only {role} users can do this.")
+        return session
+
+    @staticmethod
+    def _int(value, name, default=None):
+        if value is None:
+            if default is None:
+                raise ApiError(400, f"'{name}' is required.")
+            return default
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ApiError(400, f"'{name}' must be an integer.")
+
+    @classmethod
+    def _limit(cls, query, maximum):
+        # Page size from ?limit=, capped at maximum; LIMIT 0 or below would return nothing or everything
+        limit = cls._int(query.get("limit"), "limit", PAGE_SIZE)
+        if limit < 1:
+            raise ApiError(400, "'limit' must be at least 1.")
+        return min(limit, maximum)
+
+    @staticmethod
+    def _float(value, name):
+        # Optional number; None when absent
+        if value is None or value == "":
+            return None
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise ApiError(400, f"'{name}' must be a number.")
+
+    @staticmethod
+    def _date(value, name):
+        # Optional YYYY-MM-DD date; None when absent
+        if not value:
+            return None
+        try:
+            return to_date(value)
+        except (TypeError, ValueError):
+            raise ApiError(400, f"'{name}' must be YYYY-MM-DD.")
+
+    # --- endpoints ----------------------------------------------------------------
+
+    async def health(self, request):
+        return 200, {"status": "ok", "pool": self.pool.pool_stats()}
+
+    async def metrics(self, request):
+        # Prometheus text by default; ?format=json returns the snapshot with the slow-query log
+        if request["query"].get("format") == "json":
+            return 200, metrics.snapshot()
+        return 200, metrics.prometheus_text()
+
+    async def login(self, request):
+        body = request["body"]
+        username, password = body.get("username"), body.get("password")
+        if not username or not password:
+            raise ApiError(400, "'username' and 'password' are required.")
+        token = await self.run("create_session", username, password)
+        if not token:
+            raise ApiError(401, "Invalid username or password.")
+        _, role = await self.run("validate_session", token)
+        return 200, {"token": token, "role": role}
+
+    async def list_cars(self, request):
+        await self._session(request)
+        query = request["query"]
+        after_id = self._int(query.get("after_id"), "after_id", 0)
+        limit = self._limit(query, 500)
+        start_date, end_date = self._date(query.get("start_date"), "start_date"), self._date(query.get("end_date"), "end_date")
+        max_rate = self._float(query.get("max_rate"), "max_rate")
+        if start_date and end_date:
+            if end_date <= start_date:
+                raise ApiError(400, "'end_date' must be after 'start_date'.")
+            cars = await self.run("list_available_cars_page", start_date, end_date, after_id, limit,
+                                  make=query.get("make"), max_rate=max_rate)
+        else:
+            cars = await self.run("list_cars_page", after_id, limit, make=query.get("make"), max_rate=max_rate)
+        return 200, {"cars": [dict(zip(CAR_FIELDS, car)) for car in cars],
+                     "next_after_id": cars[-1][0] if len(cars) == limit else None}
+
+    async def search_cars(self, request):
+        await self._session(request)
+        query = request["query"]
+        limit = self._limit(query, 100)
+        cars = await self.run("search_cars", query.get("q", ""), limit)
+        return 200, {"cars": [dict(zip(CAR_FIELDS, car)) for car in cars]}
+
+    async def autocomplete_cars(self, request):
+        await self._session(request)
+        return 200, {"suggestions": await self.run("autocomplete_cars", request["query"].get("q", ""))}
+
+    async def list_bookings(self, request):
+        username, role = await self._session(request)
+        query = request["query"]
+        after_id = self._int(query.get("after_id"), "after_id", 0)
+        limit = self._limit(query, 500)
+        customer = query.get("customer") if role == "admin" else username # Customers only see their own
+        bookings = await self.run("list_bookings_page", after_id, limit, customer_name=customer, status=query.get("status"))
+        return 200, {"bookings": [dict(zip(BOOKING_FIELDS, b)) for b in bookings],
+                     "next_after_id": bookings[-1][0] if len(bookings) == limit else None}
+
+    async def create_booking(self, request):
+        username, _ = await self._session(request)
+        body = request["body"]
+        car_id = self._int(body.get("car_id"), "car_id")
+        days = self._int(body.get("days"), "days")
+        start_date = self._date(body.get("start_date"), "start_date")
+        if start_date and start_date < date.today():
+            raise ApiError(400, "'start_date' can't be in the past.")
+        booking_id = await self.run("book_car", username, car_id, days, start_date)
+        if not booking_id:
+            raise ApiError(409, "Booking not possible: car unavailable, dates taken or days out of range.")
+        return 201, {"booking_id": booking_id, "status": "pending"}
+
+    async def manage_booking(self, booking_id, action, request):
+        await self._session(request, role="admin")
+        status = "approved" if action == "approve" else "rejected"
+        ok = await self.run("manage_booking", int(booking_id), approve=(action == "approve"))
+        if not ok:
+            raise ApiError(409, f"Booking {booking_id} could not be {status}.")
+        return 200, {"booking_id": int(booking_id), "status": status}
+
+    async def bill(self, booking_id, request):
+        username, role = await self._session(request)
+        booking = await self.run("get_booking", int(booking_id))
+        if not booking or (role != "admin" and booking[1] != username):
+            raise ApiError(404, "Booking not found.")
+        bill = await self.run("generate_bill", int(booking_id))
+        if not bill:
+            raise ApiError(409, "Bills can only be generated for approved bookings.")
+        return 200, {"booking_id": int(booking_id), "bill": bill}
+
+async def fetch(port, method, path, body=None, token=None, host="127.0.0.1"):
+    """Minimal in-process HTTP client for exercising the API locally; returns (status, json or text)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    headers = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(data)}\r\n"
+    if token:
+        headers += f"Authorization: Bearer {token}\r\n"
+    writer.write((headers + "\r\n").encode("latin-1") + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    if b"content-type: application/json" in head.lower():
+        return status, json.loads(payload)
+    return status, payload.decode("utf-8")
+
+async def serve(host, port, workers):
+    api = RentalApi(workers=workers)
+    await api.start(host, port)
+    print(f"🌐 Car rental API listening on http://{host}:{api.port}")
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError): # Windows event loops lack signal handlers
+            pass
+    try:
+        await stop.wait()
+    finally:
+        print("🛑 Shutting down, waiting for in-flight requests...")
+        await api.shutdown()
+        get_auth_service().shutdown() # Stop the bcrypt worker processes
+
+def main():
+    parser = argparse.ArgumentParser(description="Car rental HTTP/JSON API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=16, help="Threads running database and bcrypt calls")
+    args = parser.parse_args()
+    initialize_database()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# Stress test: many concurrent admins approving competing bookings for the same cars.
+# Checks that exactly one booking per car and date window wins, and reports throughput,
+# conflicts and busy retries. Run from the repository root:
+#   python -m benchmarks.bench_approvals --threads 16 --cars 200 --competing 5
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("EMAIL_DRY_RUN", "true")
+
+from db_connection import initialize_database, get_connection, ConnectionPool
+from services.rental_service import RentalService
+
+def seed(db_path, cars, competing):
+    conn = get_connection(db_path)
+    with conn:
+        conn.execute("DELETE FROM cars")
+        conn.executemany("""
+            INSERT INTO cars (make, model, year, mileage, rate, min_days, max_days, available)
+            VALUES ('Bench', 'Car', 2022, 1000, 40.0, 1, 30, 1)
+        """, [()] * cars)
+        car_ids = [row[0] for row in conn.execute("SELECT id FROM cars")]
+        # Every booking of a car overlaps all the others, so only one per car may be approved
+        conn.executemany("""
+            INSERT INTO bookings (customer_name, car_id, days, total_fee, start_date, end_date)
+            VALUES ('customer', ?, 5, 200.0, ?, ?)
+        """, [(car_id, f"2030-01-0{1 + n % 3}", f"2030-01-{6 + n % 3:02d}") for car_id in car_ids for n in range(competing)])
+        booking_ids = [row[0] for row in conn.execute("SELECT id FROM bookings")]
+    conn.close()
+    return booking_ids
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--cars", type=int, default=200)
+    parser.add_argument("--competing", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, "bench.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            initialize_database(db_path)
+        booking_ids = seed(db_path, args.cars, args.competing)
+        pool = ConnectionPool(db_path, max_size=args.threads)
+        totals = {}
+        lock = threading.Lock()
+        start_gate = threading.Barrier(args.threads)
+
+        def approver(seed_value):
+            service = RentalService(pool)
+            order = booking_ids[:]
+            random.Random(seed_value).shuffle(order)
+            start_gate.wait()
+            for booking_id in order:
+                service.manage_booking(booking_id, approve=True)
+            service.close()
+            with lock:
+                for key, value in service.approval_stats.items():
+                    totals[key] = totals.get(key, 0) + value
+
+        threads = [threading.Thread(target=approver, args=(n,)) for n in range(args.threads)]
+        with contextlib.redirect_stdout(io.StringIO()): # Silence status lines from every approver at once
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+        conn = get_connection(db_path)
+        per_car = conn.execute("""
+            SELECT car_id, COUNT(*) FROM bookings WHERE status = 'approved' GROUP BY car_id
+        """).fetchall()
+        conn.close()
+        pool.close()
+
+        attempts = args.threads * len(booking_ids)
+        correct = len(per_car) == args.cars and all(count == 1 for _, count in per_car)
+        print(f"{args.threads} approvers x {len(booking_ids)} bookings: {attempts / elapsed:,.0f} attempts/s in {elapsed:.2f}s")
+        print(f"approved={totals.get('approved', 0)} conflicts={totals.get('conflicts', 0)} "
+              f"retries={totals.get('retries', 0)} busy_failures={totals.get('busy_failures', 0)}")
+        print("✅ exactly one approval per car" if correct else "❌ double approvals detected")
+        raise SystemExit(0 if correct else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# Benchmark: bulk fleet import and export throughput (rows per second) for every file format.
+# Run from the repository root: python -m benchmarks.bench_fleet_io --rows 50000
+import argparse
+import os
+import random
+import tempfile
+
+from db_connection import initialize_database, get_connection
+from services import fleet_io
+
+MAKES = [("Toyota", "Camry"), ("Honda", "Civic"), ("Ford", "Focus"), ("Kia", "Forte"), ("Mazda", "Mazda3")]
+
+def synthetic_fleet(rows):
+    rng = random.Random(42)
+    for _ in range(rows):
+        make, model = rng.choice(MAKES)
+        min_days = rng.randint(1, 3)
+        yield {"make": make, "model": model, "year": rng.randint(2012, 2024), "mileage": rng.randint(0, 150000),
+               "rate": round(rng.uniform(25, 120), 2), "min_days": min_days, "max_days": min_days + rng.randint(5, 25),
+               "available": 1}
+
+def write_source(path, fmt, rows):
+    # Build the input file with the exporter itself, from a scratch database
+    scratch = os.path.join(os.path.dirname(path), f"source_{fmt}.db")
+    initialize_database(scratch)
+    conn = get_connection(scratch)
+    with conn:
+        conn.execute("DELETE FROM cars")
+        conn.executemany("""
+            INSERT INTO cars (make, model, year, mileage, rate, min_days, max_days, available)
+            VALUES (:make, :model, :year, :mileage, :rate, :min_days, :max_days, :available)
+        """, synthetic_fleet(rows))
+    fleet_io.export_cars(conn, path, fmt)
+    conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--formats", default=",".join(fleet_io.FORMATS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for fmt in args.formats.split(","):
+            source = os.path.join(workdir, f"fleet.{fmt}")
+            write_source(source, fmt, args.rows)
+
+            target_db = os.path.join(workdir, f"target_{fmt}.db")
+            initialize_database(target_db)
+            conn = get_connection(target_db)
+            report = fleet_io.import_cars(conn, source, fmt)
+            count, seconds = fleet_io.export_cars(conn, os.path.join(workdir, f"export.{fmt}"), fmt)
+            conn.close()
+            print(f"{fmt:8s} import: {report.rows_per_second:>12,.0f} rows/s ({report.inserted} rows) | "
+                  f"export: {count / seconds if seconds else 0:>12,.0f} rows/s ({count} rows)")
+
+if __name__ == "__main__":
+    main()
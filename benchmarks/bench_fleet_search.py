@@ -0,0 +1,87 @@
+# Benchmark: multi-criteria fleet search on the NumPy snapshot vs the equivalent SQL query.
+# Run from the repository root: python -m benchmarks.bench_fleet_search --cars 100000
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("EMAIL_DRY_RUN", "true")
+
+from db_connection import initialize_database, ConnectionPool
+from services.rental_service import RentalService
+
+MAKES = [("Toyota", "Camry"), ("Honda", "Civic"), ("Ford", "Focus"), ("Nissan", "Altima"),
+         ("Hyundai", "Elantra"), ("Kia", "Forte"), ("Mazda", "Mazda3"), ("Subaru", "Impreza")]
+
+QUERIES = [
+    {"make": "toyota", "rate_max": 60},
+    {"year_min": 2020, "max_mileage": 30000, "sort": "mileage"},
+    {"rate_min": 40, "rate_max": 80, "days": 10, "sort": "year", "descending": True},
+    {"make": "honda", "model": "civic", "year_min": 2015, "year_max": 2022, "days": 3},
+]
+
+def sql_search(conn, limit=20, sort="rate", descending=False, make=None, model=None, year_min=None, year_max=None,
+               max_mileage=None, rate_min=None, rate_max=None, days=None):
+    clauses, params = ["available = 1"], []
+    for column, op, value in (("make", "= ? COLLATE NOCASE", make), ("model", "= ? COLLATE NOCASE", model),
+                              ("year", ">= ?", year_min), ("year", "<= ?", year_max), ("mileage", "<= ?", max_mileage),
+                              ("rate", ">= ?", rate_min), ("rate", "<= ?", rate_max),
+                              ("min_days", "<= ?", days), ("max_days", ">= ?", days)):
+        if value is not None:
+            clauses.append(f"{column} {op}")
+            params.append(value)
+    order = f"{sort} {'DESC' if descending else 'ASC'}, id"
+    return conn.execute(f"SELECT * FROM cars WHERE {' AND '.join(clauses)} ORDER BY {order} LIMIT ?",
+                        params + [limit]).fetchall()
+
+def timeit(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat * 1e6, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Fleet search benchmark")
+    parser.add_argument("--cars", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, "fleet_search.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            initialize_database(db_path)
+        pool = ConnectionPool(db_path, max_size=2)
+        rng = random.Random(3)
+        with pool.connection() as conn, conn:
+            conn.executemany("""
+                INSERT INTO cars (make, model, year, mileage, rate, min_days, max_days, available)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+            """, [(*rng.choice(MAKES), rng.randint(2010, 2024), rng.randint(0, 200000),
+                   round(rng.uniform(20, 150), 2), rng.randint(1, 3), rng.randint(5, 30)) for _ in range(args.cars)])
+
+        service = RentalService(pool)
+        started = time.perf_counter()
+        service.fleet.load(service.conn)
+        print(f"Snapshot of {len(service.fleet)} cars loaded in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+        print(f"\n{'query':70s}{'numpy us':>10s}{'sql us':>10s}")
+        for query in QUERIES:
+            query = dict(query)
+            sort, descending = query.pop("sort", "rate"), query.pop("descending", False)
+            fast, cars = timeit(lambda: service.fleet.search(service.conn, 20, sort, descending, **query), args.repeat)
+            slow, rows = timeit(lambda: sql_search(service.conn, 20, sort, descending, **query), max(1, args.repeat // 10))
+            assert [car.car_id for car in cars] == [row[0] for row in rows], f"Result mismatch for {query}"
+            print(f"{str(query) + ' by ' + sort:70s}{fast:10.1f}{slow:10.1f}")
+
+        car_id = rng.randint(1, args.cars)
+        refresh, _ = timeit(lambda: service.fleet.refresh_cars(service.conn, [car_id]), args.repeat)
+        print(f"\nIncremental refresh of one car: {refresh:.1f} us")
+        with contextlib.redirect_stdout(io.StringIO()):
+            service.close()
+        pool.close()
+
+if __name__ == "__main__":
+    main()
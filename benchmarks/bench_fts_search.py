@@ -0,0 +1,73 @@
+# Benchmark: FTS5 prefix search and autocomplete over the fleet vs a LIKE scan.
+# Run from the repository root: python -m benchmarks.bench_fts_search --cars 100000
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("EMAIL_DRY_RUN", "true")
+
+from db_connection import initialize_database, ConnectionPool
+from services.rental_service import RentalService
+
+MAKES = [("Toyota", ["Camry", "Corolla", "RAV4", "Prius"]), ("Honda", ["Civic", "Accord", "CR-V"]),
+         ("Ford", ["Focus", "Fusion", "Escape"]), ("Nissan", ["Altima", "Sentra", "Rogue"]),
+         ("Hyundai", ["Elantra", "Sonata", "Tucson"]), ("Kia", ["Forte", "Optima", "Sportage"]),
+         ("Mazda", ["Mazda3", "Mazda6", "CX-5"]), ("Subaru", ["Impreza", "Outback", "Forester"]),
+         ("Chevrolet", ["Malibu", "Cruze", "Equinox"]), ("Volkswagen", ["Jetta", "Passat", "Tiguan"])]
+QUERIES = ["toy cam", "honda civ", "subaru 2019", "cx", "mazda"]
+
+def timeit(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - started) / repeat * 1e6, result
+
+def like_search(conn, text, limit=20):
+    clauses, params = ["available = 1"], []
+    for token in text.split():
+        clauses.append("(make LIKE ? OR model LIKE ? OR CAST(year AS TEXT) LIKE ?)")
+        params += [token + "%"] * 3
+    return conn.execute(f"SELECT id FROM cars WHERE {' AND '.join(clauses)} LIMIT ?", params + [limit]).fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description="FTS5 fleet search benchmark")
+    parser.add_argument("--cars", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, "fts_search.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            initialize_database(db_path)
+        pool = ConnectionPool(db_path, max_size=2)
+        rng = random.Random(5)
+        fleet = []
+        for _ in range(args.cars):
+            make, models = rng.choice(MAKES)
+            fleet.append((make, rng.choice(models), rng.randint(2010, 2024), rng.randint(0, 200000),
+                          round(rng.uniform(20, 150), 2), 1, 30))
+        started = time.perf_counter()
+        with pool.connection() as conn, conn:
+            conn.executemany("""
+                INSERT INTO cars (make, model, year, mileage, rate, min_days, max_days, available)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+            """, fleet)
+        print(f"Inserted {args.cars} cars (FTS kept in sync by triggers) in {time.perf_counter() - started:.1f}s")
+
+        service = RentalService(pool)
+        print(f"\n{'query':14s}{'fts us':>10s}{'like us':>10s}{'complete us':>13s}  suggestions")
+        for text in QUERIES:
+            fts, _ = timeit(lambda: service.search_cars(text), args.repeat)
+            like, _ = timeit(lambda: like_search(service.conn, text), max(1, args.repeat // 10))
+            complete, suggestions = timeit(lambda: service.autocomplete_cars(text), args.repeat)
+            print(f"{text:14s}{fts:10.1f}{like:10.1f}{complete:13.1f}  {', '.join(suggestions[:3])}")
+        with contextlib.redirect_stdout(io.StringIO()):
+            service.close()
+        pool.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Benchmark: SQL statements and latency per booking with and without the inventory cache.
+# Run from the repository root: python -m benchmarks.bench_inventory_cache --bookings 2000
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("EMAIL_DRY_RUN", "true")
+
+from db_connection import initialize_database, ConnectionPool
+from services.rental_service import RentalService
+
+def run(pool, bookings, cache_enabled):
+    service = RentalService(pool)
+    service.inventory.enabled = cache_enabled
+    service.inventory.invalidate_all()
+    statements = 0
+    def count(_sql):
+        nonlocal statements
+        statements += 1
+    service.conn.set_trace_callback(count)
+    rng = random.Random(7)
+    car_ids = [row[0] for row in service.conn.execute("SELECT id FROM cars").fetchall()]
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()): # Service methods print status lines
+        for _ in range(bookings):
+            service.display_available_cars() # Browse, then book: the customer flow
+            service.book_car("customer", rng.choice(car_ids), 3)
+    elapsed = time.perf_counter() - started
+    service.conn.set_trace_callback(None)
+    stats = service.inventory.stats()
+    with contextlib.redirect_stdout(io.StringIO()):
+        service.close()
+    return statements / bookings, elapsed / bookings * 1e6, stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bookings", type=int, default=2000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, "bench.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            initialize_database(db_path)
+        pool = ConnectionPool(db_path)
+        for enabled in (False, True):
+            per_booking, micros, stats = run(pool, args.bookings, enabled)
+            label = "cache on " if enabled else "cache off"
+            print(f"{label}: {per_booking:5.2f} SQL statements/booking, {micros:8.1f} µs/booking | "
+                  f"hits={stats['hits']} misses={stats['misses']} evictions={stats['evictions']}")
+        pool.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Benchmark: pricing the whole fleet for one rental length, car by car vs one vectorized quote.
+# The per-car loop does what book_car does for each car (get_car, check the day range, price it);
+# the batch path is RentalService.quote_fleet over the fleet snapshot. Run from the repository root:
+#   python -m benchmarks.bench_quotes --cars 50000 --days 3 7 30
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+os.environ.setdefault("EMAIL_DRY_RUN", "true")
+os.environ.setdefault("CAR_RENTAL_METRICS", "false")
+
+from db_connection import initialize_database, ConnectionPool
+from services.rental_service import RentalService
+from services import quotes
+
+def seed(pool, cars):
+    with pool.connection() as conn, conn:
+        conn.executemany("""
+            INSERT INTO cars (make, model, year, mileage, rate, min_days, max_days, available)
+            VALUES ('Bench', 'Car', 2022, 1000, ?, ?, ?, 1)
+        """, [(30.0 + n % 50, 1 + n % 3, 10 + n % 30) for n in range(cars)])
+        return [row[0] for row in conn.execute("SELECT id FROM cars ORDER BY id")]
+
+def quote_per_car(service, car_ids, days):
+    totals = {}
+    for car_id in car_ids:
+        car = service.get_car(car_id)
+        if car and car[8] and car[6] <= days <= car[7]:
+            totals[car_id] = quotes.price(car[5], days)[2]
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-car vs vectorized fleet quotes")
+    parser.add_argument("--cars", type=int, default=50000)
+    parser.add_argument("--days", type=int, nargs="+", default=[3, 7, 30])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, "quotes.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            initialize_database(db_path)
+        pool = ConnectionPool(db_path)
+        car_ids = seed(pool, args.cars)
+        service = RentalService(pool)
+        service.quote_fleet(1) # Load the snapshot once, as a running service would have
+        print(f"{'days':>5s}{'per car':>12s}{'batch':>12s}{'speedup':>9s}{'quoted':>9s}")
+        for days in args.days:
+            started = time.perf_counter()
+            expected = quote_per_car(service, car_ids, days)
+            per_car = time.perf_counter() - started
+            started = time.perf_counter()
+            batch = service.quote_fleet(days).valid()
+            vectorized = time.perf_counter() - started
+            assert len(batch) == len(expected), "batch and per-car quotes disagree"
+            print(f"{days:5d}{per_car * 1000:10.1f}ms{vectorized * 1000:10.1f}ms{per_car / vectorized:8.0f}x{len(batch):9d}")
+        service.close()
+        pool.close()
+
+if __name__ == "__main__":
+    main()
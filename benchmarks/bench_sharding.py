@@ -0,0 +1,102 @@
+# Benchmark: booking write throughput on one database vs one database per branch.
+# Every writer owns a RentalService on its branch's shard and submits bookings as fast as it can;
+# with a single database all of them queue on one write lock. Writer threads share the GIL, so
+# --processes runs each writer in its own process, the way separate branch servers would.
+# Run from the repository root:
+#   python -m benchmarks.bench_sharding --branches 4 --writers 8 --seconds 5 --processes
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault("EMAIL_DRY_RUN", "true")
+os.environ.setdefault("CAR_RENTAL_METRICS", "false")
+
+from db_connection import ShardRouter
+from services.rental_service import RentalService
+from services.sharded_service import ShardedRentalService
+
+def book_until(service, stop):
+    # Submit bookings round-robin over the branch's cars until stop() is true; returns the count
+    car_ids = [car[0] for page in service.iter_cars() for car in page]
+    count = 0
+    while not stop():
+        service.book_car("customer", car_ids[count % len(car_ids)], 3, f"2030-01-{1 + count % 28:02d}")
+        count += 1
+    return count
+
+def process_writer(db_path, start_at, seconds):
+    # Writer process: waits for the shared start time so every process measures the same window
+    from db_connection import ConnectionPool
+    with contextlib.redirect_stdout(io.StringIO()):
+        service = RentalService(ConnectionPool(db_path, max_size=1))
+        time.sleep(max(0.0, start_at - time.time()))
+        count = book_until(service, lambda: time.time() >= start_at + seconds)
+        service.close()
+    return count
+
+def run(branches, writers, seconds, workdir, processes=False):
+    router = ShardRouter(branches, shard_dir=os.path.join(workdir, f"{len(branches)}-branch"))
+    router.initialize()
+    if processes:
+        start_at = time.time() + 2 # Time for the workers to start up and load their services
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=writers, mp_context=context) as executor:
+            futures = [executor.submit(process_writer, router.paths[branches[n % len(branches)]], start_at, seconds)
+                       for n in range(writers)]
+            total = sum(future.result() for future in futures)
+        elapsed = seconds
+    else:
+        counts = [0] * writers
+        stop = threading.Event()
+        start_gate = threading.Barrier(writers + 1)
+
+        def writer(n):
+            service = RentalService(router.pool(branches[n % len(branches)]))
+            start_gate.wait()
+            counts[n] = book_until(service, stop.is_set)
+            service.close()
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+        for thread in threads:
+            thread.start()
+        start_gate.wait()
+        started = time.perf_counter()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        total = sum(counts)
+
+    # Cross-branch read: every branch's pending bookings, fanned out and merged
+    service = ShardedRentalService(router)
+    fan_started = time.perf_counter()
+    pages = sum(1 for _ in service.iter_bookings(page_size=500, status="pending"))
+    fan_seconds = time.perf_counter() - fan_started
+    service.close()
+    return total, elapsed, pages, fan_seconds
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded write throughput benchmark")
+    parser.add_argument("--branches", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--processes", action="store_true", help="One process per writer instead of threads")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"{'branches':>8s}{'bookings':>10s}{'per sec':>10s}{'fan-out pages':>15s}{'read s':>8s}")
+        for count in sorted({1, args.branches}):
+            branches = [f"branch{i}" for i in range(count)]
+            with contextlib.redirect_stdout(io.StringIO()): # Services print per booking
+                total, elapsed, pages, fan_seconds = run(branches, args.writers, args.seconds, workdir, args.processes)
+            print(f"{count:8d}{total:10d}{total / elapsed:10.0f}{pages:15d}{fan_seconds:8.2f}")
+
+if __name__ == "__main__":
+    main()
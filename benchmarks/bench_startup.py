@@ -0,0 +1,64 @@
+# Benchmark: time from launching `python main.py` to the first menu.
+# The first launch on a fresh database does the full setup (tables, migrations, seed users); later
+# launches should only check the stored fingerprint. Exits non-zero when the median warm start is
+# over --budget-ms (tests/test_startup.py runs the same check). Run from the repository root:
+#   python -m benchmarks.bench_startup --runs 10 --budget-ms 150
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+FIRST_MENU = "=== Welcome to Car Rental System ==="
+STARTUP_BUDGET_MS = float(os.getenv("CAR_RENTAL_STARTUP_BUDGET_MS", "150")) # Median warm start allowed
+
+def launch(root, db_path):
+    # Seconds until main.py prints its first menu, plus the startup report line
+    env = dict(os.environ, CAR_RENTAL_DB=db_path, EMAIL_DRY_RUN="true", CAR_RENTAL_STARTUP_REPORT="true",
+               PYTHONDONTWRITEBYTECODE="1")
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "main.py"], cwd=root, env=env, text=True, encoding="utf-8",
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    report = ""
+    for line in process.stdout:
+        if line.startswith("⏱️"):
+            report = line.strip()
+        if FIRST_MENU in line:
+            elapsed = time.perf_counter() - started
+            break
+    else:
+        raise RuntimeError("main.py exited before showing its menu")
+    process.communicate("3\n", timeout=30) # "Exit" from the login menu
+    return elapsed, report
+
+def measure(root=".", runs=10):
+    # (cold start, cold report, warm start seconds per run, last warm report) on a throwaway database
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = os.path.join(workdir, "startup.db")
+        cold, cold_report = launch(root, db_path)
+        warm, report = [], ""
+        for _ in range(runs):
+            elapsed, report = launch(root, db_path)
+            warm.append(elapsed)
+    return cold, cold_report, warm, report
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first menu of main.py")
+    parser.add_argument("--runs", type=int, default=10, help="Warm launches after the first one")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS, help="Fail when the median warm start is slower")
+    parser.add_argument("--root", default=".", help="Repository checkout to launch (compare two trees)")
+    args = parser.parse_args()
+
+    cold, cold_report, warm, report = measure(args.root, args.runs)
+    print(f"cold start (fresh database): {cold * 1000:7.1f} ms  {cold_report}")
+    median = statistics.median(warm) * 1000
+    print(f"warm start median of {args.runs}: {median:7.1f} ms (min {min(warm) * 1000:.1f}, max {max(warm) * 1000:.1f})  {report}")
+    if median > args.budget_ms:
+        print(f"❌ Warm start {median:.1f} ms is over the {args.budget_ms:.0f} ms budget.")
+        sys.exit(1)
+    print(f"✅ Warm start within the {args.budget_ms:.0f} ms budget.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# Benchmark: per-call commits vs transaction() units of work vs group commit.
+# Scripted admin work (repricing the fleet, approving a queue of bookings) is timed with a commit per
+# call and inside one service.transaction(); concurrent booking writers are timed committing on their
+# own connections and through a GroupCommitter. Run from the repository root:
+#   python -m benchmarks.bench_transactions --cars 2000 --writers 8 --synchronous NORMAL FULL
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+
+os.environ.setdefault("EMAIL_DRY_RUN", "true")
+os.environ.setdefault("CAR_RENTAL_METRICS", "false")
+
+import db_connection
+from db_connection import initialize_database, ConnectionPool
+from services.rental_service import RentalService
+from services.group_commit import GroupCommitter
+
+def seed(pool, cars):
+    with pool.connection() as conn, conn:
+        conn.executemany("""
+            INSERT INTO cars (make, model, year, mileage, rate, min_days, max_days, available)
+            VALUES ('Bench', 'Car', 2022, 1000, 40.0, 1, 30, 1)
+        """, [()] * cars)
+        return [row[0] for row in conn.execute("SELECT id FROM cars WHERE make = 'Bench'")]
+
+def reprice(service, car_ids, grouped):
+    started = time.perf_counter()
+    with service.transaction() if grouped else contextlib.nullcontext():
+        for n, car_id in enumerate(car_ids):
+            service.update_car(car_id, 1000 + n, 40.0 + n % 7)
+    return time.perf_counter() - started
+
+def approve_queue(service, car_ids, grouped):
+    booking_ids = [service.book_car("customer", car_id, 3, "2030-03-01") for car_id in car_ids]
+    started = time.perf_counter()
+    with service.transaction() if grouped else contextlib.nullcontext():
+        for booking_id in booking_ids:
+            service.manage_booking(booking_id, approve=True)
+    return time.perf_counter() - started
+
+def concurrent_bookings(pool, car_ids, writers, per_writer, committer=None):
+    start_gate = threading.Barrier(writers + 1)
+
+    def writer(n):
+        service = None if committer else RentalService(pool)
+        start_gate.wait()
+        for i in range(per_writer):
+            args = ("customer", car_ids[(n * per_writer + i) % len(car_ids)], 3, f"2031-{1 + i % 12:02d}-01")
+            if committer:
+                committer.call("book_car", *args)
+            else:
+                service.book_car(*args)
+        if service:
+            service.close()
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for thread in threads:
+        thread.start()
+    start_gate.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+def run(workdir, synchronous, args):
+    # Every connection opened from here on uses the requested sync level
+    db_connection.PRAGMAS[:] = [pragma for pragma in db_connection.PRAGMAS if "synchronous" not in pragma]
+    db_connection.PRAGMAS.append(f"PRAGMA synchronous = {synchronous}")
+    db_path = os.path.join(workdir, f"transactions-{synchronous}.db")
+    initialize_database(db_path)
+    pool = ConnectionPool(db_path, max_size=args.writers + 2)
+    car_ids = seed(pool, args.cars)
+    service = RentalService(pool)
+    results = {
+        "reprice": (reprice(service, car_ids, False), reprice(service, car_ids, True)),
+        "approve": (approve_queue(service, car_ids[:len(car_ids) // 2], False),
+                    approve_queue(service, car_ids[len(car_ids) // 2:], True)),
+    }
+    per_writer = args.bookings // args.writers
+    plain = concurrent_bookings(pool, car_ids, args.writers, per_writer)
+    committer = GroupCommitter(pool, window_ms=args.window_ms)
+    grouped = concurrent_bookings(pool, car_ids, args.writers, per_writer, committer)
+    committer.close()
+    results["book"] = (plain, grouped)
+    service.close()
+    pool.close()
+    return results, per_writer * args.writers, committer.stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Unit-of-work and group commit benchmark")
+    parser.add_argument("--cars", type=int, default=2000)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--bookings", type=int, default=4000, help="Total bookings across concurrent writers")
+    parser.add_argument("--window-ms", type=float, default=0)
+    parser.add_argument("--synchronous", nargs="+", default=["NORMAL", "FULL"])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for synchronous in args.synchronous:
+            with contextlib.redirect_stdout(io.StringIO()): # Services print per call
+                results, bookings, stats = run(workdir, synchronous, args)
+            print(f"\nsynchronous = {synchronous}")
+            print(f"{'workload':28s}{'per call':>12s}{'grouped':>12s}{'speedup':>9s}")
+            counts = {"reprice": args.cars, "approve": args.cars // 2, "book": bookings}
+            labels = {"reprice": "reprice cars (transaction)", "approve": "approve queue (transaction)",
+                      "book": f"{args.writers} writers (group commit)"}
+            for name, (plain, grouped) in results.items():
+                print(f"{labels[name]:28s}{counts[name] / plain:10.0f}/s{counts[name] / grouped:10.0f}/s{plain / grouped:8.1f}x")
+            print(f"group commit: {stats['calls']} calls in {stats['batches']} commits")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+# Load-generation benchmark for the booking workflow.
+# Seeds a synthetic fleet, users and bookings, drives a mixed workload (browse, book, approve,
+# bill, login) from N threads or processes, and reports throughput plus p50/p95/p99 latency per
+# operation. Results are saved as JSON; pass --compare to flag regressions against an earlier run.
+#   python -m benchmarks.load_test --cars 10000 --bookings 1000000 --workers 8 --duration 30
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import date, timedelta
+
+os.environ.setdefault("EMAIL_DRY_RUN", "true")
+
+import bcrypt
+
+from db_connection import initialize_database, get_connection, ConnectionPool
+from services.rental_service import RentalService
+from services.auth_service import get_auth_service
+from services.reports import rebuild_summaries
+
+OPERATIONS = ("browse", "book", "approve", "bill", "login")
+DEFAULT_MIX = "browse=50,book=20,approve=10,bill=10,login=10"
+PASSWORD = "loadtest123"
+MAKES = [("Toyota", "Camry"), ("Honda", "Civic"), ("Ford", "Focus"), ("Nissan", "Altima"),
+         ("Hyundai", "Elantra"), ("Kia", "Forte"), ("Mazda", "Mazda3"), ("Subaru", "Impreza")]
+SEED_CHUNK = 50000
+BASE_DAY = date(2030, 1, 1)
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise SystemExit(f"Unknown operation '{name}'. Choose from {', '.join(OPERATIONS)}.")
+        mix[name] = float(weight)
+    return mix
+
+def seed(db_path, cars, users, bookings, rounds):
+    """Populate a fresh database; returns (user names, pending booking ids, approved booking ids)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        initialize_database(db_path)
+    rng = random.Random(1)
+    conn = get_connection(db_path)
+    password_hash = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8") # One hash for every user
+    names = [f"user{n}" for n in range(users)]
+    with conn:
+        conn.executemany("INSERT INTO users (username, password, role, email) VALUES (?, ?, 'customer', ?)",
+                         [(name, password_hash, f"{name}@example.com") for name in names])
+        fleet = []
+        for _ in range(cars):
+            make, model = rng.choice(MAKES)
+            fleet.append((make, model, rng.randint(2012, 2024), rng.randint(0, 150000),
+                          round(rng.uniform(25, 120), 2), 1, 30))
+        conn.executemany("""
+            INSERT INTO cars (make, model, year, mileage, rate, min_days, max_days, available)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 1)
+        """, fleet)
+    car_rows = conn.execute("SELECT id, rate FROM cars").fetchall()
+
+    # Bookings of one car sit in consecutive 10-day slots, so approved ones never overlap
+    statuses = ("approved",) * 6 + ("pending",) * 2 + ("rejected",) * 2
+    chunk = []
+    for n in range(bookings):
+        car_id, rate = car_rows[n % len(car_rows)]
+        days = rng.randint(1, 7)
+        start = BASE_DAY + timedelta(days=(n // len(car_rows)) * 10)
+        chunk.append((car_id, rng.choice(names), days, days * rate, rng.choice(statuses),
+                      start.isoformat(), (start + timedelta(days=days)).isoformat()))
+        if len(chunk) == SEED_CHUNK or n == bookings - 1:
+            with conn:
+                conn.executemany("""
+                    INSERT INTO bookings (car_id, customer_name, days, total_fee, status, start_date, end_date)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, chunk)
+            chunk = []
+    pending = [row[0] for row in conn.execute("SELECT id FROM bookings WHERE status = 'pending'")]
+    approved = [row[0] for row in conn.execute("SELECT id FROM bookings WHERE status = 'approved' LIMIT 100000")]
+    rebuild_summaries(conn) # Bulk inserts bypass the per-booking summary updates
+    conn.execute("ANALYZE")
+    conn.close()
+    return names, pending, approved
+
+def worker(db_path, mix, duration, worker_id, worker_count, names, pending, approved, max_car_id, rounds):
+    """Run the mixed workload for `duration` seconds; returns {operation: [latency seconds]}."""
+    rng = random.Random(worker_id)
+    get_auth_service().rounds = rounds # Match the seeded hashes so logins don't trigger rehashing
+    service = RentalService(ConnectionPool(db_path, max_size=1))
+    operations = list(mix)
+    weights = [mix[name] for name in operations]
+    latencies = {name: [] for name in operations}
+    errors = {name: 0 for name in operations}
+    pending = pending[worker_id::worker_count] # Each worker approves its own slice
+    future_day = BASE_DAY + timedelta(days=36500 + worker_id * 100000) # Far from seeded bookings
+
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        operation = rng.choices(operations, weights)[0]
+        started = time.perf_counter()
+        try:
+            if operation == "browse":
+                service.list_cars_page(rng.randint(0, max_car_id))
+            elif operation == "book":
+                future_day += timedelta(days=10)
+                service.book_car(rng.choice(names), rng.randint(1, max_car_id), rng.randint(1, 7), future_day)
+            elif operation == "approve":
+                if not pending:
+                    continue
+                service.manage_booking(pending.pop(), approve=rng.random() < 0.8)
+            elif operation == "bill":
+                service.generate_bill(rng.choice(approved))
+            elif operation == "login":
+                service.login_user(rng.choice(names), PASSWORD)
+        except Exception:
+            errors[operation] += 1
+            continue
+        latencies[operation].append(time.perf_counter() - started)
+    service.close()
+    return latencies, errors
+
+def _process_worker(args):
+    # Silence service status lines; a real file (not StringIO) keeps nested bcrypt worker spawns working
+    with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+        try:
+            return worker(*args)
+        finally:
+            get_auth_service().shutdown() # Let this process exit without waiting on idle bcrypt workers
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def summarize(results, duration):
+    summary = {}
+    for operation in OPERATIONS:
+        samples = sorted(value for latencies, _ in results for value in latencies.get(operation, []))
+        errors = sum(errs.get(operation, 0) for _, errs in results)
+        if not samples and not errors:
+            continue
+        summary[operation] = {
+            "count": len(samples),
+            "errors": errors,
+            "throughput_per_s": len(samples) / duration,
+            "p50_ms": percentile(samples, 0.50) * 1000 if samples else None,
+            "p95_ms": percentile(samples, 0.95) * 1000 if samples else None,
+            "p99_ms": percentile(samples, 0.99) * 1000 if samples else None,
+        }
+    return summary
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current, baseline_path, tolerance):
+    # Print p95 deltas against a previous run; returns True if any operation regressed past tolerance
+    with open(baseline_path) as f:
+        baseline = json.load(f)["operations"]
+    regressed = False
+    print(f"\nComparison with {baseline_path} (tolerance {tolerance:.0%}):")
+    for operation, stats in current.items():
+        before = baseline.get(operation, {}).get("p95_ms")
+        now = stats["p95_ms"]
+        if before is None or now is None:
+            continue
+        change = (now - before) / before if before else 0.0
+        flag = "REGRESSION" if change > tolerance else "ok"
+        regressed |= change > tolerance
+        print(f"  {operation:8s} p95 {before:8.3f} ms -> {now:8.3f} ms ({change:+.1%}) {flag}")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed-workload load test for RentalService")
+    parser.add_argument("--db", help="Path for a new seeded database to keep after the run (default: temporary)")
+    parser.add_argument("--cars", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--bookings", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--processes", action="store_true", help="Use worker processes instead of threads")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load per worker")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Operation weights, e.g. " + DEFAULT_MIX)
+    parser.add_argument("--bcrypt-rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", "12")))
+    parser.add_argument("--out", default="load_test_results.json")
+    parser.add_argument("--compare", help="Earlier results JSON to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.20, help="Allowed p95 slowdown before failing")
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db_path = args.db or os.path.join(workdir, "load_test.db")
+        started = time.perf_counter()
+        names, pending, approved = seed(db_path, args.cars, args.users, args.bookings, args.bcrypt_rounds)
+        seed_seconds = time.perf_counter() - started
+        print(f"Seeded {args.cars} cars, {args.users} users, {args.bookings} bookings in {seed_seconds:.1f}s")
+
+        conn = get_connection(db_path)
+        max_car_id = conn.execute("SELECT MAX(id) FROM cars").fetchone()[0]
+        conn.close()
+        jobs = [(db_path, mix, args.duration, n, args.workers, names, pending, approved, max_car_id, args.bcrypt_rounds)
+                for n in range(args.workers)]
+        if args.processes:
+            executor = ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context("spawn"))
+            run = lambda: list(executor.map(_process_worker, jobs))
+        else:
+            executor = ThreadPoolExecutor(args.workers)
+            def run():
+                with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+                    return [future.result() for future in [executor.submit(worker, *job) for job in jobs]]
+        with executor:
+            results = run()
+
+    operations = summarize(results, args.duration)
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": {"cars": args.cars, "users": args.users, "bookings": args.bookings, "workers": args.workers,
+                   "mode": "processes" if args.processes else "threads", "duration_s": args.duration,
+                   "mix": mix, "bcrypt_rounds": args.bcrypt_rounds},
+        "seed_seconds": seed_seconds,
+        "operations": operations,
+    }
+    print(f"\n{'operation':10s}{'ops/s':>10s}{'p50 ms':>10s}{'p95 ms':>10s}{'p99 ms':>10s}{'errors':>8s}")
+    for operation, stats in operations.items():
+        p50, p95, p99 = (stats[key] if stats[key] is not None else float("nan") for key in ("p50_ms", "p95_ms", "p99_ms"))
+        print(f"{operation:10s}{stats['throughput_per_s']:10.1f}{p50:10.3f}{p95:10.3f}{p99:10.3f}{stats['errors']:8d}")
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {args.out}")
+
+    if args.compare and compare(operations, args.compare, args.tolerance):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,185 @@
 import sqlite3
 import os
-import bcrypt
+import queue
+import threading
+import time
+import hashlib
+from contextlib import contextmanager
+from migrations import apply_migrations, MIGRATIONS
 
-DB_PATH = "car_rental.db"
+DB_PATH = os.getenv("CAR_RENTAL_DB", "car_rental.db")
+POOL_SIZE = int(os.getenv("CAR_RENTAL_POOL_SIZE", "8")) # Maximum open connections per pool
+POOL_TIMEOUT = float(os.getenv("CAR_RENTAL_POOL_TIMEOUT", "10")) # Seconds to wait for a free connection
+BUSY_TIMEOUT_MS = 5000 # How long SQLite waits on a locked database before raising
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
+# Sharded mode: one database per branch, e.g. CAR_RENTAL_BRANCHES=downtown,airport,harbor.
+# Branches own disjoint id ranges, so only ever append to the list; reordering it re-routes ids.
+BRANCHES = [branch.strip() for branch in os.getenv("CAR_RENTAL_BRANCHES", "").split(",") if branch.strip()]
+SHARD_DIR = os.getenv("CAR_RENTAL_SHARD_DIR", "shards") # Directory holding the per-branch database files
+SHARD_ID_SPAN = 10 ** 9 # Car and booking ids per branch: branch i owns [i * span, (i + 1) * span)
+SHARDED_TABLES = ("cars", "bookings") # Tables whose ids encode the owning branch
+
+# Pragmas applied to every connection: WAL lets readers run alongside one writer,
+# NORMAL sync is safe under WAL, and mmap/cache keep hot pages out of read() calls.
+PRAGMAS = [
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456", # 256 MB
+    "PRAGMA cache_size = -65536", # 64 MB (negative value is KiB)
+]
+
+def configure_connection(conn):
+    # Apply the tuned pragmas to a freshly opened connection
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
     return conn
 
-def initialize_database():
-    conn = get_connection()
-    cursor = conn.cursor()
+def get_connection(db_path=None):
+    # Open a new tuned connection; it may be handed between threads (one user at a time)
+    conn = sqlite3.connect(db_path or DB_PATH, check_same_thread=False)
+    return configure_connection(conn)
 
-    # Create tables
-    cursor.execute("""
+class PoolTimeout(Exception):
+    # Raised when no pooled connection frees up within the wait timeout
+    pass
+
+class ConnectionPool:
+    # Bounded pool of tuned SQLite connections shared by service workers
+    def __init__(self, db_path=None, max_size=POOL_SIZE, timeout=POOL_TIMEOUT):
+        self.db_path = db_path or DB_PATH
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue() # Reuse the most recently returned (warmest) connection first
+        self._lock = threading.Lock()
+        self._local = threading.local() # Per-thread connection for connection_for_thread()
+        self._opened = 0
+        self._closed = False
+        self.stats = {"opened": 0, "checkouts": 0, "waits": 0, "timeouts": 0, "wait_time": 0.0}
+
+    def acquire(self, timeout=None):
+        # Check out a connection, opening a new one while under max_size, otherwise wait
+        if self._closed:
+            raise PoolTimeout("Connection pool is closed.")
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._opened < self.max_size:
+                    self._opened += 1
+                    self.stats["opened"] += 1
+                    open_new = True
+                else:
+                    open_new = False
+            if open_new:
+                try:
+                    conn = get_connection(self.db_path)
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                started = time.perf_counter()
+                with self._lock:
+                    self.stats["waits"] += 1
+                try:
+                    conn = self._idle.get(timeout=self.timeout if timeout is None else timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self.stats["timeouts"] += 1
+                    raise PoolTimeout(f"No database connection free after {self.timeout if timeout is None else timeout}s.")
+                finally:
+                    with self._lock:
+                        self.stats["wait_time"] += time.perf_counter() - started
+        with self._lock:
+            self.stats["checkouts"] += 1
+        return conn
+
+    def release(self, conn):
+        # Return a connection to the pool, discarding any half-finished transaction
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        # Context manager form: with pool.connection() as conn: ...
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def connection_for_thread(self):
+        # Sticky connection for the calling thread, checked out on first use
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self.acquire()
+            self._local.conn = conn
+        return conn
+
+    def release_thread_connection(self):
+        # Give the calling thread's sticky connection back to the pool
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            self.release(conn)
+
+    def pool_stats(self):
+        # Snapshot of pool usage counters
+        with self._lock:
+            snapshot = dict(self.stats)
+            snapshot["open"] = self._opened
+        snapshot["idle"] = self._idle.qsize()
+        snapshot["in_use"] = snapshot["open"] - snapshot["idle"]
+        snapshot["max_size"] = self.max_size
+        return snapshot
+
+    def close(self):
+        # Close every idle connection; connections still checked out close on release
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_path=None):
+    # Shared pool per database file
+    path = db_path or DB_PATH
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None or pool._closed:
+            pool = ConnectionPool(path)
+            _pools[path] = pool
+        return pool
+
+def reserve_id_range(cursor, id_base):
+    # Start the AUTOINCREMENT counters of the sharded tables at id_base (never moves them backwards)
+    for table in SHARDED_TABLES:
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+        row = cursor.fetchone()
+        if row is None:
+            cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, id_base))
+        elif row[0] < id_base:
+            cursor.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (id_base, table))
+
+# Base tables; indexes and later schema changes live in migrations.py
+BASE_TABLES = [
+    """
     CREATE TABLE IF NOT EXISTS users (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         username TEXT UNIQUE NOT NULL,
@@ -21,9 +187,8 @@ def initialize_database():
         role TEXT NOT NULL,
         email TEXT NOT NULL
     )
-    """)
-
-    cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS cars (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         make TEXT NOT NULL,
@@ -35,9 +200,8 @@ def initialize_database():
         max_days INTEGER NOT NULL,
         available BOOLEAN DEFAULT 1
     )
-    """)
-
-    cursor.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS bookings (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         car_id INTEGER NOT NULL,
@@ -48,41 +212,86 @@ def initialize_database():
         FOREIGN KEY (car_id) REFERENCES cars(id),
         FOREIGN KEY (customer_name) REFERENCES users(username)
     )
-    """)
+    """,
+]
+
+SAMPLE_CARS = [
+    # (make, model, year, mileage, rate, min_days, max_days)
+    ("Toyota", "Camry", 2020, 35000, 45.99, 1, 15),
+    ("Honda", "Civic", 2019, 42000, 40.00, 2, 14),
+    ("Ford", "Focus", 2018, 50000, 38.50, 1, 10),
+    ("Chevrolet", "Malibu", 2021, 22000, 48.99, 3, 12),
+    ("Nissan", "Altima", 2020, 31000, 44.50, 2, 14),
+    ("Hyundai", "Elantra", 2019, 46000, 39.99, 1, 10),
+    ("Kia", "Forte", 2021, 18000, 42.00, 1, 12),
+    ("Mazda", "Mazda3", 2022, 12000, 50.00, 1, 15),
+    ("Volkswagen", "Jetta", 2017, 55000, 35.99, 2, 10),
+    ("Subaru", "Impreza", 2021, 27000, 47.25, 1, 13)
+]
+
+DEFAULT_USERS = [
+    # (username, raw_password, role, email)
+    ("admin", "admin123", "admin", "admin@example.com"),
+    ("customer", "cust123", "customer", "customer@example.com")
+]
+
+def init_fingerprint(id_base=0):
+    # Digest of everything initialize_database() sets up: tables, migrations and seed data
+    source = repr((BASE_TABLES, [(version, statements) for version, _, statements in MIGRATIONS],
+                   SAMPLE_CARS, DEFAULT_USERS, id_base))
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+def stored_fingerprint(conn):
+    # Fingerprint recorded by the last full initialization, or None
+    try:
+        row = conn.execute("SELECT value FROM app_meta WHERE key = 'init_fingerprint'").fetchone()
+    except sqlite3.OperationalError: # No app_meta table: a new database, or one set up before fingerprints
+        return None
+    return row[0] if row else None
+
+def initialize_database(db_path=None, id_base=0, force=False):
+    """Create, upgrade and seed the database; returns False when there was nothing to do.
+
+    A full run stores a fingerprint of the schema, migrations and seed data. Later starts
+    compare it with one indexed read and skip the DDL, migrations and seed checks (and their
+    bcrypt work) when it matches. Pass force=True to run every step regardless.
+    """
+    fingerprint = init_fingerprint(id_base)
+    conn = get_connection(db_path)
+    if not force and stored_fingerprint(conn) == fingerprint:
+        conn.close()
+        return False
+    cursor = conn.cursor()
+
+    # Create tables
+    for statement in BASE_TABLES:
+        cursor.execute(statement)
+
+    if id_base:
+        reserve_id_range(cursor, id_base) # Before seeding, so a branch's sample cars get its ids too
+    conn.commit()
+
+    # Bring indexes and later schema changes up to the current version
+    apply_migrations(conn)
+
+    # Seed under the write lock, so two first starts can't both insert the sample data
+    conn.execute("BEGIN IMMEDIATE")
 
     # Insert demo car data if empty
     cursor.execute("SELECT COUNT(*) FROM cars")
     if cursor.fetchone()[0] == 0:
         print("🚗 Inserting sample car data...")
-        cars = [
-            # (make, model, year, mileage, rate, min_days, max_days)
-            ("Toyota", "Camry", 2020, 35000, 45.99, 1, 15),
-            ("Honda", "Civic", 2019, 42000, 40.00, 2, 14),
-            ("Ford", "Focus", 2018, 50000, 38.50, 1, 10),
-            ("Chevrolet", "Malibu", 2021, 22000, 48.99, 3, 12),
-            ("Nissan", "Altima", 2020, 31000, 44.50, 2, 14),
-            ("Hyundai", "Elantra", 2019, 46000, 39.99, 1, 10),
-            ("Kia", "Forte", 2021, 18000, 42.00, 1, 12),
-            ("Mazda", "Mazda3", 2022, 12000, 50.00, 1, 15),
-            ("Volkswagen", "Jetta", 2017, 55000, 35.99, 2, 10),
-            ("Subaru", "Impreza", 2021, 27000, 47.25, 1, 13)
-        ]
         cursor.executemany("""
             INSERT INTO cars (make, model, year, mileage, rate, min_days, max_days, available)
             VALUES (?, ?, ?, ?, ?, ?, ?, 1)
-        """, cars)
+        """, SAMPLE_CARS)
         print("✅ Sample car data inserted.")
 
     # Insert demo admin and customer user if not exists
-    users = [
-        # (username, raw_password, role, email)
-        ("admin", "admin123", "admin", "admin@example.com"),
-        ("customer", "cust123", "customer", "customer@example.com")
-    ]
-
-    for username, raw_password, role, email in users:
+    for username, raw_password, role, email in DEFAULT_USERS:
         cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
         if not cursor.fetchone():
+            import bcrypt # Only needed the first time the default users are created
             hashed_pw = bcrypt.hashpw(raw_password.encode('utf-8'), bcrypt.gensalt())
             cursor.execute("""
                 INSERT INTO users (username, password, role, email)
@@ -90,5 +299,76 @@ def initialize_database():
             """, (username, hashed_pw, role, email))
             print(f"✅ Default user '{username}' added.")
 
+    cursor.execute("""
+        INSERT INTO app_meta (key, value) VALUES ('init_fingerprint', ?)
+        ON CONFLICT (key) DO UPDATE SET value = excluded.value
+    """, (fingerprint,))
     conn.commit()
     conn.close()
+    return True
+
+def shard_path(branch, shard_dir=None):
+    # Database file of one branch
+    return os.path.join(shard_dir or SHARD_DIR, f"car_rental_{branch}.db")
+
+class ShardRouter:
+    """Routes work to per-branch SQLite databases and fans cross-branch queries out in parallel.
+
+    Each branch has its own file, pool and write lock, so writes to different branches never wait
+    on each other. Car and booking ids are allocated from the branch's id range, which is how
+    branch_for_id() finds the owning shard from an id alone.
+    """
+    def __init__(self, branches=None, shard_dir=None, max_workers=None):
+        self.branches = list(branches or BRANCHES)
+        if not self.branches:
+            raise ValueError("No branches configured. Set CAR_RENTAL_BRANCHES, e.g. 'downtown,airport'.")
+        if len(set(self.branches)) != len(self.branches):
+            raise ValueError("Branch names must be unique.")
+        self.shard_dir = shard_dir or SHARD_DIR
+        self.paths = {branch: shard_path(branch, self.shard_dir) for branch in self.branches}
+        self._index = {branch: i for i, branch in enumerate(self.branches)}
+        from concurrent.futures import ThreadPoolExecutor # Only sharded mode needs it; keeps startup lean
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or len(self.branches), thread_name_prefix="shard")
+
+    def initialize(self):
+        # Create or upgrade every branch database, each starting its ids at its own range
+        os.makedirs(self.shard_dir, exist_ok=True)
+        for branch in self.branches:
+            initialize_database(self.paths[branch], self.id_base(branch))
+
+    def id_base(self, branch):
+        # First id of the branch's range (ids start at id_base + 1)
+        return self._index[branch] * SHARD_ID_SPAN
+
+    def branch_for_id(self, row_id):
+        # Branch that owns a car or booking id
+        index = int(row_id) // SHARD_ID_SPAN
+        if row_id < 1 or index >= len(self.branches):
+            raise KeyError(f"No branch owns id {row_id}.")
+        return self.branches[index]
+
+    def pool(self, branch):
+        # Shared connection pool of one branch
+        if branch not in self._index:
+            raise KeyError(f"Unknown branch '{branch}'. Branches: {', '.join(self.branches)}.")
+        return get_pool(self.paths[branch])
+
+    def pool_for_id(self, row_id):
+        return self.pool(self.branch_for_id(row_id))
+
+    def map(self, fn, branches=None):
+        # Run fn(branch) for every branch on the shard thread pool; {branch: result} in branch order
+        futures = [(branch, self._executor.submit(fn, branch)) for branch in (branches or self.branches)]
+        return {branch: future.result() for branch, future in futures}
+
+    def query(self, sql, params=()):
+        # Run one read-only statement on every branch in parallel; {branch: rows}
+        def run(branch):
+            with self.pool(branch).connection() as conn:
+                return conn.execute(sql, params).fetchall()
+        return self.map(run)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        for branch in self.branches:
+            self.pool(branch).close()
@@ -1,10 +1,13 @@
+import time # For the startup timing report
+STARTED = time.perf_counter() # Taken before the other imports so the report includes them
 from db_connection import initialize_database # Import the function to initialize the database
 from services.rental_service import RentalService # Import the RentalService class
+from services.email_service import OutboxWorker # Background sender for queued emails
 import os # For environment variable management
 import getpass # For secure password input
+from datetime import date, timedelta # For rental date prompts
 
-# Initialize the database (creates tables and seeds cars)
-initialize_database()
+STARTUP_REPORT = os.getenv("CAR_RENTAL_STARTUP_REPORT", "False").lower() == "true" # Print startup timings
 
 def auth_menu(service): # Function to handle user authentication and registration
     while True: # Loop until a valid login or registration is completed
@@ -65,8 +68,49 @@ def clean_float_input(prompt): # Function to clean and convert float input
     raw = input(prompt) # Prompt user for input
     return float(''.join(ch for ch in raw if ch.isdigit() or ch == '.')) # Convert input to float by filtering out non-digit characters except for the decimal point
 
+def clean_date_input(prompt): # Function to read an optional YYYY-MM-DD date
+    while True:
+        raw = input(prompt).strip() # Prompt user for input
+        if not raw:
+            return None # Blank means "no date given"
+        try:
+            return date.fromisoformat(raw)
+        except ValueError:
+            print("Please enter the date as YYYY-MM-DD.")
+
+def optional_number_input(prompt, convert=int): # Read an optional number; blank means "any"
+    while True:
+        raw = input(prompt).strip()
+        if not raw:
+            return None
+        try:
+            return convert(raw)
+        except ValueError:
+            print("Please enter a number or leave it blank.")
+
+def show_more(): # Ask whether to fetch the next page of a listing
+    return input("Show more? (y/n): ").lower() == 'y'
+
+def print_startup_report(timings, initialized): # Where the time before the first menu went
+    total = sum(timings.values())
+    steps = " | ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in timings.items())
+    database = "initialized" if initialized else "fingerprint matched, setup skipped"
+    print(f"⏱️ Startup {total * 1000:.1f} ms: {steps} (database {database})")
+
 def main_menu(): # Main function to display the main menu and handle user interactions
+    timings = {"imports": time.perf_counter() - STARTED}
+    step_started = time.perf_counter()
+    # Initialize the database (creates tables and seeds cars); skipped when nothing changed since the last run
+    initialized = initialize_database()
+    timings["database"] = time.perf_counter() - step_started
+    step_started = time.perf_counter()
     service = RentalService() # Create an instance of the RentalService class
+    outbox_worker = OutboxWorker(dry_run=service.dry_run) # Deliver queued emails in the background
+    outbox_worker.start()
+    service.outbox_worker = outbox_worker
+    timings["services"] = time.perf_counter() - step_started
+    if STARTUP_REPORT:
+        print_startup_report(timings, initialized)
     username, role = auth_menu(service) # Authenticate user and get their role
 
     while True:
@@ -78,13 +122,24 @@ def main_menu(): # Main function to display the main menu and handle user intera
             print("4. Show Available Cars")
             print("5. View Bookings")
             print("6. Approve/Reject Bookings")
-            print("7. Exit")
+            print("7. Import Cars from File")
+            print("8. Export Fleet to File")
+            print("9. Run Batch Billing")
+            print("10. Reports")
+            print("11. Rebuild Report Summaries")
+            print("12. Return Car")
+            print("13. Archive Closed Bookings")
+            print("14. View Archived Bookings")
+            print("15. Exit")
         else:
             print("1. Show Available Cars")
             print("2. Book a Car")
             print("3. View My Bookings")
             print("4. Generate/View Bill")
-            print("5. Exit")
+            print("5. Search Cars")
+            print("6. Find a Car by Name")
+            print("7. Compare Prices")
+            print("8. Exit")
 
         choice = input("Enter your choice: ")
 
@@ -111,13 +166,13 @@ def main_menu(): # Main function to display the main menu and handle user intera
                 service.delete_car(car_id)
 
             elif choice == '4':
-                service.display_available_cars()
+                service.display_available_cars(more=show_more)
 
             elif choice == '5':
-                service.view_bookings()
+                service.view_bookings(more=show_more)
 
             elif choice == '6':
-                service.view_pending_bookings()
+                service.view_pending_bookings(more=show_more)
                 booking_id = clean_int_input("Enter Booking ID to manage: ")
                 action = input("Approve or Reject? (a/r): ").lower()
                 if action in ['a', 'r']:
@@ -126,21 +181,64 @@ def main_menu(): # Main function to display the main menu and handle user intera
                     print("Invalid action. Please enter 'a' or 'r'.")
 
             elif choice == '7':
+                path = input("File to import (.csv, .jsonl or .parquet): ").strip()
+                service.import_cars(path)
+
+            elif choice == '8':
+                path = input("Export to file (.csv, .jsonl or .parquet): ").strip()
+                service.export_cars(path)
+
+            elif choice == '9':
+                output = input("Bill output (directory, .zip or .jsonl): ").strip() or "bills"
+                fmt = "zip" if output.endswith(".zip") else "jsonl" if output.endswith(".jsonl") else "dir"
+                service.run_batch_billing(output, fmt)
+
+            elif choice == '10':
+                month = input("Month (YYYY-MM, blank for this month): ").strip() or None
+                service.show_reports(month)
+
+            elif choice == '11':
+                service.rebuild_summaries()
+
+            elif choice == '12':
+                booking_id = clean_int_input("Booking ID being returned: ")
+                final_mileage = clean_int_input("Odometer reading at return: ")
+                return_date = clean_date_input("Return date (YYYY-MM-DD, blank for today): ")
+                service.return_car(booking_id, final_mileage, return_date)
+
+            elif choice == '13':
+                days = optional_number_input("Archive bookings closed more than how many days ago? (blank for default): ")
+                if days is None:
+                    service.archive_bookings()
+                else:
+                    service.archive_bookings(days)
+
+            elif choice == '14':
+                customer = input("Customer username (blank for all): ").strip() or None
+                service.view_archived_bookings(customer, more=show_more)
+
+            elif choice == '15':
                 break
             else:
-                print("Invalid choice, please enter a number 1-7.")
+                print("Invalid choice, please enter a number 1-15.")
 
         else:  # customer menu
             if choice == '1':
-                service.display_available_cars()
+                start_date = clean_date_input("From date (YYYY-MM-DD, blank for any): ")
+                if start_date:
+                    days = clean_int_input("Rental days: ")
+                    service.display_available_cars(start_date, start_date + timedelta(days=days), more=show_more)
+                else:
+                    service.display_available_cars(more=show_more)
 
             elif choice == '2':
                 car_id = clean_int_input("Car ID: ")
                 days = clean_int_input("Rental days: ")
-                service.book_car(username, car_id, days)
+                start_date = clean_date_input("Start date (YYYY-MM-DD, blank for today): ")
+                service.book_car(username, car_id, days, start_date)
 
             elif choice == '3':
-                service.view_bookings(customer_name=username)
+                service.view_bookings(customer_name=username, more=show_more)
 
             elif choice == '4':
                 booking_id = clean_int_input("Enter your Booking ID to generate/view bill: ")
@@ -154,10 +252,34 @@ def main_menu(): # Main function to display the main menu and handle user intera
                         print(f"Bill saved as {filename}")
 
             elif choice == '5':
+                print("\n-- Search Cars (leave blank for any) --")
+                make = input("Make: ").strip() or None
+                model = input("Model: ").strip() or None
+                year_min = optional_number_input("Oldest year: ")
+                max_mileage = optional_number_input("Max mileage: ")
+                rate_max = optional_number_input("Max daily rate ($): ", float)
+                days = optional_number_input("Rental days: ")
+                start_date = clean_date_input("From date (YYYY-MM-DD, blank for any): ") if days else None
+                sort = input("Sort by rate/year/mileage (default rate): ").strip().lower() or "rate"
+                service.display_car_search(sort=sort, descending=(sort == "year"), start_date=start_date,
+                                           make=make, model=model, year_min=year_min, max_mileage=max_mileage,
+                                           rate_max=rate_max, days=days)
+
+            elif choice == '6':
+                text = input("Search make, model or year (e.g. 'toy cam'): ").strip()
+                service.display_search_results(text)
+
+            elif choice == '7':
+                days = clean_int_input("Rental days: ")
+                make = input("Make (blank for any): ").strip() or None
+                service.display_fleet_quotes(days, make=make)
+
+            elif choice == '8':
                 break
             else:
-                print("Invalid choice, please enter a number 1-5.")
+                print("Invalid choice, please enter a number 1-8.")
 
+    outbox_worker.stop() # Flush emails that are already due before exiting
     service.close()
     print("Goodbye,See You Again!!!") # End the program
 
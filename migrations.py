@@ -0,0 +1,219 @@
+# Versioned schema migrations for the car rental database.
+# The applied version is stored in SQLite's built-in PRAGMA user_version, so every
+# migration below runs exactly once, in order, inside its own transaction.
+
+MIGRATIONS = [
+    # (version, description, [SQL statements])
+    (1, "Query-path indexes for bookings and cars", [
+        # view_bookings(customer_name=...) filters on customer_name; rowid (id) is the index suffix
+        "CREATE INDEX IF NOT EXISTS idx_bookings_customer ON bookings (customer_name)",
+        # view_pending_bookings only ever looks at pending rows, so keep that index small
+        "CREATE INDEX IF NOT EXISTS idx_bookings_pending ON bookings (status) WHERE status = 'pending'",
+        # generate_bill joins bookings to cars, and per-car booking lookups go through car_id
+        "CREATE INDEX IF NOT EXISTS idx_bookings_car ON bookings (car_id, status)",
+        # display_available_cars and book_car filter on the availability flag
+        "CREATE INDEX IF NOT EXISTS idx_cars_available ON cars (available)",
+    ]),
+    (2, "Persistent email outbox", [
+        """
+        CREATE TABLE IF NOT EXISTS email_outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            to_address TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            body TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        # The sender only ever polls due, pending messages
+        "CREATE INDEX IF NOT EXISTS idx_outbox_due ON email_outbox (next_attempt_at) WHERE status = 'pending'",
+    ]),
+    (3, "Rental date ranges on bookings", [
+        # Half-open [start_date, end_date) periods as ISO dates
+        "ALTER TABLE bookings ADD COLUMN start_date TEXT",
+        "ALTER TABLE bookings ADD COLUMN end_date TEXT",
+        # Bookings made before dates existed are treated as starting on the day of the upgrade
+        "UPDATE bookings SET start_date = date('now'), end_date = date('now', '+' || days || ' days') WHERE start_date IS NULL",
+        # Approved rentals now live in the date index; the flag only marks cars withdrawn from the fleet
+        "UPDATE cars SET available = 1",
+        # Covering index used to rebuild the availability index
+        "CREATE INDEX IF NOT EXISTS idx_bookings_approved_dates ON bookings (car_id, start_date, end_date) WHERE status = 'approved'",
+    ]),
+    (4, "Revenue and utilization summary tables", [
+        # Booking count and fee total per status
+        """
+        CREATE TABLE IF NOT EXISTS summary_status (
+            status TEXT PRIMARY KEY,
+            bookings INTEGER NOT NULL DEFAULT 0,
+            fees REAL NOT NULL DEFAULT 0
+        )
+        """,
+        # Per car and per make, by month of the rental start (YYYY-MM); revenue and days count approved bookings
+        """
+        CREATE TABLE IF NOT EXISTS summary_car_month (
+            car_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            bookings INTEGER NOT NULL DEFAULT 0,
+            approved INTEGER NOT NULL DEFAULT 0,
+            rejected INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            rented_days INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (car_id, month)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS summary_make_month (
+            make TEXT NOT NULL,
+            month TEXT NOT NULL,
+            bookings INTEGER NOT NULL DEFAULT 0,
+            approved INTEGER NOT NULL DEFAULT 0,
+            rejected INTEGER NOT NULL DEFAULT 0,
+            revenue REAL NOT NULL DEFAULT 0,
+            rented_days INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (make, month)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_summary_car_month_month ON summary_car_month (month)",
+        "CREATE INDEX IF NOT EXISTS idx_summary_make_month_month ON summary_make_month (month)",
+        # Fleet size per make, the denominator of utilization; kept current by triggers on cars
+        "CREATE TABLE IF NOT EXISTS summary_make_fleet (make TEXT PRIMARY KEY, cars INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cars_fleet_insert AFTER INSERT ON cars BEGIN
+            INSERT INTO summary_make_fleet (make, cars) VALUES (NEW.make, 1)
+            ON CONFLICT (make) DO UPDATE SET cars = cars + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cars_fleet_delete AFTER DELETE ON cars BEGIN
+            UPDATE summary_make_fleet SET cars = cars - 1 WHERE make = OLD.make;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cars_fleet_update AFTER UPDATE OF make ON cars WHEN NEW.make != OLD.make BEGIN
+            UPDATE summary_make_fleet SET cars = cars - 1 WHERE make = OLD.make;
+            INSERT INTO summary_make_fleet (make, cars) VALUES (NEW.make, 1)
+            ON CONFLICT (make) DO UPDATE SET cars = cars + 1;
+        END
+        """,
+        # Backfill from existing data
+        "INSERT INTO summary_status SELECT status, COUNT(*), SUM(total_fee) FROM bookings GROUP BY status",
+        """
+        INSERT INTO summary_car_month
+        SELECT car_id, substr(start_date, 1, 7), COUNT(*), SUM(status = 'approved'), SUM(status = 'rejected'),
+               SUM(CASE WHEN status = 'approved' THEN total_fee ELSE 0 END),
+               SUM(CASE WHEN status = 'approved' THEN days ELSE 0 END)
+        FROM bookings GROUP BY car_id, substr(start_date, 1, 7)
+        """,
+        """
+        INSERT INTO summary_make_month
+        SELECT c.make, substr(b.start_date, 1, 7), COUNT(*), SUM(b.status = 'approved'), SUM(b.status = 'rejected'),
+               SUM(CASE WHEN b.status = 'approved' THEN b.total_fee ELSE 0 END),
+               SUM(CASE WHEN b.status = 'approved' THEN b.days ELSE 0 END)
+        FROM bookings b JOIN cars c ON c.id = b.car_id GROUP BY c.make, substr(b.start_date, 1, 7)
+        """,
+        "INSERT INTO summary_make_fleet SELECT make, COUNT(*) FROM cars GROUP BY make",
+    ]),
+    (5, "Vehicle returns and closed-booking archival", [
+        # Set when an approved rental is checked back in (status becomes 'returned')
+        "ALTER TABLE bookings ADD COLUMN returned_on TEXT",
+        "ALTER TABLE bookings ADD COLUMN final_mileage INTEGER",
+        # The archival job walks closed bookings in id order
+        "CREATE INDEX IF NOT EXISTS idx_bookings_closed ON bookings (id) WHERE status IN ('returned', 'rejected')",
+    ]),
+    (6, "Full-text search over cars", [
+        # Every car's searchable text is its make, model and year, so cars sharing all three rank
+        # identically. FTS5 therefore indexes distinct (make, model, year) listings with their fleet
+        # counts: ranking a few hundred listings by bm25 stays cheap at any fleet size, and search
+        # expands the best listings back into cars through idx_cars_listing.
+        """
+        CREATE TABLE IF NOT EXISTS car_listings (
+            id INTEGER PRIMARY KEY,
+            make TEXT NOT NULL,
+            model TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            cars INTEGER NOT NULL DEFAULT 0,
+            UNIQUE (make, model, year)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_cars_listing ON cars (make, model, year, rate)",
+        # External-content index: only the FTS index is stored, text is read from car_listings
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS car_listings_fts USING fts5(
+            make, model, year, content='car_listings', content_rowid='id',
+            prefix='1 2 3', tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        # Matches on make weigh more than model, and model more than year
+        "INSERT INTO car_listings_fts (car_listings_fts, rank) VALUES ('rank', 'bm25(10.0, 5.0, 1.0)')",
+        # Listings are only ever inserted (counts drop to zero rather than deleting rows)
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_car_listings_fts_insert AFTER INSERT ON car_listings BEGIN
+            INSERT INTO car_listings_fts (rowid, make, model, year) VALUES (NEW.id, NEW.make, NEW.model, NEW.year);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cars_listing_insert AFTER INSERT ON cars BEGIN
+            INSERT INTO car_listings (make, model, year, cars) VALUES (NEW.make, NEW.model, NEW.year, 1)
+            ON CONFLICT (make, model, year) DO UPDATE SET cars = cars + 1;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cars_listing_delete AFTER DELETE ON cars BEGIN
+            UPDATE car_listings SET cars = cars - 1 WHERE make = OLD.make AND model = OLD.model AND year = OLD.year;
+        END
+        """,
+        # Mileage and rate edits don't touch the listings
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_cars_listing_update AFTER UPDATE OF make, model, year ON cars
+        WHEN NEW.make != OLD.make OR NEW.model != OLD.model OR NEW.year != OLD.year BEGIN
+            UPDATE car_listings SET cars = cars - 1 WHERE make = OLD.make AND model = OLD.model AND year = OLD.year;
+            INSERT INTO car_listings (make, model, year, cars) VALUES (NEW.make, NEW.model, NEW.year, 1)
+            ON CONFLICT (make, model, year) DO UPDATE SET cars = cars + 1;
+        END
+        """,
+        "INSERT INTO car_listings (make, model, year, cars) SELECT make, model, year, COUNT(*) FROM cars GROUP BY make, model, year",
+    ]),
+    (7, "Application metadata", [
+        # Small key/value store; initialize_database() keeps its schema and seed fingerprint here
+        "CREATE TABLE IF NOT EXISTS app_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID",
+    ]),
+    (8, "Outbox send leases", [
+        # Senders claim a batch as 'sending' with next_attempt_at as the lease expiry, and poll both
+        # due pending rows and expired leases (left by a sender that died mid-batch)
+        "DROP INDEX IF EXISTS idx_outbox_due",
+        "CREATE INDEX IF NOT EXISTS idx_outbox_due ON email_outbox (next_attempt_at) WHERE status IN ('pending', 'sending')",
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0] # Latest schema version known to this code
+
+def get_schema_version(conn):
+    # Read the schema version recorded in the database file
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def apply_migrations(conn):
+    # Apply every migration newer than the recorded schema version, in order. Each one takes the
+    # write lock first and re-reads the version, so processes starting together on a new database
+    # never apply the same migration twice.
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if version <= get_schema_version(conn):
+            continue
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if version <= get_schema_version(conn): # Another process applied it while we waited for the lock
+                conn.execute("ROLLBACK")
+                continue
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {int(version)}") # PRAGMA does not accept bound parameters
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        applied.append(version)
+        print(f"🛠️ Applied migration {version}: {description}")
+    return applied
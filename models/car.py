@@ -1,7 +1,10 @@
 # A class representing a car available for rental.
 class Car:
+    # Slots keep per-car memory small when search results build many Car views
+    __slots__ = ("car_id", "make", "model", "year", "mileage", "rate", "available", "min_days", "max_days")
+
      # Initializes a new Car instance.
-    def __init__(self, car_id, make, model, year, mileage, rate, available=True, min_days=1, max_days=30): 
+    def __init__(self, car_id, make, model, year, mileage, rate, available=True, min_days=1, max_days=30):
         self.car_id = car_id
         self.make = make
         self.model = model
@@ -11,9 +14,10 @@ class Car:
         self.available = available
         self.min_days = min_days
         self.max_days = max_days
+
     def __str__(self):
         # Formats the car details into a readable string.
-        availability = "Available" if self.available else "Rented"
+        availability = "Available" if self.available else "Withdrawn from fleet" # Rentals are tracked by date, not by this flag
         # returns a string representation of the car.
         return (f"[{self.car_id}] {self.make} {self.model} ({self.year}) | Mileage: {self.mileage} | "
                 f"Rate: ${self.rate:.2f} | Rental Days: {self.min_days}-{self.max_days} | {availability}")
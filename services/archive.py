@@ -0,0 +1,158 @@
+# Archival of closed bookings to month-partitioned Parquet files.
+# Returned and rejected bookings older than ARCHIVE_AFTER_DAYS move out of the live bookings table into
+# <archive dir>/bookings/month=YYYY-MM/part-<first id>-<last id>.parquet (month of the rental start).
+# Run it periodically, e.g. from cron:
+#   python -m services.archive --older-than 90
+import os # For archive paths and atomic file moves
+import time # For throughput reporting
+from datetime import date, timedelta # For the age cutoff
+
+ARCHIVE_DIR = os.getenv("CAR_RENTAL_ARCHIVE_DIR", "archive") # Root directory of archived history
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90")) # Closed bookings older than this are archived
+ARCHIVE_CHUNK = 5000 # Bookings written and deleted per transaction
+CLOSED_STATUSES = ("returned", "rejected")
+
+# (column, pyarrow type name) for every archived record
+ARCHIVE_COLUMNS = [("id", "int64"), ("customer_name", "string"), ("car_id", "int64"), ("make", "string"),
+                   ("model", "string"), ("days", "int32"), ("total_fee", "float64"), ("status", "string"),
+                   ("start_date", "string"), ("end_date", "string"), ("returned_on", "string"),
+                   ("final_mileage", "int64")]
+
+# Closed bookings past the cutoff, with the car details they need once the live row is gone
+CLOSED_BOOKINGS_QUERY = """
+    SELECT b.id, b.customer_name, b.car_id, c.make, c.model, b.days, b.total_fee, b.status,
+           b.start_date, b.end_date, b.returned_on, b.final_mileage
+    FROM bookings b
+    JOIN cars c ON c.id = b.car_id
+    WHERE b.status IN ('returned', 'rejected') AND b.id > ?
+      AND COALESCE(b.returned_on, b.end_date) < ?
+    ORDER BY b.id
+    LIMIT ?
+"""
+
+class ArchiveReport:
+    # Outcome of an archival run
+    def __init__(self):
+        self.archived = 0
+        self.files = 0
+        self.cutoff = None
+        self.seconds = 0.0
+
+    def __str__(self):
+        return (f"{self.archived} booking(s) closed before {self.cutoff} archived "
+                f"into {self.files} Parquet file(s) in {self.seconds:.2f}s")
+
+def _schema():
+    import pyarrow as pa # Only needed when archiving or reading history
+    return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in ARCHIVE_COLUMNS])
+
+def _archived_ids(root, month):
+    # Booking ids already in a month's finished partition files
+    import pyarrow.parquet as pq
+    directory = os.path.join(root, f"month={month}")
+    ids = set()
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.endswith(".parquet") and not name.startswith("."):
+                ids.update(pq.read_table(os.path.join(directory, name), columns=["id"]).column("id").to_pylist())
+    return ids
+
+def _write_partition(root, month, rows, schema):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    directory = os.path.join(root, f"month={month}")
+    os.makedirs(directory, exist_ok=True)
+    name = f"part-{rows[0][0]:012d}-{rows[-1][0]:012d}.parquet"
+    table = pa.Table.from_pydict({column: [row[i] for row in rows] for i, (column, _) in enumerate(ARCHIVE_COLUMNS)},
+                                 schema=schema)
+    tmp = os.path.join(directory, f".{name}.tmp") # Dot prefix: readers skip it until it is complete
+    pq.write_table(table, tmp)
+    os.replace(tmp, os.path.join(directory, name))
+
+def archive_closed_bookings(conn, archive_dir=ARCHIVE_DIR, older_than_days=ARCHIVE_AFTER_DAYS,
+                            chunk_size=ARCHIVE_CHUNK, today=None):
+    """Move closed bookings older than `older_than_days` from the bookings table into Parquet.
+
+    Each chunk is written to its files before its rows are deleted. A crash between the two steps
+    leaves rows that are both archived and live; a rerun only deletes those, since rows whose ids
+    are already in their month's partition files are never written again (the chunk boundaries,
+    and so the file names, may differ between runs).
+    """
+    report = ArchiveReport()
+    report.cutoff = (today or date.today()) - timedelta(days=older_than_days)
+    root = os.path.join(archive_dir, "bookings")
+    schema = _schema()
+    started = time.perf_counter()
+    last_id = 0
+    archived = {} # month -> ids in its partition files, read once per run
+    while True:
+        rows = conn.execute(CLOSED_BOOKINGS_QUERY, (last_id, report.cutoff.isoformat(), chunk_size)).fetchall()
+        if not rows:
+            break
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(row[8][:7], []).append(row)
+        for month, month_rows in by_month.items():
+            if month not in archived:
+                archived[month] = _archived_ids(root, month)
+            done = archived[month]
+            new_rows = [row for row in month_rows if row[0] not in done]
+            if new_rows:
+                _write_partition(root, month, new_rows, schema)
+                done.update(row[0] for row in new_rows)
+                report.files += 1
+        with conn:
+            conn.executemany("DELETE FROM bookings WHERE id = ?", [(row[0],) for row in rows])
+        report.archived += len(rows)
+        last_id = rows[-1][0]
+    report.seconds = time.perf_counter() - started
+    return report
+
+def iter_archived_bookings(archive_dir=ARCHIVE_DIR, customer_name=None, car_id=None, status=None,
+                           month_from=None, month_to=None, batch_size=ARCHIVE_CHUNK):
+    """Yield archived bookings as dicts, holding one record batch in memory at a time.
+
+    Month bounds (YYYY-MM, inclusive) prune whole partitions; the other filters are pushed
+    down to the Parquet scan. Rows come out grouped by file, not in global id order.
+    """
+    root = os.path.join(archive_dir, "bookings")
+    if not os.path.isdir(root):
+        return
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    partitioning = ds.partitioning(pa.schema([("month", pa.string())]), flavor="hive")
+    dataset = ds.dataset(root, format="parquet", partitioning=partitioning, schema=_schema().append(pa.field("month", pa.string())))
+    conditions = []
+    if customer_name:
+        conditions.append(ds.field("customer_name") == customer_name)
+    if car_id is not None:
+        conditions.append(ds.field("car_id") == car_id)
+    if status:
+        conditions.append(ds.field("status") == status)
+    if month_from:
+        conditions.append(ds.field("month") >= month_from)
+    if month_to:
+        conditions.append(ds.field("month") <= month_to)
+    condition = None
+    for expression in conditions:
+        condition = expression if condition is None else condition & expression
+    columns = [name for name, _ in ARCHIVE_COLUMNS]
+    for batch in dataset.to_batches(columns=columns, filter=condition, batch_size=batch_size):
+        yield from batch.to_pylist()
+
+def main():
+    import argparse # For the command line entry point
+    from db_connection import get_connection
+    parser = argparse.ArgumentParser(description="Archive closed bookings to Parquet")
+    parser.add_argument("--older-than", type=int, default=ARCHIVE_AFTER_DAYS, help="Age in days of closed bookings to archive")
+    parser.add_argument("--dir", default=ARCHIVE_DIR, help="Archive root directory")
+    parser.add_argument("--db", help="Database file (default: CAR_RENTAL_DB or car_rental.db)")
+    args = parser.parse_args()
+    conn = get_connection(args.db)
+    try:
+        print(f"🗄️ {archive_closed_bookings(conn, args.dir, args.older_than)}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
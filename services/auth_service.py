@@ -0,0 +1,106 @@
+import bcrypt # For password hashing
+import os # For configuration through environment variables
+import secrets # For a fallback signing key
+import threading # Guards lazy creation of the process pool
+import time # For token expiry
+from services.metrics import timed # bcrypt latency histogram
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12")) # bcrypt work factor for new and upgraded hashes
+AUTH_WORKERS = int(os.getenv("AUTH_WORKERS", str(min(4, os.cpu_count() or 1)))) # Processes doing bcrypt work
+SESSION_TTL = int(os.getenv("SESSION_TTL_SECONDS", "3600")) # Session token lifetime in seconds
+TOKEN_ALGORITHM = "HS256"
+
+def _hash_password(password, rounds):
+    # Runs inside a worker process
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _check_password(password, stored_hash):
+    # Runs inside a worker process; raises ValueError for a malformed hash
+    return bcrypt.checkpw(password.encode('utf-8'), stored_hash)
+
+def hash_rounds(stored_hash):
+    # Work factor encoded in a bcrypt hash such as $2b$12$...
+    if isinstance(stored_hash, bytes):
+        stored_hash = stored_hash.decode('utf-8')
+    try:
+        return int(stored_hash.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+class AuthService:
+    """bcrypt hashing in a process pool plus signed, expiring session tokens."""
+
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=AUTH_WORKERS, secret=None, token_ttl=SESSION_TTL):
+        self.rounds = rounds
+        self.workers = workers
+        # Without SESSION_SECRET tokens are only valid for the lifetime of this process
+        self.secret = secret or os.getenv("SESSION_SECRET") or secrets.token_hex(32)
+        self.token_ttl = token_ttl
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Start the worker processes on first use so importing this module stays cheap
+        with self._lock:
+            if self._executor is None:
+                import multiprocessing # For the worker process start method
+                from concurrent.futures import ProcessPoolExecutor # Runs bcrypt outside the service process
+                # spawn, not fork: forking a process that already runs threads can deadlock the child
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def hash_password_async(self, password):
+        return self._pool().submit(_hash_password, password, self.rounds)
+
+    def hash_password(self, password):
+        # Hash a password at the configured work factor without holding this process's GIL
+        with timed("bcrypt_seconds", op="hash"):
+            return self.hash_password_async(password).result()
+
+    def verify_password_async(self, password, stored_hash):
+        if isinstance(stored_hash, str):
+            stored_hash = stored_hash.encode('utf-8')
+        return self._pool().submit(_check_password, password, stored_hash)
+
+    def verify_password(self, password, stored_hash):
+        # Check a password against a stored hash; raises ValueError for a malformed hash
+        with timed("bcrypt_seconds", op="verify"):
+            return self.verify_password_async(password, stored_hash).result()
+
+    def needs_rehash(self, stored_hash):
+        # True when a hash was made with a different work factor than the configured one
+        return hash_rounds(stored_hash) != self.rounds
+
+    def issue_token(self, username, role):
+        # Signed session token; checking it later costs microseconds instead of a bcrypt run
+        now = int(time.time())
+        claims = {"sub": username, "role": role, "iat": now, "exp": now + self.token_ttl}
+        import jwt # PyJWT, for signed session tokens; imported on first use to keep startup fast
+        return jwt.encode(claims, self.secret, algorithm=TOKEN_ALGORITHM)
+
+    def verify_token(self, token):
+        # Return (username, role) for a valid, unexpired token, otherwise None
+        import jwt
+        try:
+            claims = jwt.decode(token, self.secret, algorithms=[TOKEN_ALGORITHM])
+        except jwt.InvalidTokenError:
+            return None
+        return claims["sub"], claims["role"]
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+_default_auth = None
+_default_lock = threading.Lock()
+
+def get_auth_service():
+    # Process-wide AuthService so every RentalService shares one worker pool and signing key
+    global _default_auth
+    with _default_lock:
+        if _default_auth is None:
+            _default_auth = AuthService()
+        return _default_auth
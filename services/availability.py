@@ -0,0 +1,149 @@
+from bisect import bisect_left, bisect_right # Binary search over sorted reservation starts
+from datetime import date, timedelta # For rental date arithmetic
+import threading # Index is shared by every RentalService on the same database
+
+def to_date(value):
+    # Accept a date or an ISO 'YYYY-MM-DD' string
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+def rental_period(start_date, days):
+    # Half-open rental period [start, end): the car is free again on the end date
+    start = to_date(start_date)
+    return start, start + timedelta(days=days)
+
+class CarSchedule:
+    # Reservations of a single car, kept sorted by start day and never overlapping
+    __slots__ = ("starts", "ends", "booking_ids")
+
+    def __init__(self):
+        self.starts = [] # Day ordinals, sorted
+        self.ends = [] # Matching exclusive end ordinals
+        self.booking_ids = []
+
+    def overlaps(self, start, end):
+        # Reservations never overlap each other, so only the one starting just before `end` can clash
+        i = bisect_left(self.starts, end) - 1
+        return i >= 0 and self.ends[i] > start
+
+    def add(self, start, end, booking_id):
+        i = bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.booking_ids.insert(i, booking_id)
+
+    def remove(self, start, booking_id):
+        i = bisect_left(self.starts, start)
+        while i < len(self.starts) and self.starts[i] == start:
+            if self.booking_ids[i] == booking_id:
+                del self.starts[i], self.ends[i], self.booking_ids[i]
+                return True
+            i += 1
+        return False
+
+class AvailabilityIndex:
+    """Per-car sorted interval index of approved reservations, rebuilt from the bookings table."""
+
+    def __init__(self):
+        self._schedules = {} # car_id -> CarSchedule
+        self._booking_cars = {} # booking_id -> (car_id, start ordinal), for removal
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock() # Held across the first load so concurrent services don't each build it
+        self._loaded = False
+
+    def load(self, cursor):
+        # Rebuild the index from approved bookings that haven't ended; bookings can't start in the
+        # past, so finished rentals can never overlap a new one
+        cursor.execute("""
+            SELECT car_id, start_date, end_date, id FROM bookings
+            WHERE status = 'approved' AND start_date IS NOT NULL AND end_date > ?
+            ORDER BY car_id, start_date
+        """, (date.today().isoformat(),))
+        schedules, booking_cars = {}, {}
+        for car_id, start_date, end_date, booking_id in cursor:
+            schedule = schedules.get(car_id)
+            if schedule is None:
+                schedule = schedules[car_id] = CarSchedule()
+            start = to_date(start_date).toordinal()
+            schedule.starts.append(start) # Rows arrive sorted, so append is enough
+            schedule.ends.append(to_date(end_date).toordinal())
+            schedule.booking_ids.append(booking_id)
+            booking_cars[booking_id] = (car_id, start)
+        with self._lock:
+            self._schedules = schedules
+            self._booking_cars = booking_cars
+            self._loaded = True
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def ensure_loaded(self, cursor):
+        # Build the index on first use only; afterwards it is kept current by reserve/release
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self.load(cursor)
+
+    def is_free(self, car_id, start_date, end_date):
+        # True if the car has no approved reservation overlapping [start_date, end_date)
+        start, end = to_date(start_date).toordinal(), to_date(end_date).toordinal()
+        with self._lock:
+            schedule = self._schedules.get(car_id)
+            return schedule is None or not schedule.overlaps(start, end)
+
+    def free_cars(self, car_ids, start_date, end_date):
+        # Filter car_ids down to those free for the whole period
+        start, end = to_date(start_date).toordinal(), to_date(end_date).toordinal()
+        with self._lock:
+            free = []
+            for car_id in car_ids:
+                schedule = self._schedules.get(car_id)
+                if schedule is None or not schedule.overlaps(start, end):
+                    free.append(car_id)
+            return free
+
+    def reserve(self, car_id, start_date, end_date, booking_id):
+        # Record an approved reservation; returns False if it would overlap an existing one
+        start, end = to_date(start_date).toordinal(), to_date(end_date).toordinal()
+        with self._load_lock, self._lock: # Wait out a first load in progress so the change isn't lost
+            if not self._loaded:
+                return True # Not built yet; the first load reads this booking from the table
+            schedule = self._schedules.get(car_id)
+            if schedule is None:
+                schedule = self._schedules[car_id] = CarSchedule()
+            elif schedule.overlaps(start, end):
+                return False
+            schedule.add(start, end, booking_id)
+            self._booking_cars[booking_id] = (car_id, start)
+            return True
+
+    def release(self, booking_id):
+        # Drop a reservation (rejected, returned or deleted booking)
+        with self._load_lock, self._lock:
+            entry = self._booking_cars.pop(booking_id, None)
+            if entry is None:
+                return False
+            car_id, start = entry
+            return self._schedules[car_id].remove(start, booking_id)
+
+    def drop_car(self, car_id):
+        # Forget every reservation of a deleted car
+        with self._load_lock, self._lock:
+            schedule = self._schedules.pop(car_id, None)
+            if schedule:
+                for booking_id in schedule.booking_ids:
+                    self._booking_cars.pop(booking_id, None)
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_availability_index(db_path):
+    # One index per database file, shared like the inventory cache, so every service sees every reservation
+    with _indexes_lock:
+        index = _indexes.get(db_path)
+        if index is None:
+            index = _indexes[db_path] = AvailabilityIndex()
+        return index
@@ -0,0 +1,192 @@
+import json # For JSON Lines bill output
+import os # For output paths and atomic checkpoint writes
+import time # For throughput reporting
+from string import Template # Precompiled bill template
+
+TAX_RATE = float(os.getenv("CAR_RENTAL_TAX_RATE", "0.10")) # Sales tax applied to every bill
+BILL_FORMATS = ("dir", "zip", "jsonl")
+BILLING_CHUNK = 1000 # Bookings fetched, rendered and checkpointed together
+
+BILL_TEMPLATE = Template("""
+===== Car Rental Bill =====
+
+Customer Name: $customer_name
+Car: $make $model ($year)
+Rental Duration: $days days
+Rate per day: $$$rate
+-----------------------------
+Subtotal: $$$subtotal
+Tax ($tax_percent%): $$$tax
+-----------------------------
+Total Amount Due: $$$total
+
+Status: Approved
+
+Thank you for renting with us!
+=============================
+""")
+
+# Approved (or approved and since returned) bookings joined to their cars, streamed in id order so a run can resume after any id
+APPROVED_BILLS_QUERY = """
+    SELECT b.id, b.customer_name, b.days, b.total_fee, c.make, c.model, c.year, c.rate
+    FROM bookings b
+    JOIN cars c ON b.car_id = c.id
+    WHERE b.status IN ('approved', 'returned') AND b.id > ?
+    ORDER BY b.id
+"""
+
+class TaxRule:
+    # A tax or fee charged as a share of the rental subtotal, optionally only for some rental lengths
+    __slots__ = ("name", "rate", "min_days", "max_days")
+
+    def __init__(self, name, rate, min_days=1, max_days=None):
+        self.name = name
+        self.rate = rate
+        self.min_days = min_days
+        self.max_days = max_days # None: no upper limit
+
+    def applies(self, days):
+        # Whether the rule covers a rental of `days` days; also works element-wise on a NumPy array
+        covered = days >= self.min_days
+        return covered if self.max_days is None else covered & (days <= self.max_days)
+
+    def __repr__(self):
+        return f"TaxRule({self.name!r}, {self.rate}, {self.min_days}, {self.max_days})"
+
+def load_tax_rules(text=None):
+    """Tax rules from JSON, by default the CAR_RENTAL_TAX_RULES environment variable.
+
+    The JSON is a list such as [{"name": "Sales tax", "rate": 0.1}, {"name": "Short-stay fee",
+    "rate": 0.05, "max_days": 2}]. Without it, TAX_RATE is charged on every rental.
+    """
+    text = text if text is not None else os.getenv("CAR_RENTAL_TAX_RULES")
+    if not text:
+        return [TaxRule("Sales tax", TAX_RATE)]
+    return [TaxRule(rule["name"], float(rule["rate"]), int(rule.get("min_days", 1)),
+                    int(rule["max_days"]) if rule.get("max_days") is not None else None)
+            for rule in json.loads(text)]
+
+TAX_RULES = load_tax_rules() # Rules used by bills and quotes unless a caller passes its own
+
+def tax_rate_for(days, rules=None):
+    # Combined tax rate of a rental length (or a NumPy array of lengths)
+    return sum(rule.rate * rule.applies(days) for rule in (TAX_RULES if rules is None else rules))
+
+def render_bill(customer_name, days, total_fee, make, model, year, rate, tax_rate=None):
+    # Fill the precompiled template for one booking (tax from the tax rules unless tax_rate is given)
+    if tax_rate is None:
+        tax_rate = tax_rate_for(days)
+    tax_amount = total_fee * tax_rate
+    return BILL_TEMPLATE.substitute(
+        customer_name=customer_name, make=make, model=model, year=year, days=days,
+        rate=f"{rate:.2f}", subtotal=f"{total_fee:.2f}", tax_percent=f"{tax_rate * 100:g}",
+        tax=f"{tax_amount:.2f}", total=f"{total_fee + tax_amount:.2f}")
+
+def bill_filename(booking_id):
+    return f"bill_booking_{booking_id}.txt"
+
+class BillingReport:
+    # Outcome of a batch billing run
+    def __init__(self):
+        self.bills = 0
+        self.resumed_after = 0 # Last booking id billed by an earlier run
+        self.seconds = 0.0
+
+    @property
+    def bills_per_second(self):
+        return self.bills / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        resumed = f" (resumed after booking {self.resumed_after})" if self.resumed_after else ""
+        return f"{self.bills} bill(s) written in {self.seconds:.2f}s ({self.bills_per_second:,.0f} bills/s){resumed}"
+
+def _read_checkpoint(path):
+    # (last booking id billed, output size in bytes at that point or None) from an earlier run
+    try:
+        with open(path) as f:
+            fields = f.read().split()
+        return int(fields[0]), int(fields[1]) if len(fields) > 1 else None
+    except (OSError, ValueError, IndexError):
+        return 0, None
+
+def _write_checkpoint(path, booking_id, size=None):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(str(booking_id) if size is None else f"{booking_id} {size}")
+    os.replace(tmp, path) # Atomic, so a crash never leaves a half-written checkpoint
+
+def _write_file(directory, booking_id, bill):
+    with open(os.path.join(directory, bill_filename(booking_id)), "w") as f:
+        f.write(bill)
+
+def _archive_last_id(path):
+    # Last booking id billed into a zip output. Chunks are appended in id order and the archive is
+    # closed after each one, so its own entries say where to resume; 0 when it has no readable
+    # central directory (a crash while a chunk was being appended), which means rebuilding it
+    import zipfile
+    try:
+        with zipfile.ZipFile(path) as archive:
+            return max((int(name[len("bill_booking_"):-len(".txt")]) for name in archive.namelist()), default=0)
+    except (OSError, ValueError, zipfile.BadZipFile):
+        return 0
+
+def run_batch_billing(conn, output, fmt="dir", workers=4, resume=True, chunk_size=BILLING_CHUNK):
+    """Render bills for every approved booking into a directory, a zip archive or a JSONL file.
+
+    Progress is checkpointed after each chunk in '<output>.checkpoint', so an interrupted run
+    picks up after the last booking it finished when run again with resume=True. Each chunk is
+    fully written first: the zip archive is closed (writing its central directory) and the JSONL
+    size is recorded, so resuming never loses or duplicates bills.
+    """
+    if fmt not in BILL_FORMATS:
+        raise ValueError(f"Unsupported billing output '{fmt}'. Use one of: {', '.join(BILL_FORMATS)}.")
+    checkpoint = output.rstrip("/\\") + ".checkpoint"
+    report = BillingReport()
+    last_id, size = _read_checkpoint(checkpoint) if resume else (0, None)
+    if fmt == "zip" and last_id:
+        last_id = _archive_last_id(output) # Also covers a chunk that was written but not yet checkpointed
+    report.resumed_after = last_id
+    started = time.perf_counter()
+
+    if fmt == "dir":
+        os.makedirs(output, exist_ok=True)
+        from concurrent.futures import ThreadPoolExecutor # Batch-billing only; kept out of startup imports
+        sink = ThreadPoolExecutor(max_workers=workers) # File opens/writes overlap across threads
+    elif fmt == "zip":
+        import zipfile # For single-archive bill output
+        sink = None # Reopened per chunk
+        if not last_id:
+            zipfile.ZipFile(output, "w").close() # Start from an empty archive
+    else:
+        sink = open(output, "a" if last_id else "w", encoding="utf-8")
+        if last_id and size is not None:
+            sink.truncate(size) # Drop lines written after the last checkpoint by an interrupted run
+
+    try:
+        cursor = conn.execute(APPROVED_BILLS_QUERY, (last_id,))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            bills = [(row[0], row[1], render_bill(*row[1:])) for row in rows]
+            if fmt == "dir":
+                list(sink.map(lambda bill: _write_file(output, bill[0], bill[2]), bills)) # Wait for the chunk
+            elif fmt == "zip":
+                with zipfile.ZipFile(output, "a", compression=zipfile.ZIP_DEFLATED) as archive:
+                    for booking_id, _, bill in bills:
+                        archive.writestr(bill_filename(booking_id), bill)
+            else:
+                sink.writelines(json.dumps({"booking_id": booking_id, "customer_name": customer_name, "bill": bill}) + "\n"
+                                for booking_id, customer_name, bill in bills)
+                sink.flush()
+                size = os.fstat(sink.fileno()).st_size
+            last_id = rows[-1][0]
+            _write_checkpoint(checkpoint, last_id, size if fmt == "jsonl" else None)
+            report.bills += len(rows)
+    finally:
+        if fmt == "dir":
+            sink.shutdown()
+        elif sink:
+            sink.close()
+    report.seconds = time.perf_counter() - started
+    return report
@@ -1,12 +1,36 @@
-import smtplib # For sending emails
-from email.mime.text import MIMEText # For creating email content
-from email.mime.multipart import MIMEMultipart # For creating multipart emails
 import os # For accessing environment variables
-from dotenv import load_dotenv # For loading environment variables from a .env file
+import threading # For the background outbox sender
+import time # For retry backoff timestamps
+from services.metrics import timed # Email send latency histogram
+# smtplib and the email package are imported only when a message is actually sent: they are
+# among the slowest imports at startup, and dry runs and outbox writes never need them.
 
-load_dotenv() # Load environment variables from .env file
+ENV_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env") # Project .env
 
-def send_email(to_address, subject, body, dry_run=False): 
+def load_env(path=ENV_FILE):
+    # Load the project .env file; python-dotenv is only imported when there is a file to read
+    if os.path.exists(path):
+        from dotenv import load_dotenv
+        load_dotenv(path)
+
+load_env() # Load environment variables from .env file
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com") # SMTP server used for outgoing mail
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465")) # SSL port of the SMTP server
+SEND_LEASE = 300.0 # Seconds a claimed batch belongs to one sender before another may take it over
+
+def build_message(from_address, to_address, subject, body):
+    # Build a plain-text email message
+    from email.mime.text import MIMEText # For creating email content
+    from email.mime.multipart import MIMEMultipart # For creating multipart emails
+    msg = MIMEMultipart() # Create a multipart email message
+    msg["From"] = from_address # Set the sender's email address
+    msg["To"] = to_address # Set the recipient's email address
+    msg["Subject"] = subject # Set the email subject
+    msg.attach(MIMEText(body, "plain")) # Attach the email body as plain text
+    return msg
+
+def send_email(to_address, subject, body, dry_run=False):
     """Send email using Gmail SMTP with environment-secured credentials or simulate in dry-run."""
     if dry_run: # If dry_run is True, simulate email sending without actually sending it
         print(f"📧 [DRY RUN] Email to {to_address} with subject '{subject}' would be sent here.")
@@ -19,18 +43,178 @@ def send_email(to_address, subject, body, dry_run=False):
         print("Email credentials not found in environment variables.") # If credentials are not set, print an error message
         return False
 
-    msg = MIMEMultipart() # Create a multipart email message
-    msg["From"] = from_address # Set the sender's email address
-    msg["To"] = to_address # Set the recipient's email address
-    msg["Subject"] = subject # Set the email subject
-    msg.attach(MIMEText(body, "plain")) # Attach the email body as plain text
+    msg = build_message(from_address, to_address, subject, body)
 
+    import smtplib # For sending emails
     try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server: # Connect to Gmail's SMTP server using SSL
+        with timed("email_send_seconds", path="direct"), smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT) as server: # Connect to Gmail's SMTP server using SSL
             server.login(from_address, password) # Log in to the SMTP server with the sender's credentials
             server.send_message(msg) # Send the email message
-        print("📧 Confirmation email sent.") 
+        print("📧 Confirmation email sent.")
         return True # Return True if email was sent successfully
     except Exception as e: # Catch any exceptions that occur during the email sending process
         print(f"❌ Email sending failed: {e}") # Print the error message if email sending fails
         return False
+
+def queue_email(cursor, to_address, subject, body):
+    """Write an email to the outbox using the caller's cursor, so it commits (or rolls back) with the caller's transaction."""
+    cursor.execute("""
+        INSERT INTO email_outbox (to_address, subject, body, next_attempt_at)
+        VALUES (?, ?, ?, ?)
+    """, (to_address, subject, body, time.time()))
+    return cursor.lastrowid
+
+def open_smtp_session():
+    """Open and authenticate one SMTP session for a whole outbox batch."""
+    from_address = os.getenv("EMAIL_USER")
+    password = os.getenv("EMAIL_PASS")
+    if not from_address or not password:
+        raise RuntimeError("Email credentials not found in environment variables.")
+    import smtplib
+    server = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT)
+    try:
+        server.login(from_address, password)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+class OutboxWorker(threading.Thread):
+    """Background thread that drains email_outbox in batches over a single reused SMTP session."""
+
+    def __init__(self, pool=None, batch_size=50, poll_interval=5.0, max_attempts=5,
+                 base_backoff=2.0, max_backoff=600.0, dry_run=False, smtp_factory=None, lease=SEND_LEASE):
+        super().__init__(name="email-outbox", daemon=True)
+        if pool is None:
+            from db_connection import get_pool # Imported here to keep the email module free of database imports
+            pool = get_pool()
+        self.pool = pool
+        self.batch_size = batch_size # Messages sent per SMTP session
+        self.poll_interval = poll_interval # Seconds between polls when nobody wakes the worker
+        self.max_attempts = max_attempts # Give up (status 'failed') after this many tries
+        self.base_backoff = base_backoff # First retry delay in seconds, doubled per attempt
+        self.max_backoff = max_backoff
+        self.dry_run = dry_run
+        self.smtp_factory = smtp_factory or open_smtp_session # Swap in a fake transport for local testing
+        self.lease = lease # Longer than one batch takes to send, or a slow batch could be sent twice
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self.stats = {"sent": 0, "retried": 0, "failed": 0, "batches": 0}
+
+    def wake(self):
+        # Ask the worker to drain now instead of waiting for the next poll
+        self._wakeup.set()
+
+    def stop(self, timeout=10):
+        # Drain what is due, then stop the thread
+        self._stopping.set()
+        self._wakeup.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                while self.drain_once() == self.batch_size: # Keep going while full batches come back
+                    pass
+            except Exception as e:
+                print(f"❌ Email outbox error: {e}")
+            if self._stopping.is_set():
+                break
+
+    def drain_once(self):
+        """Send one batch of due messages; returns how many messages were attempted."""
+        with self.pool.connection() as conn:
+            rows = self._claim(conn)
+            if not rows:
+                return 0
+            self.stats["batches"] += 1
+
+            if self.dry_run:
+                for msg_id, to_address, subject, _, _ in rows:
+                    print(f"📧 [DRY RUN] Email to {to_address} with subject '{subject}' would be sent here.")
+                self._mark_sent(conn, [row[0] for row in rows])
+                return len(rows)
+
+            try:
+                server = self.smtp_factory()
+            except Exception as e: # Could not connect or log in: retry the whole batch later
+                self._mark_retry(conn, rows, str(e))
+                return len(rows)
+
+            import smtplib # Only reached when real mail goes out
+            sent, failed = [], []
+            try:
+                from_address = os.getenv("EMAIL_USER", "")
+                for position, row in enumerate(rows):
+                    msg_id, to_address, subject, body, _ = row
+                    try:
+                        with timed("email_send_seconds", path="outbox"):
+                            server.send_message(build_message(from_address, to_address, subject, body))
+                        sent.append(msg_id)
+                    except smtplib.SMTPServerDisconnected as e: # Session is gone: the rest of the batch waits for the retry
+                        failed.extend(rows[position:]) # Earlier rows are already in `sent` or `failed`
+                        error = str(e)
+                        break
+                    except Exception as e:
+                        failed.append(row)
+                        error = str(e)
+            finally:
+                try:
+                    server.quit()
+                except Exception:
+                    pass
+
+            self._mark_sent(conn, sent)
+            if failed:
+                self._mark_retry(conn, failed, error)
+            return len(rows)
+
+    def _claim(self, conn):
+        # Take a batch of due messages (and expired leases) for this sender. Selecting and marking
+        # them 'sending' under one write lock keeps every other worker on the outbox off them.
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute("""
+                SELECT id, to_address, subject, body, attempts FROM email_outbox
+                WHERE status IN ('pending', 'sending') AND next_attempt_at <= ?
+                ORDER BY next_attempt_at LIMIT ?
+            """, (now, self.batch_size)).fetchall()
+            conn.executemany("UPDATE email_outbox SET status = 'sending', next_attempt_at = ? WHERE id = ?",
+                             [(now + self.lease, row[0]) for row in rows])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return rows
+
+    def _mark_sent(self, conn, ids):
+        if not ids:
+            return
+        conn.executemany("UPDATE email_outbox SET status = 'sent', attempts = attempts + 1 WHERE id = ?",
+                         [(msg_id,) for msg_id in ids])
+        conn.commit()
+        self.stats["sent"] += len(ids)
+
+    def _mark_retry(self, conn, rows, error):
+        now = time.time()
+        updates = []
+        for msg_id, _, _, _, attempts in rows:
+            attempts += 1
+            if attempts >= self.max_attempts:
+                status = 'failed'
+                self.stats["failed"] += 1
+            else:
+                status = 'pending'
+                self.stats["retried"] += 1
+            delay = min(self.base_backoff * (2 ** (attempts - 1)), self.max_backoff) # Exponential backoff
+            updates.append((status, attempts, now + delay, error, msg_id))
+        conn.executemany("""
+            UPDATE email_outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?
+            WHERE id = ?
+        """, updates)
+        conn.commit()
+        print(f"⚠️ {len(rows)} email(s) will be retried later: {error}")
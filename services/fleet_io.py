@@ -0,0 +1,154 @@
+import csv # For CSV import/export
+import json # For JSON Lines import/export
+import os # For file extension handling
+import time # For throughput reporting
+from datetime import date # For validating model years
+
+CAR_COLUMNS = ["make", "model", "year", "mileage", "rate", "min_days", "max_days", "available"]
+EXPORT_COLUMNS = ["id"] + CAR_COLUMNS
+FORMATS = ("csv", "jsonl", "parquet")
+CHUNK_SIZE = 10000 # Rows validated and written per transaction
+
+class ImportReport:
+    # Outcome of a bulk import: counts, per-row errors and throughput
+    def __init__(self):
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = [] # (row number, message) for every rejected row
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return (self.inserted + self.rejected) / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (f"{self.inserted} car(s) imported, {self.rejected} rejected "
+                f"in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/s)")
+
+def detect_format(path, fmt=None):
+    # Use an explicit format or fall back to the file extension
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".")).lower()
+    if fmt == "json":
+        fmt = "jsonl"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported fleet file format '{fmt}'. Use one of: {', '.join(FORMATS)}.")
+    return fmt
+
+def validate_car(record):
+    # Turn one raw record into an INSERT parameter tuple, raising ValueError on bad data
+    if "_invalid_json" in record:
+        raise ValueError(f"invalid JSON: {record['_invalid_json']}")
+    make = str(record.get("make") or "").strip()
+    model = str(record.get("model") or "").strip()
+    if not make or not model:
+        raise ValueError("make and model are required")
+    try:
+        year = int(record["year"])
+        mileage = int(record["mileage"])
+        rate = float(record["rate"])
+        min_days = int(record["min_days"])
+        max_days = int(record["max_days"])
+    except KeyError as e:
+        raise ValueError(f"missing column {e}")
+    except (TypeError, ValueError):
+        raise ValueError("year, mileage, rate, min_days and max_days must be numbers")
+    available = record.get("available")
+    available = 1 if available in (None, "") else int(str(available).strip().lower() in ("1", "true", "yes"))
+    if not 1900 <= year <= date.today().year + 1:
+        raise ValueError(f"year {year} out of range")
+    if mileage < 0:
+        raise ValueError("mileage cannot be negative")
+    if rate <= 0:
+        raise ValueError("rate must be positive")
+    if min_days < 1 or max_days < min_days:
+        raise ValueError("min_days must be at least 1 and not above max_days")
+    return (make, model, year, mileage, rate, min_days, max_days, available)
+
+def _read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        for record in csv.DictReader(f):
+            yield record
+
+def _read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            try:
+                yield json.loads(line) if line else {}
+            except json.JSONDecodeError as e: # Report the bad line instead of aborting the import
+                yield {"_invalid_json": str(e)}
+
+def _read_parquet(path):
+    import pyarrow.parquet as pq # Only needed for Parquet files
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=CHUNK_SIZE):
+        yield from batch.to_pylist()
+
+READERS = {"csv": _read_csv, "jsonl": _read_jsonl, "parquet": _read_parquet}
+
+def import_cars(conn, path, fmt=None, chunk_size=CHUNK_SIZE):
+    """Stream cars from a CSV/JSONL/Parquet file into the cars table, one transaction per chunk."""
+    reader = READERS[detect_format(path, fmt)]
+    report = ImportReport()
+    started = time.perf_counter()
+    chunk = []
+    for row_number, record in enumerate(reader(path), start=1):
+        try:
+            chunk.append(validate_car(record))
+        except ValueError as e:
+            report.rejected += 1
+            report.errors.append((row_number, str(e)))
+        if len(chunk) >= chunk_size:
+            _write_chunk(conn, chunk)
+            report.inserted += len(chunk)
+            chunk = []
+    if chunk:
+        _write_chunk(conn, chunk)
+        report.inserted += len(chunk)
+    report.seconds = time.perf_counter() - started
+    return report
+
+def _write_chunk(conn, rows):
+    with conn: # Commits the whole chunk at once, or rolls it back on error
+        conn.executemany("""
+            INSERT INTO cars (make, model, year, mileage, rate, min_days, max_days, available)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows)
+
+def _iter_car_chunks(conn, chunk_size):
+    cursor = conn.execute(f"SELECT {', '.join(EXPORT_COLUMNS)} FROM cars ORDER BY id")
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield rows
+
+def export_cars(conn, path, fmt=None, chunk_size=CHUNK_SIZE):
+    """Stream the whole fleet out to CSV/JSONL/Parquet; returns (row count, seconds)."""
+    fmt = detect_format(path, fmt)
+    started = time.perf_counter()
+    count = 0
+    if fmt == "csv":
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            for rows in _iter_car_chunks(conn, chunk_size):
+                writer.writerows(rows)
+                count += len(rows)
+    elif fmt == "jsonl":
+        with open(path, "w", encoding="utf-8") as f:
+            for rows in _iter_car_chunks(conn, chunk_size):
+                f.writelines(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in rows)
+                count += len(rows)
+    else:
+        import pyarrow as pa # Only needed for Parquet files
+        import pyarrow.parquet as pq
+        schema = pa.schema([("id", pa.int64()), ("make", pa.string()), ("model", pa.string()),
+                            ("year", pa.int32()), ("mileage", pa.int64()), ("rate", pa.float64()),
+                            ("min_days", pa.int32()), ("max_days", pa.int32()), ("available", pa.int8())])
+        with pq.ParquetWriter(path, schema) as writer:
+            for rows in _iter_car_chunks(conn, chunk_size):
+                columns = list(zip(*rows))
+                writer.write_batch(pa.RecordBatch.from_arrays(
+                    [pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema))
+                count += len(rows)
+    return count, time.perf_counter() - started
@@ -0,0 +1,259 @@
+import os # For snapshot TTL configuration
+import threading # Snapshot is shared by every RentalService on the same database
+import time # For snapshot age
+from models.car import Car # Result views
+
+np = None # NumPy (columnar storage and vectorized filters), imported by the first load() to keep startup fast
+
+SNAPSHOT_TTL = float(os.getenv("FLEET_SNAPSHOT_TTL", "300")) # Seconds before a full reload (catches other processes' writes)
+SORT_KEYS = ("rate", "year", "mileage", "id")
+LOAD_CHUNK = 10000 # Rows fetched per round trip while loading
+COMPACT_RATIO = 0.25 # Compact once this share of slots belongs to deleted cars
+
+# Column name -> dtype; make/model hold codes into the snapshot's string table
+COLUMNS = {"id": "int64", "make": "int32", "model": "int32", "year": "int32", "mileage": "int64",
+           "rate": "float64", "min_days": "int32", "max_days": "int32", "available": "bool", "live": "bool"}
+
+def _import_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+class FleetSnapshot:
+    """Cars held column by column in NumPy arrays, sorted by id, for vectorized search.
+
+    Writes made through RentalService are applied row by row with refresh_cars(); anything
+    else is picked up by the full reload every SNAPSHOT_TTL seconds or after invalidate().
+    """
+
+    def __init__(self, ttl=SNAPSHOT_TTL):
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._cols = None # Column arrays, created by the first load()
+        self._size = 0 # Used slots; slots past this are spare capacity
+        self._dead = 0 # Slots of deleted cars awaiting compaction
+        self._strings = [] # code -> make/model text
+        self._string_codes = {} # make/model text -> code
+        self._loaded_at = None
+        self.stats = {"loads": 0, "refreshed_rows": 0, "searches": 0}
+
+    def __len__(self):
+        return self._size - self._dead
+
+    def _code(self, text):
+        code = self._string_codes.get(text)
+        if code is None:
+            code = self._string_codes[text] = len(self._strings)
+            self._strings.append(text)
+        return code
+
+    def _codes_matching(self, text):
+        # Codes whose text equals `text`, ignoring case
+        text = text.strip().lower()
+        return [code for code, value in enumerate(self._strings) if value.lower() == text]
+
+    def _reserve(self, capacity):
+        # Grow every column to at least `capacity` slots, doubling to keep appends amortized O(1)
+        current = len(self._cols["id"])
+        if capacity <= current:
+            return
+        new_capacity = max(capacity, current * 2, 1024)
+        for name, column in self._cols.items():
+            grown = np.zeros(new_capacity, column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._cols[name] = grown
+
+    def load(self, conn):
+        # Full rebuild from the cars table
+        with self._lock:
+            if self._cols is None:
+                _import_numpy()
+                self._cols = {name: np.empty(0, dtype) for name, dtype in COLUMNS.items()}
+            self._size = self._dead = 0
+            self._strings, self._string_codes = [], {}
+            cursor = conn.execute("SELECT * FROM cars ORDER BY id")
+            while True:
+                rows = cursor.fetchmany(LOAD_CHUNK)
+                if not rows:
+                    break
+                self._reserve(self._size + len(rows))
+                ids, makes, models, years, mileages, rates, min_days, max_days, available = zip(*rows)
+                end = self._size + len(rows)
+                cols = self._cols
+                cols["id"][self._size:end] = ids
+                cols["make"][self._size:end] = [self._code(make) for make in makes]
+                cols["model"][self._size:end] = [self._code(model) for model in models]
+                cols["year"][self._size:end] = years
+                cols["mileage"][self._size:end] = mileages
+                cols["rate"][self._size:end] = rates
+                cols["min_days"][self._size:end] = min_days
+                cols["max_days"][self._size:end] = max_days
+                cols["available"][self._size:end] = [bool(flag) for flag in available]
+                cols["live"][self._size:end] = True
+                self._size = end
+            self._loaded_at = time.monotonic()
+            self.stats["loads"] += 1
+
+    def ensure_loaded(self, conn):
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+                self.load(conn)
+
+    def invalidate(self):
+        # Force a full reload on the next search (e.g. after a bulk import)
+        with self._lock:
+            self._loaded_at = None
+
+    def refresh_cars(self, conn, car_ids):
+        # Re-read only these cars after a write; ids no longer in the table are dropped
+        with self._lock:
+            if self._loaded_at is None: # Nothing loaded yet: the next search loads everything anyway
+                return
+            car_ids = list(car_ids)
+            placeholders = ", ".join("?" * len(car_ids))
+            rows = conn.execute(f"SELECT * FROM cars WHERE id IN ({placeholders})", car_ids).fetchall()
+            for row in rows:
+                self._upsert(row)
+            for car_id in set(car_ids) - {row[0] for row in rows}:
+                self._remove(car_id)
+            self.stats["refreshed_rows"] += len(car_ids)
+            if self._dead > COMPACT_RATIO * max(self._size, 1):
+                self._compact()
+
+    def _position(self, car_id):
+        # Slot of car_id, or None
+        ids = self._cols["id"][:self._size]
+        pos = int(np.searchsorted(ids, car_id))
+        return pos if pos < self._size and ids[pos] == car_id else None
+
+    def _upsert(self, row):
+        car_id, make, model, year, mileage, rate, min_days, max_days, available = row
+        cols = self._cols
+        pos = self._position(car_id)
+        if pos is None:
+            pos = int(np.searchsorted(cols["id"][:self._size], car_id))
+            self._reserve(self._size + 1)
+            if pos < self._size: # New ids are normally the largest; otherwise shift the tail to keep id order
+                for column in cols.values():
+                    column[pos + 1:self._size + 1] = column[pos:self._size]
+            self._size += 1
+        elif not cols["live"][pos]:
+            self._dead -= 1
+        cols["id"][pos] = car_id
+        cols["make"][pos] = self._code(make)
+        cols["model"][pos] = self._code(model)
+        cols["year"][pos] = year
+        cols["mileage"][pos] = mileage
+        cols["rate"][pos] = rate
+        cols["min_days"][pos] = min_days
+        cols["max_days"][pos] = max_days
+        cols["available"][pos] = bool(available)
+        cols["live"][pos] = True
+
+    def _remove(self, car_id):
+        pos = self._position(car_id)
+        if pos is not None and self._cols["live"][pos]:
+            self._cols["live"][pos] = False # Tombstone; compacted later
+            self._dead += 1
+
+    def _compact(self):
+        keep = self._cols["live"][:self._size].copy()
+        kept = int(keep.sum())
+        for column in self._cols.values():
+            column[:kept] = column[:self._size][keep]
+        self._size, self._dead = kept, 0
+
+    def _mask(self, make=None, model=None, year_min=None, year_max=None, max_mileage=None,
+              rate_min=None, rate_max=None, days=None, available_only=True):
+        n, cols = self._size, self._cols
+        mask = cols["live"][:n].copy()
+        if available_only:
+            mask &= cols["available"][:n]
+        for text, name in ((make, "make"), (model, "model")):
+            if text:
+                codes = self._codes_matching(text)
+                mask &= np.isin(cols[name][:n], codes) if len(codes) > 1 else cols[name][:n] == (codes[0] if codes else -1)
+        if year_min is not None:
+            mask &= cols["year"][:n] >= year_min
+        if year_max is not None:
+            mask &= cols["year"][:n] <= year_max
+        if max_mileage is not None:
+            mask &= cols["mileage"][:n] <= max_mileage
+        if rate_min is not None:
+            mask &= cols["rate"][:n] >= rate_min
+        if rate_max is not None:
+            mask &= cols["rate"][:n] <= rate_max
+        if days is not None: # Car must allow a rental of exactly this many days
+            mask &= (cols["min_days"][:n] <= days) & (cols["max_days"][:n] >= days)
+        return mask
+
+    def search_ids(self, conn, limit=None, sort="rate", descending=False, **filters):
+        """Ids of matching cars ordered by `sort` (ties by id); only the top `limit` are sorted."""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unsupported sort key '{sort}'. Use one of: {', '.join(SORT_KEYS)}.")
+        with self._lock:
+            self.ensure_loaded(conn)
+            self.stats["searches"] += 1
+            matches = np.flatnonzero(self._mask(**filters))
+            ids = self._cols["id"]
+            keys = self._cols[sort][matches]
+            if descending:
+                keys = -keys
+            if limit is not None and limit < len(matches):
+                # O(n) selection of the k-th key, then sort only rows up to it (ties included, so the id tie-break holds)
+                kth = np.partition(keys, limit - 1)[limit - 1]
+                top = keys <= kth
+                matches, keys = matches[top], keys[top]
+            order = np.lexsort((ids[matches], keys))[:limit]
+            return ids[matches[order]]
+
+    def cars(self, car_ids):
+        # Car views for ids in the snapshot, in the given order
+        with self._lock:
+            if self._cols is None:
+                return []
+            cols, strings, n = self._cols, self._strings, self._size
+            car_ids = np.asarray(car_ids, dtype=np.int64)
+            pos = np.minimum(np.searchsorted(cols["id"][:n], car_ids), max(n - 1, 0))
+            pos = pos[(cols["id"][pos] == car_ids) & cols["live"][pos]] if n else pos[:0]
+            # One gather per column, then plain Python values
+            rows = zip(*(cols[name][pos].tolist() for name in
+                         ("id", "make", "model", "year", "mileage", "rate", "available", "min_days", "max_days")))
+            return [Car(car_id, strings[make], strings[model], year, mileage, rate, available, min_days, max_days)
+                    for car_id, make, model, year, mileage, rate, available, min_days, max_days in rows]
+
+    def gather(self, conn, car_ids, names):
+        # (found, {name: values}) for car ids in the given order; `found` marks ids of cars in the snapshot
+        with self._lock:
+            self.ensure_loaded(conn)
+            cols, n = self._cols, self._size
+            car_ids = np.asarray(car_ids, dtype=np.int64)
+            if not n:
+                return np.zeros(len(car_ids), bool), {name: np.zeros(len(car_ids), COLUMNS[name]) for name in names}
+            pos = np.minimum(np.searchsorted(cols["id"][:n], car_ids), n - 1)
+            found = (cols["id"][pos] == car_ids) & cols["live"][pos]
+            return found, {name: cols[name][pos] for name in names}
+
+    def select(self, conn, names, **filters):
+        # {name: values} of every car matching the search filters (as in search_ids), in id order
+        with self._lock:
+            self.ensure_loaded(conn)
+            matches = np.flatnonzero(self._mask(**filters))
+            return {name: self._cols[name][matches] for name in names}
+
+    def search(self, conn, limit=20, sort="rate", descending=False, **filters):
+        # Top `limit` matching cars as Car objects
+        with self._lock:
+            return self.cars(self.search_ids(conn, limit, sort, descending, **filters))
+
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+def get_fleet_snapshot(db_path):
+    # One snapshot per database file, shared like the inventory cache
+    with _snapshots_lock:
+        snapshot = _snapshots.get(db_path)
+        if snapshot is None:
+            snapshot = _snapshots[db_path] = FleetSnapshot()
+        return snapshot
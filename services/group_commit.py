@@ -0,0 +1,102 @@
+# Optional group commit for concurrent writers.
+# Writers hand RentalService calls to one committer thread instead of committing on their own
+# connections. Every call that queued up while the previous commit ran becomes one transaction,
+# each call in its own savepoint, so many writers share one commit and one write lock.
+import os # For environment variable handling
+import queue # Hand-off between writers and the committer thread
+import threading # Committer thread
+import time # For the batching window
+from concurrent.futures import Future # Per-call result handed back to the writer
+from services.rental_service import RentalService # The committer's own service and connection
+
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("CAR_RENTAL_GROUP_COMMIT_MS", "0")) # Extra time a batch stays open after its first call
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("CAR_RENTAL_GROUP_COMMIT_BATCH", "256")) # Calls per commit at most
+
+class GroupCommitter:
+    """Batch concurrent RentalService writes into shared commits.
+
+        committer = GroupCommitter(pool)
+        booking_id = committer.call("book_car", "alice", car_id, 3)
+
+    call() returns only after the batch holding the call has committed, so a result is never
+    reported for work that could still be lost. A call that raises is rolled back to its
+    savepoint and re-raised in its writer, without affecting the rest of the batch.
+
+    With the default window_ms=0 a batch is whatever queued up while the previous commit ran,
+    which adds no latency. A positive window waits that long for more calls, which only pays
+    off when writers arrive spread out rather than back to back.
+    """
+    def __init__(self, pool=None, window_ms=GROUP_COMMIT_WINDOW_MS, max_batch=GROUP_COMMIT_MAX_BATCH):
+        self.service = RentalService(pool)
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.stats = {"calls": 0, "batches": 0, "failed_calls": 0, "failed_batches": 0}
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, method_name, *args, **kwargs):
+        # Queue one RentalService call; the Future resolves once its batch has committed
+        if self._closed:
+            raise RuntimeError("Group committer is closed.")
+        future = Future()
+        self._queue.put((future, method_name, args, kwargs))
+        return future
+
+    def call(self, method_name, *args, **kwargs):
+        # Blocking form of submit()
+        return self.submit(method_name, *args, **kwargs).result()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    remaining = deadline - time.monotonic()
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch):
+        outcomes = []
+        try:
+            with self.service.transaction():
+                for future, method_name, args, kwargs in batch:
+                    try:
+                        with self.service.transaction(): # Savepoint: a failing call only undoes itself
+                            outcomes.append((future, getattr(self.service, method_name)(*args, **kwargs), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+        except Exception as e: # The commit itself failed, so nothing in the batch happened
+            self.stats["failed_batches"] += 1
+            for future, *_ in batch:
+                future.set_exception(e)
+            return
+        self.stats["batches"] += 1
+        self.stats["calls"] += len(batch)
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                self.stats["failed_calls"] += 1
+                future.set_exception(error)
+
+    def close(self):
+        # Commit whatever is queued, stop the committer thread and release its connection
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        self.service.close()
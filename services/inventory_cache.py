@@ -0,0 +1,90 @@
+import os # For cache size/TTL configuration
+import threading # Cache is shared by every RentalService on the same database
+from cachetools import TTLCache # TTL + LRU eviction
+
+CAR_CACHE_SIZE = int(os.getenv("CAR_CACHE_SIZE", "10000")) # Car records kept by id
+CAR_CACHE_TTL = float(os.getenv("CAR_CACHE_TTL", "300")) # Seconds before a cached entry is re-read
+LIST_CACHE_SIZE = 256 # Cached availability listing pages
+
+class _CountingTTLCache(TTLCache):
+    # TTLCache that counts capacity (LRU) evictions
+    def __init__(self, maxsize, ttl, stats):
+        super().__init__(maxsize, ttl)
+        self._stats = stats
+
+    def popitem(self):
+        item = super().popitem()
+        self._stats["evictions"] += 1
+        return item
+
+class InventoryCache:
+    """Read-through cache of car rows by id and of availability listing pages, invalidated on writes."""
+
+    def __init__(self, maxsize=CAR_CACHE_SIZE, ttl=CAR_CACHE_TTL, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        self._cars = _CountingTTLCache(maxsize, ttl, self._stats) # car_id -> full cars row (or None)
+        self._lists = _CountingTTLCache(LIST_CACHE_SIZE, ttl, self._stats) # listing args -> page of rows
+        self._generation = 0 # Bumped by every invalidation; a load that overlapped one is not stored
+
+    def _read_through(self, cache, key, loader):
+        if not self.enabled:
+            return loader()
+        with self._lock:
+            try:
+                value = cache[key]
+                self._stats["hits"] += 1
+                return value
+            except KeyError:
+                self._stats["misses"] += 1
+                generation = self._generation
+        value = loader() # Query outside the lock so slow reads don't serialize other callers
+        with self._lock:
+            if self._generation == generation: # Otherwise a write may have landed after the read: don't cache it
+                cache[key] = value
+        return value
+
+    def get_car(self, car_id, loader):
+        # Full cars row for car_id; loader() runs the query on a miss
+        return self._read_through(self._cars, car_id, loader)
+
+    def get_list(self, key, loader):
+        # Cached listing page keyed by its query arguments
+        return self._read_through(self._lists, key, loader)
+
+    def invalidate_car(self, car_id):
+        # Drop one car and every listing page (pages may contain or shift around it)
+        with self._lock:
+            self._cars.pop(car_id, None)
+            self._lists.clear()
+            self._generation += 1
+            self._stats["invalidations"] += 1
+
+    def invalidate_all(self):
+        with self._lock:
+            self._cars.clear()
+            self._lists.clear()
+            self._generation += 1
+            self._stats["invalidations"] += 1
+
+    def stats(self):
+        # Hit/miss/eviction counters plus current sizes
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["cars_cached"] = len(self._cars)
+            snapshot["lists_cached"] = len(self._lists)
+        lookups = snapshot["hits"] + snapshot["misses"]
+        snapshot["hit_rate"] = snapshot["hits"] / lookups if lookups else 0.0
+        return snapshot
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_inventory_cache(db_path):
+    # One cache per database file, shared like the connection pool
+    with _caches_lock:
+        cache = _caches.get(db_path)
+        if cache is None:
+            cache = _caches[db_path] = InventoryCache()
+        return cache
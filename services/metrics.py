@@ -0,0 +1,295 @@
+import functools # For wrapping service methods
+import inspect # To skip generator methods when wrapping
+import os # For configuration through environment variables
+import threading # Histograms are updated from many worker threads
+import time # For latency measurement
+from bisect import bisect_left # Bucket lookup
+from collections import deque # Bounded slow-query log
+from contextlib import contextmanager # For timed()
+
+METRICS_ENABLED = os.getenv("CAR_RENTAL_METRICS", "true").lower() == "true" # Instrument RentalService instances
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "50")) # Queries slower than this land in the slow-query log
+SLOW_LOG_SIZE = 200 # Most recent slow queries kept in memory
+# Upper bounds in seconds: 50µs .. 10s, roughly 2.5x apart
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    # Fixed-bucket latency histogram; observe() is a bisect plus three adds under a lock
+    __slots__ = ("counts", "total", "count", "_lock")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1) # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        i = bisect_left(BUCKETS, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.total += seconds
+            self.count += 1
+
+    def quantile(self, q):
+        # Upper bucket bound containing the q-th observation (None when empty)
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return None
+        rank, seen = q * count, 0
+        for i, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if seen >= rank:
+                return BUCKETS[i] if i < len(BUCKETS) else float("inf")
+        return float("inf")
+
+    def snapshot(self):
+        with self._lock:
+            counts, total, count = list(self.counts), self.total, self.count
+        return {"count": count, "sum": total, "buckets": dict(zip([*BUCKETS, "+Inf"], counts)),
+                "p50": self.quantile(0.5), "p95": self.quantile(0.95), "p99": self.quantile(0.99)}
+
+class MetricsRegistry:
+    """Latency histograms, row counters and a slow-query log for one process."""
+
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS):
+        self.slow_query_seconds = slow_query_ms / 1000.0
+        self._histograms = {} # (metric name, labels tuple) -> Histogram
+        self._counters = {} # (metric name, labels tuple) -> number
+        self._slow = deque(maxlen=SLOW_LOG_SIZE)
+        self._lock = threading.Lock()
+
+    def histogram(self, name, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        return histogram
+
+    def observe(self, name, seconds, **labels):
+        self.histogram(name, **labels).observe(seconds)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def timed(self, name, **labels):
+        # with registry.timed("bcrypt_seconds", op="hash"): ...
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def record_query(self, sql, seconds, rows):
+        # One finished SQL statement: latency by statement type, rows, and the slow log
+        statement = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else "UNKNOWN"
+        self.observe("sql_query_seconds", seconds, statement=statement)
+        self.increment("sql_rows_total", rows, statement=statement)
+        if seconds >= self.slow_query_seconds:
+            self._slow.append({"sql": " ".join(sql.split()), "ms": round(seconds * 1000, 3), "rows": rows,
+                               "at": time.strftime("%Y-%m-%dT%H:%M:%S")})
+
+    def slow_queries(self):
+        return list(self._slow)
+
+    def snapshot(self):
+        # Plain-dict view of every metric, for in-process inspection
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = dict(self._counters)
+        result = {"histograms": {}, "counters": {}, "slow_queries": self.slow_queries()}
+        for (name, labels), histogram in histograms:
+            result["histograms"].setdefault(name, {})[_label_text(labels) or "_"] = histogram.snapshot()
+        for (name, labels), value in counters.items():
+            result["counters"].setdefault(name, {})[_label_text(labels) or "_"] = value
+        return result
+
+    def prometheus_text(self):
+        # Prometheus text exposition format
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        lines, typed = [], set()
+        for (name, labels), histogram in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            snap = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket_count in snap["buckets"].items():
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else repr(bound)
+                lines.append(f"{name}_bucket{{{_label_text(labels + (('le', le),))}}} {cumulative}")
+            suffix = f"{{{_label_text(labels)}}}" if labels else ""
+            lines.append(f"{name}_sum{suffix} {snap['sum']}")
+            lines.append(f"{name}_count{suffix} {snap['count']}")
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            suffix = f"{{{_label_text(labels)}}}" if labels else ""
+            lines.append(f"{name}{suffix} {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._slow.clear()
+
+def _label_text(labels):
+    return ",".join(f'{key}="{value}"' for key, value in labels)
+
+REGISTRY = MetricsRegistry() # Process-wide registry used by the service, auth and email layers
+
+def timed(name, **labels):
+    return REGISTRY.timed(name, **labels)
+
+def snapshot():
+    return REGISTRY.snapshot()
+
+def prometheus_text():
+    return REGISTRY.prometheus_text()
+
+class InstrumentedCursor:
+    # Cursor proxy timing each statement from execute() through its last fetch
+    def __init__(self, cursor, registry):
+        self._cursor = cursor
+        self._registry = registry
+        self._pending = None # [sql, seconds so far, rows so far] for the statement in flight
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending:
+            self._registry.record_query(*pending)
+
+    def _run(self, method, sql, params):
+        self._finish()
+        started = time.perf_counter()
+        method(sql, params)
+        elapsed = time.perf_counter() - started
+        if self._cursor.description is None: # No result rows to fetch: the statement is done
+            self._registry.record_query(sql, elapsed, max(self._cursor.rowcount, 0))
+        else:
+            self._pending = [sql, elapsed, 0]
+        return self
+
+    def execute(self, sql, params=()):
+        return self._run(self._cursor.execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self._run(self._cursor.executemany, sql, seq_of_params)
+
+    def _fetch(self, method, *args):
+        started = time.perf_counter()
+        result = method(*args)
+        if self._pending:
+            self._pending[1] += time.perf_counter() - started
+        return result
+
+    def fetchone(self):
+        row = self._fetch(self._cursor.fetchone)
+        if self._pending:
+            if row is None:
+                self._finish()
+            else:
+                self._pending[2] += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._fetch(self._cursor.fetchmany, *([size] if size is not None else []))
+        if self._pending:
+            self._pending[2] += len(rows)
+            if not rows or (size is not None and len(rows) < size):
+                self._finish()
+        return rows
+
+    def fetchall(self):
+        rows = self._fetch(self._cursor.fetchall)
+        if self._pending:
+            self._pending[2] += len(rows)
+            self._finish()
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self):
+        self._finish()
+        self._cursor.close()
+
+    def __del__(self):
+        try:
+            self._finish() # Statements whose cursor was dropped after a single fetchone()
+        except Exception:
+            pass
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name) # lastrowid, rowcount, description...
+
+class InstrumentedConnection:
+    # Connection proxy whose execute()/cursor() hand out instrumented cursors
+    def __init__(self, conn, registry):
+        self._conn = conn
+        self._registry = registry
+
+    def unwrap(self):
+        return self._conn
+
+    def cursor(self):
+        return InstrumentedCursor(self._conn.cursor(), self._registry)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name) # commit, rollback, in_transaction...
+
+def _wrap_method(method, registry, name):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            registry.observe("rental_operation_seconds", time.perf_counter() - started, operation=name)
+    return wrapper
+
+def instrument_service(service, registry=None):
+    """Time every public RentalService method and every SQL statement it runs."""
+    registry = registry or REGISTRY
+    for name, member in inspect.getmembers(type(service), inspect.isfunction):
+        # Generators and context managers (transaction) would only time their creation
+        if name.startswith("_") or name == "close" or inspect.isgeneratorfunction(inspect.unwrap(member)):
+            continue
+        setattr(service, name, _wrap_method(getattr(service, name), registry, name))
+
+    raw_conn = service.conn
+    service.conn = InstrumentedConnection(raw_conn, registry)
+    service.cursor = service.conn.cursor()
+    original_close = service.close
+
+    @functools.wraps(original_close)
+    def close():
+        service.conn = raw_conn # The pool must get back the real connection
+        original_close()
+    service.close = close
+    return service
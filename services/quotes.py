@@ -0,0 +1,80 @@
+# Batch price quotes over the fleet snapshot's cached rates.
+# A quote is the price of renting one car for some number of days: the subtotal (rate x days, which
+# is what a booking records as its fee), the tax from billing's tax rules, and the total. Many
+# (car, days) pairs, or every fleet car for one rental length, are checked and priced in a single
+# vectorized pass instead of one car lookup per quote.
+from services import billing # Tax rules shared with the bills
+from services import fleet_search # Cached columnar car data
+
+# Quote status codes, stored per quote; only QUOTE_OK quotes carry a price
+QUOTE_OK, NOT_FOUND, UNAVAILABLE, TOO_SHORT, TOO_LONG = range(5)
+STATUS_NAMES = ("ok", "not found", "unavailable", "below the minimum days", "above the maximum days")
+QUOTE_COLUMNS = ("car_id", "days", "status", "subtotal", "tax", "total")
+
+def price(rates, days, rules=None):
+    # (subtotal, tax, total) for daily rates and rental lengths, as numbers or NumPy arrays
+    subtotal = rates * days
+    tax = subtotal * billing.tax_rate_for(days, rules)
+    return subtotal, tax, subtotal + tax
+
+class Quotes:
+    """Columnar quote results: one entry per requested (car, days) pair, in request order."""
+
+    def __init__(self, columns):
+        self.columns = columns # QUOTE_COLUMNS name -> NumPy array
+
+    def __len__(self):
+        return len(self.columns["car_id"])
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def take(self, index):
+        # Quotes selected by a boolean mask or index array
+        return Quotes({name: values[index] for name, values in self.columns.items()})
+
+    def valid(self):
+        # Only the quotes that can be booked
+        return self.take(self.columns["status"] == QUOTE_OK)
+
+    def cheapest(self, limit):
+        # The `limit` lowest-total bookable quotes, cheapest first (ties by car id)
+        valid = self.valid()
+        order = fleet_search.np.lexsort((valid["car_id"], valid["total"]))[:limit]
+        return valid.take(order)
+
+    def rows(self):
+        # (car_id, days, status name, subtotal, tax, total) tuples; prices are None for failed quotes
+        columns = [self.columns[name].tolist() for name in QUOTE_COLUMNS]
+        return [(car_id, days, STATUS_NAMES[status], *((subtotal, tax, total) if status == QUOTE_OK else (None,) * 3))
+                for car_id, days, status, subtotal, tax, total in zip(*columns)]
+
+def _quote(car_ids, days, found, cols, rules):
+    np = fleet_search.np
+    days = np.broadcast_to(np.asarray(days, dtype=np.int64), car_ids.shape)
+    status = np.full(len(car_ids), QUOTE_OK, dtype=np.int8)
+    status[days > cols["max_days"]] = TOO_LONG
+    status[days < cols["min_days"]] = TOO_SHORT
+    status[~cols["available"]] = UNAVAILABLE
+    status[~found] = NOT_FOUND
+    subtotal, tax, total = price(cols["rate"], days, rules)
+    failed = status != QUOTE_OK
+    for values in (subtotal, tax, total):
+        values[failed] = 0.0
+    return Quotes({"car_id": car_ids, "days": days.copy(), "status": status,
+                   "subtotal": subtotal, "tax": tax, "total": total})
+
+def quote_cars(snapshot, conn, car_ids, days, rules=None):
+    """Quote many cars at once; `days` is one rental length for all of them or one per car."""
+    found, cols = snapshot.gather(conn, car_ids, ("rate", "min_days", "max_days", "available"))
+    return _quote(fleet_search.np.asarray(car_ids, dtype="int64"), days, found, cols, rules)
+
+def quote_fleet(snapshot, conn, days, rules=None, **filters):
+    """Quote every fleet car matching the search filters (make, model, year_min...) for `days` days.
+
+    Cars whose min_days/max_days exclude the rental length come back with a failed status rather
+    than being left out, so a comparison page can say why.
+    """
+    cols = snapshot.select(conn, ("id", "rate", "min_days", "max_days", "available"), **filters)
+    car_ids = cols.pop("id")
+    return _quote(car_ids, days, fleet_search.np.ones(len(car_ids), bool), cols, rules)
@@ -1,54 +1,245 @@
-from db_connection import get_connection # Import database connection utility
-import bcrypt # Import bcrypt for password hashing
+from db_connection import get_pool, get_connection # Import the shared database connection pool
 import os # Import os for environment variable handling
-from datetime import datetime # Import datetime for date handling
-from services.email_service import send_email # Import email sending service
+import random # For backoff jitter
+import re # For splitting search text into FTS tokens
+import sqlite3 # For database error types
+import time # For retry backoff
+from contextlib import contextmanager # For the transaction() unit of work
+from datetime import datetime, date # Import datetime for date handling
+from services.email_service import queue_email # Import the email outbox writer
+from services.availability import get_availability_index, rental_period, to_date # Date-range reservation index
+from services.auth_service import get_auth_service # Off-thread bcrypt and session tokens
+from services import fleet_io # Bulk fleet import/export
+from services import billing # Bill template and batch billing
+from services import reports # Incrementally maintained summary tables
+from services import archive # Parquet archive of closed bookings
+from services.inventory_cache import get_inventory_cache # Read-through cache of car records
+from services import metrics # Latency histograms and slow-query log
+from services import quotes # Vectorized batch price quotes
+from services.fleet_search import get_fleet_snapshot # Columnar fleet snapshot for multi-criteria search
+
+PAGE_SIZE = 20 # Rows per page for listing methods
+CAR_LIST_COLUMNS = "id, make, model, year, mileage, rate" # Columns the car listings actually show
+BOOKING_LIST_COLUMNS = "id, customer_name, car_id, days, total_fee, status, start_date, end_date"
+APPROVAL_RETRIES = 5 # Extra attempts when an approval transaction finds the database busy
+APPROVAL_BACKOFF = 0.01 # First retry delay in seconds, doubled per attempt
+APPROVAL_MAX_BACKOFF = 0.5
+
+AUTOCOMPLETE_LIMIT = 8 # Suggestions returned by autocomplete_cars
+
+def fts_prefix_query(text):
+    # Turn free text such as "toy cam" into the FTS5 query '"toy"* "cam"*' (every word, as a prefix);
+    # quoting each token keeps FTS5 operators and punctuation in user input from being interpreted
+    tokens = re.findall(r"\w+", text or "")
+    return " ".join(f'"{token}"*' for token in tokens)
+
+def is_busy_error(error):
+    # SQLite lock contention surfaces as OperationalError "database is locked" / "database is busy"
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
 
 class RentalService: # Main service class for car rental operations
-    def __init__(self): # Initialize the rental service
-        self.conn = get_connection() # Get database connection 
+    def __init__(self, pool=None): # Initialize the rental service
+        self.pool = pool or get_pool() # Shared, bounded pool of tuned connections
+        self.conn = self.pool.acquire() # Check out a connection for this service worker
         self.cursor = self.conn.cursor() # Create a cursor for executing SQL commands
         self.dry_run = os.getenv("EMAIL_DRY_RUN", "False").lower() == "true" # Check if dry run mode is enabled for email sending
+        self.outbox_worker = None # Background OutboxWorker that delivers queued emails, if one is running
+        self.availability = get_availability_index(self.pool.db_path) # Approved reservations per car, built on first query
+        self.auth = get_auth_service() # Shared bcrypt process pool and token signer
+        self.inventory = get_inventory_cache(self.pool.db_path) # Car rows and listing pages, invalidated on writes
+        self.fleet = get_fleet_snapshot(self.pool.db_path) # Loaded on the first search, refreshed per written car
+        self.approval_stats = {"approved": 0, "rejected": 0, "conflicts": 0, "retries": 0, "busy_failures": 0}
+        self._tx_depth = 0 # Nesting depth of transaction() blocks
+        self._in_operation = False # A manage_booking/return_car savepoint is open inside transaction()
+        self._pending_actions = [] # In-memory updates held back until the outer transaction commits
+        self._pending_cars = [] # Car ids whose cache entries and search rows refresh at that commit
+        if metrics.METRICS_ENABLED:
+            metrics.instrument_service(self) # Time public methods and every SQL statement they run
+
+    def _notify_outbox(self):
+        # Wake the email sender after a commit that queued mail
+        if self.outbox_worker:
+            self.outbox_worker.wake()
+
+    # --- transactions ---
+
+    @contextmanager
+    def transaction(self):
+        """Group service writes into one unit of work with a single commit.
+
+            with service.transaction():
+                for car_id, mileage, rate in repricing:
+                    service.update_car(car_id, mileage, rate)
+
+        The write lock is taken when the outermost block starts. A nested block is a savepoint:
+        an exception inside it rolls back just that block and propagates to the caller, who may
+        catch it and carry on. Cache, search and reservation updates wait for the final commit,
+        so nothing outside the transaction sees work that is later rolled back.
+        """
+        depth = self._tx_depth
+        if depth:
+            self.conn.execute(f"SAVEPOINT tx_{depth}")
+        else:
+            self.conn.execute("BEGIN IMMEDIATE")
+        marks = (len(self._pending_actions), len(self._pending_cars))
+        self._tx_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._tx_depth -= 1
+            del self._pending_actions[marks[0]:], self._pending_cars[marks[1]:]
+            if depth:
+                self.conn.execute(f"ROLLBACK TO tx_{depth}")
+                self.conn.execute(f"RELEASE tx_{depth}")
+            else:
+                self.conn.rollback()
+            raise
+        self._tx_depth -= 1
+        if depth:
+            self.conn.execute(f"RELEASE tx_{depth}")
+            return
+        try:
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            self._pending_actions, self._pending_cars = [], []
+            raise
+        self._apply_pending()
+
+    def _apply_pending(self):
+        # Run the in-memory updates of a committed transaction; car refreshes are batched
+        actions, car_ids = self._pending_actions, list(dict.fromkeys(self._pending_cars))
+        self._pending_actions, self._pending_cars = [], []
+        for car_id in car_ids:
+            self.inventory.invalidate_car(car_id)
+        if car_ids:
+            self.fleet.refresh_cars(self.conn, car_ids)
+        for action, args in actions:
+            action(*args)
+
+    def _after_commit(self, action, *args):
+        # Apply an in-memory update now, or once the enclosing transaction() commits
+        if self._tx_depth:
+            self._pending_actions.append((action, args))
+        else:
+            action(*args)
+
+    def _reservations(self):
+        # The availability index, built by the first query that needs it rather than at startup; the
+        # build uses its own connection so rows uncommitted in a transaction() never get into it
+        if not self.availability.loaded:
+            conn = get_connection(self.pool.db_path)
+            try:
+                self.availability.ensure_loaded(conn.cursor())
+            finally:
+                conn.close()
+        return self.availability
+
+    def _car_written(self, car_id):
+        # Drop the car's cached row and refresh its search row (after the commit, inside transaction())
+        if self._tx_depth:
+            self._pending_cars.append(car_id)
+        else:
+            self.inventory.invalidate_car(car_id)
+            self.fleet.refresh_cars(self.conn, [car_id])
+
+    def _begin(self):
+        # Start a multi-statement operation: take the write lock, or open a savepoint inside transaction()
+        if self._tx_depth:
+            self.conn.execute("SAVEPOINT operation")
+            self._in_operation = True
+        else:
+            self.conn.execute("BEGIN IMMEDIATE") # Take the write lock up front instead of failing on upgrade
+
+    def _commit(self):
+        # Commit one operation's writes, or leave them to the enclosing transaction()
+        if self._in_operation:
+            self.conn.execute("RELEASE operation")
+            self._in_operation = False
+        elif not self._tx_depth:
+            self.conn.commit()
+
+    def _outside_transaction(self, action):
+        # Bulk jobs commit in chunks of their own, so they cannot join a transaction() block
+        if self._tx_depth:
+            print(f"❌ {action} manages its own commits; run it outside service.transaction().")
+            return False
+        return True
+
+    def _rollback(self):
+        # Undo one operation's writes; inside transaction() only back to its savepoint
+        if self._in_operation:
+            self.conn.execute("ROLLBACK TO operation")
+            self.conn.execute("RELEASE operation")
+            self._in_operation = False
+        elif not self._tx_depth and self.conn.in_transaction:
+            self.conn.rollback()
 
     def register_user(self, username, password, role, email): # Register a new user in the system
         if not username or not password or not role or not email: # Check if all fields are provided
             print("All fields are required for registration.") 
             return False
-        hashed_pw = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()) # Hash the password using bcrypt
+        hashed_pw = self.auth.hash_password(password) # Hash the password using bcrypt in the auth process pool
+        return self.add_user(username, hashed_pw, role, email)
+
+    def add_user(self, username, password_hash, role, email):
+        # Insert a user whose password is already hashed (register_user, and copies to other branches)
         try:
             # Insert the new user into the database
             self.cursor.execute(""" 
                 INSERT INTO users (username, password, role, email) VALUES (?, ?, ?, ?) 
-            """, (username, hashed_pw, role, email))
-            self.conn.commit()
+            """, (username, password_hash, role, email))
+            self._commit()
             print(f"✔️User '{username}' registered successfully as '{role}'.") # Print registered success message
             return True
         except Exception as e:
+            self._rollback()
             print(f"❌ Registration failed: {e}")
             return False
 
+    def user_exists(self, username):
+        return self.conn.execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone() is not None
+
+    def remove_user(self, username):
+        # Delete a user account (undoes a registration that could not be completed everywhere)
+        self.cursor.execute("DELETE FROM users WHERE username = ?", (username,))
+        self._commit()
+
     def login_user(self, username, password): # Authenticate a user by checking username and password
         self.cursor.execute("SELECT password, role FROM users WHERE username = ?", (username,)) # Fetch the user's password and role from the database
         result = self.cursor.fetchone() # Get the first matching record
         if result:
             stored_hash, role = result
             try:
-                if isinstance(stored_hash, str): # Ensure stored hash is a string
-                    stored_hash = stored_hash.encode('utf-8') # Convert to bytes for bcrypt comparison
-                if bcrypt.checkpw(password.encode('utf-8'), stored_hash): # Check if the provided password matches the stored hash
+                if self.auth.verify_password(password, stored_hash): # Check if the provided password matches the stored hash
+                    if self.auth.needs_rehash(stored_hash): # Upgrade hashes made with an older work factor
+                        self.cursor.execute("UPDATE users SET password = ? WHERE username = ?",
+                                            (self.auth.hash_password(password), username))
+                        self._commit()
                     return role
             except ValueError:
                 print("❌ Invalid password format in database. Re-register the user.") # Handle potential ValueError if stored hash is not in expected format
                 return None
         return None
 
+    def create_session(self, username, password): # Log in and return a signed session token
+        role = self.login_user(username, password)
+        if not role:
+            return None
+        return self.auth.issue_token(username, role)
+
+    def validate_session(self, token): # Return (username, role) for a valid token without touching bcrypt
+        return self.auth.verify_token(token)
+
     def add_car(self, make, model, year, mileage, rate, min_days, max_days): 
         # Add a new car to the rental inventory
         self.cursor.execute("""
             INSERT INTO cars (make, model, year, mileage, rate, min_days, max_days, available)
             VALUES (?, ?, ?, ?, ?, ?, ?, 1)
         """, (make, model, year, mileage, rate, min_days, max_days))
-        self.conn.commit()
+        self._commit()
+        self._car_written(self.cursor.lastrowid)
         print(f"🚘 New car '{make} {model}' added successfully!")
 
     def update_car(self, car_id, mileage, rate):
@@ -56,28 +247,254 @@ class RentalService: # Main service class for car rental operations
         self.cursor.execute(
             "UPDATE cars SET mileage = ?, rate = ? WHERE id = ?",
             (mileage, rate, car_id))
-        self.conn.commit()
+        self._commit()
+        self._car_written(car_id)
         print(f" Car ID {car_id} updated successfully.") 
 
     def delete_car(self, car_id):
-        # Delete a car from the rental inventory
-        self.cursor.execute("DELETE FROM cars WHERE id = ?", (car_id,))
-        self.conn.commit()
-        print(f"🗑️ Car ID {car_id} deleted.")
-
-    def display_available_cars(self):
-        # Display all available cars for rental
-        self.cursor.execute("SELECT * FROM cars WHERE available = 1")
-        cars = self.cursor.fetchall()
-        if not cars:
+        # Delete a car from the rental inventory; a car that bookings still refer to is withdrawn
+        # from the fleet instead (available = 0), so their bills and history keep their car
+        self._begin()
+        try:
+            self.cursor.execute("SELECT 1 FROM bookings WHERE car_id = ? LIMIT 1", (car_id,))
+            withdrawn = self.cursor.fetchone() is not None
+            if withdrawn:
+                self.cursor.execute("UPDATE cars SET available = 0 WHERE id = ?", (car_id,))
+            else:
+                self.cursor.execute("DELETE FROM cars WHERE id = ?", (car_id,))
+            self._commit()
+        except Exception:
+            self._rollback()
+            raise
+        if not withdrawn:
+            self._after_commit(self.availability.drop_car, car_id)
+        self._car_written(car_id)
+        if withdrawn:
+            print(f"🚫 Car ID {car_id} has bookings, so it was withdrawn from the fleet instead of deleted.")
+        else:
+            print(f"🗑️ Car ID {car_id} deleted.")
+
+    def import_cars(self, path, fmt=None):
+        # Bulk-load cars from a CSV, JSONL or Parquet file
+        if not self._outside_transaction("Import"):
+            return None
+        try:
+            report = fleet_io.import_cars(self.conn, path, fmt)
+        except (OSError, ValueError) as e:
+            print(f"❌ Import failed: {e}")
+            return None
+        finally:
+            self.inventory.invalidate_all() # Chunks may have been committed even if the import failed later
+            self.fleet.invalidate()
+        print(f"📥 {report}")
+        for row_number, message in report.errors[:20]: # Show the first few bad rows
+            print(f"   Row {row_number}: {message}")
+        if len(report.errors) > 20:
+            print(f"   ... and {len(report.errors) - 20} more rejected row(s).")
+        return report
+
+    def export_cars(self, path, fmt=None):
+        # Write the whole fleet to a CSV, JSONL or Parquet file
+        try:
+            count, seconds = fleet_io.export_cars(self.conn, path, fmt)
+        except (OSError, ValueError) as e:
+            print(f"❌ Export failed: {e}")
+            return None
+        print(f"📤 {count} car(s) exported to {path} in {seconds:.2f}s.")
+        return count
+
+    def get_car(self, car_id):
+        # Full cars row by id (or None), served from the inventory cache when possible
+        load = lambda: self.conn.execute("SELECT * FROM cars WHERE id = ?", (car_id,)).fetchone()
+        if self._tx_depth:
+            return load() # Uncommitted writes must neither be missed nor leak into the shared cache
+        return self.inventory.get_car(car_id, load)
+
+    def list_cars_page(self, after_id=0, limit=PAGE_SIZE, available_only=True, make=None, max_rate=None):
+        # One keyset page of cars with id > after_id, ordered by id (cached until the next car write)
+        key = (after_id, limit, available_only, make, max_rate)
+        if self._tx_depth:
+            return self._query_cars_page(*key)
+        return self.inventory.get_list(key, lambda: self._query_cars_page(*key))
+
+    def _query_cars_page(self, after_id, limit, available_only, make, max_rate):
+        clauses, params = ["id > ?"], [after_id]
+        if available_only:
+            clauses.append("available = 1")
+        if make:
+            clauses.append("make = ?")
+            params.append(make)
+        if max_rate is not None:
+            clauses.append("rate <= ?")
+            params.append(max_rate)
+        params.append(limit)
+        return self.conn.execute(f"""
+            SELECT {CAR_LIST_COLUMNS} FROM cars
+            WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?
+        """, params).fetchall()
+
+    def iter_cars(self, page_size=PAGE_SIZE, **filters):
+        # Yield pages of cars until the table is exhausted; memory use stays at one page
+        after_id = 0
+        while True:
+            page = self.list_cars_page(after_id, page_size, **filters)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after_id = page[-1][0]
+
+    def iter_available_cars(self, start_date, end_date, page_size=PAGE_SIZE):
+        # Yield pages of fleet cars with no approved reservation overlapping [start_date, end_date)
+        for page in self.iter_cars(page_size):
+            free_ids = set(self._reservations().free_cars([car[0] for car in page], start_date, end_date))
+            free = [car for car in page if car[0] in free_ids]
+            if free:
+                yield free
+
+    def list_available_cars_page(self, start_date, end_date, after_id=0, limit=PAGE_SIZE, make=None, max_rate=None):
+        # One keyset page of fleet cars with id > after_id, matching the list_cars_page filters, and no
+        # approved reservation overlapping [start_date, end_date); reads only as many car pages as it takes
+        start, end = to_date(start_date), to_date(end_date)
+        free = []
+        while len(free) < limit:
+            page = self.list_cars_page(after_id, limit, make=make, max_rate=max_rate)
+            free_ids = set(self._reservations().free_cars([car[0] for car in page], start, end))
+            free.extend(car for car in page if car[0] in free_ids)
+            if len(page) < limit:
+                break
+            after_id = page[-1][0]
+        return free[:limit]
+
+    def find_available_cars(self, start_date, end_date):
+        # Cars in the fleet with no approved reservation overlapping [start_date, end_date)
+        return [car for page in self.iter_available_cars(start_date, end_date) for car in page]
+
+    def display_available_cars(self, start_date=None, end_date=None, more=None):
+        # Display available cars page by page, optionally only those free between two dates.
+        # `more` is asked after each page whether to keep going (None shows everything).
+        if start_date and end_date:
+            pages = self.iter_available_cars(start_date, end_date)
+        else:
+            pages = self.iter_cars()
+        shown = 0
+        for page in pages:
+            if not shown:
+                print("\n🚘 Available Cars:")
+            for car in page:
+                print(f"[{car[0]}] {car[1]} {car[2]} ({car[3]}) | Mileage: {car[4]} | Rate: ${car[5]}")
+            shown += len(page)
+            if more is not None and len(page) == PAGE_SIZE and not more():
+                break
+        if not shown:
             print("⛔ No available cars found.")
-            return
-        print("\n🚘 Available Cars:")
+
+    def find_cars(self, limit=PAGE_SIZE, sort="rate", descending=False, start_date=None, **filters):
+        # Top `limit` fleet cars matching the filters (make, model, year_min, year_max, max_mileage,
+        # rate_min, rate_max, days) as Car objects. With start_date and days, only cars free for that rental.
+        if not (start_date and filters.get("days")):
+            return self.fleet.search(self.conn, limit, sort, descending, **filters)
+        start, end = rental_period(start_date, filters["days"])
+        want = limit
+        while True: # Widen the top-k until enough of it is free for the dates
+            ids = self.fleet.search_ids(self.conn, want, sort, descending, **filters).tolist()
+            free = set(self._reservations().free_cars(ids, start, end))
+            chosen = [car_id for car_id in ids if car_id in free]
+            if len(chosen) >= limit or len(ids) < want:
+                return self.fleet.cars(chosen[:limit])
+            want *= 4
+
+    def search_cars(self, text, limit=PAGE_SIZE, available_only=True):
+        # Fleet cars whose make, model or year start with every word of `text`: best bm25 match first,
+        # cheapest first within a make/model/year. Ranks the small car_listings index, then reads only
+        # as many cars as the page needs.
+        query = fts_prefix_query(text)
+        if not query:
+            return []
+        listings = self.conn.execute("""
+            SELECT l.make, l.model, l.year FROM car_listings_fts f JOIN car_listings l ON l.id = f.rowid
+            WHERE car_listings_fts MATCH ? AND l.cars > 0
+            ORDER BY f.rank, l.cars DESC
+        """, (query,)).fetchall()
+        cars = []
+        for make, model, year in listings:
+            cars += self.conn.execute(f"""
+                SELECT {CAR_LIST_COLUMNS} FROM cars
+                WHERE make = ? AND model = ? AND year = ? {'AND available = 1' if available_only else ''}
+                ORDER BY rate LIMIT ?
+            """, (make, model, year, limit - len(cars))).fetchall()
+            if len(cars) >= limit:
+                break
+        return cars
+
+    def autocomplete_cars(self, text, limit=AUTOCOMPLETE_LIMIT):
+        # "Make Model" suggestions for partially typed text: best match first, then most common in the fleet
+        query = fts_prefix_query(text)
+        if not query:
+            return []
+        rows = self.conn.execute("""
+            SELECT l.make, l.model FROM car_listings_fts f JOIN car_listings l ON l.id = f.rowid
+            WHERE car_listings_fts MATCH ? AND l.cars > 0
+            GROUP BY l.make, l.model ORDER BY MIN(f.rank), SUM(l.cars) DESC LIMIT ?
+        """, (query, limit)).fetchall()
+        return [f"{make} {model}" for make, model in rows]
+
+    def display_search_results(self, text):
+        # Print autocomplete suggestions and ranked matches for free text
+        suggestions = self.autocomplete_cars(text)
+        if suggestions:
+            print(f"💡 Did you mean: {', '.join(suggestions)}")
+        cars = self.search_cars(text)
+        if not cars:
+            print(f"⛔ No cars match '{text}'.")
+            return cars
+        print(f"\n🔎 Cars matching '{text}':")
         for car in cars:
             print(f"[{car[0]}] {car[1]} {car[2]} ({car[3]}) | Mileage: {car[4]} | Rate: ${car[5]}")
+        return cars
+
+    def display_car_search(self, limit=PAGE_SIZE, sort="rate", descending=False, start_date=None, **filters):
+        # Print the results of find_cars()
+        try:
+            cars = self.find_cars(limit, sort, descending, start_date, **filters)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return []
+        if not cars:
+            print("⛔ No cars match your search.")
+            return cars
+        print(f"\n🔎 {len(cars)} matching car(s), by {sort}{' (highest first)' if descending else ''}:")
+        for car in cars:
+            print(car)
+        return cars
+
+    def quote_cars(self, requests, rules=None):
+        # Price many (car_id, days) pairs in one pass over the fleet snapshot; returns a quotes.Quotes
+        car_ids, days = zip(*requests) if requests else ((), ())
+        return quotes.quote_cars(self.fleet, self.conn, list(car_ids), list(days), rules)
+
+    def quote_fleet(self, days, rules=None, **filters):
+        # Quote every car matching the search filters (make, model, year_min...) for a rental of `days` days
+        return quotes.quote_fleet(self.fleet, self.conn, days, rules, **filters)
+
+    def display_fleet_quotes(self, days, limit=PAGE_SIZE, **filters):
+        # Print the cheapest bookable cars for a rental of `days` days, with tax and total
+        fleet_quotes = self.quote_fleet(days, **filters)
+        best = fleet_quotes.cheapest(limit)
+        if not len(best):
+            print(f"⛔ No cars can be rented for {days} days with those filters.")
+            return best
+        cars = {car.car_id: car for car in self.fleet.cars(best["car_id"])}
+        print(f"\n💲 Cheapest {len(best)} of {len(fleet_quotes.valid())} car(s) for {days} days:")
+        for car_id, _, _, subtotal, tax, total in best.rows():
+            car = cars[car_id]
+            print(f"[{car_id}] {car.make} {car.model} ({car.year}) | ${car.rate:.2f}/day | "
+                  f"Subtotal: ${subtotal:.2f} | Tax: ${tax:.2f} | Total: ${total:.2f}")
+        return best
 
-    def book_car(self, customer_name, car_id, days):
-        # Book a car for a customer
+    def book_car(self, customer_name, car_id, days, start_date=None):
+        # Book a car for a customer from start_date (default today) for the given number of days
         self.cursor.execute("SELECT email FROM users WHERE username = ?", (customer_name,))
         email_row = self.cursor.fetchone() # Fetch the user's email based on their username
         if not email_row:
@@ -85,88 +502,246 @@ class RentalService: # Main service class for car rental operations
             return
         email = email_row[0] # Extract the email from the fetched row
 
-        self.cursor.execute("SELECT * FROM cars WHERE id = ? AND available = 1", (car_id,)) # Check if the car is available
-        car = self.cursor.fetchone()  # Fetch the car details based on the provided car ID
-        if car:
+        car = self.get_car(car_id) # Fetch the car details based on the provided car ID
+        if car and car[8]: # Check if the car is in the fleet
             if days < car[6] or days > car[7]: # Check if the requested rental days are within the allowed range
                 print(f"🚫Days out of allowed range. Choose between {car[6]} and {car[7]} days.") 
                 return
-            total_cost = days * car[5]
-            # Calculate the total rental cost based on the daily rate and number of days
+            start, end = rental_period(start_date or date.today(), days)
+            if start < date.today(): # Past rentals are never checked against, so they can't be booked
+                print("🚫 Start date is in the past. Choose today or a later date.")
+                return
+            if not self._reservations().is_free(car_id, start, end): # O(log n) overlap check against approved rentals
+                print(f"🚫 Car already rented between {start} and {end}. Try other dates.")
+                return
+            total_cost, tax, total_with_tax = quotes.price(car[5], days) # Same pricing as quotes and bills; the fee is pre-tax
             self.cursor.execute(""" 
-                INSERT INTO bookings (customer_name, car_id, days, total_fee)
-                VALUES (?, ?, ?, ?)
-            """, (customer_name, car_id, days, total_cost))
-            self.conn.commit()
-
-            print(" Booking submitted successfully and is pending approval!")
+                INSERT INTO bookings (customer_name, car_id, days, total_fee, start_date, end_date)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (customer_name, car_id, days, total_cost, start.isoformat(), end.isoformat()))
+            booking_id = self.cursor.lastrowid
+            reports.record_booking(self.cursor, car_id, car[1], start, total_cost) # Summary rows commit with the booking
 
             subject = "🧾Booking Received"
             body = (f"Hi {customer_name},\n\n"
                     f"Your booking for {car[1]} {car[2]} is pending approval.\n"
-                    f"Rental days: {days}\nEstimated cost: ${total_cost}\n\n"
+                    f"Rental dates: {start} to {end} ({days} days)\nEstimated cost: ${total_cost:.2f} + ${tax:.2f} tax = ${total_with_tax:.2f}\n\n"
                     "You'll receive a confirmation soon.")
-            send_email(email, subject, body, dry_run=self.dry_run)
+            queue_email(self.cursor, email, subject, body) # Queued in the same transaction as the booking
+            self._commit()
+            self._after_commit(self._notify_outbox)
+
+            print(" Booking submitted successfully and is pending approval!")
+            return booking_id
         else:
             print("❌ Car not found or unavailable.")
 
-    def view_bookings(self, customer_name=None): # View all bookings or filter by customer name
+    def list_bookings_page(self, after_id=0, limit=PAGE_SIZE, customer_name=None, status=None):
+        # One keyset page of bookings with id > after_id, ordered by id
+        clauses, params = ["id > ?"], [after_id]
         if customer_name:
-            self.cursor.execute("SELECT * FROM bookings WHERE customer_name = ?", (customer_name,))
-        else:
-            self.cursor.execute("SELECT * FROM bookings")
-        bookings = self.cursor.fetchall()
-        if not bookings:
+            clauses.append("customer_name = ?")
+            params.append(customer_name)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        params.append(limit)
+        return self.conn.execute(f"""
+            SELECT {BOOKING_LIST_COLUMNS} FROM bookings
+            WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?
+        """, params).fetchall()
+
+    def iter_bookings(self, page_size=PAGE_SIZE, **filters):
+        # Yield pages of bookings until the table is exhausted
+        after_id = 0
+        while True:
+            page = self.list_bookings_page(after_id, page_size, **filters)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after_id = page[-1][0]
+
+    def get_booking(self, booking_id):
+        # One booking row (BOOKING_LIST_COLUMNS) or None
+        return self.conn.execute(f"SELECT {BOOKING_LIST_COLUMNS} FROM bookings WHERE id = ?", (booking_id,)).fetchone()
+
+    def view_bookings(self, customer_name=None, more=None): # View all bookings or filter by customer name
+        shown = 0
+        for page in self.iter_bookings(customer_name=customer_name):
+            if not shown:
+                print("\n📋 Bookings:")
+            for b in page: # Loop through each booking and print its details
+                print(f"[{b[0]}] {b[1]} → Car ID {b[2]} | {b[3]} days from {b[6]} | Status: {b[5]} | Fee: ${b[4]}")
+            shown += len(page)
+            if more is not None and len(page) == PAGE_SIZE and not more():
+                break
+        if not shown:
             print("🙅🏻 No bookings found.")
-            return
-        print("\n📋 Bookings:")
-        for b in bookings: # Loop through each booking and print its details
-            print(f"[{b[0]}] {b[1]} → Car ID {b[2]} | {b[3]} days | Status: {b[5]} | Fee: ${b[4]}") 
-
-    def view_pending_bookings(self): # View all pending bookings
-        self.cursor.execute("SELECT * FROM bookings WHERE status = 'pending'")
-        bookings = self.cursor.fetchall() # Fetch all bookings with status 'pending'
-        if not bookings:
-            print("🟡 No pending bookings.")
-            return
 
-        print("\n⌛ Pending Bookings:") 
-        for b in bookings:
-            print(f" [{b[0]}] {b[1]} → Car {b[2]} for {b[3]} days | Fee: ${b[4]}")
+    def view_pending_bookings(self, more=None): # View all pending bookings
+        shown = 0
+        for page in self.iter_bookings(status='pending'):
+            if not shown:
+                print("\n⌛ Pending Bookings:")
+            for b in page:
+                print(f" [{b[0]}] {b[1]} → Car {b[2]} for {b[3]} days from {b[6]} | Fee: ${b[4]}")
+            shown += len(page)
+            if more is not None and len(page) == PAGE_SIZE and not more():
+                break
+        if not shown:
+            print("🟡 No pending bookings.")
 
     def manage_booking(self, booking_id, approve=True): # Approve or reject a booking based on its ID
+        # Retries the whole short transaction with bounded exponential backoff when SQLite reports busy
+        for attempt in range(APPROVAL_RETRIES + 1):
+            try:
+                return self._manage_booking_once(booking_id, approve)
+            except sqlite3.OperationalError as e:
+                self._rollback()
+                if not is_busy_error(e):
+                    raise
+                if attempt == APPROVAL_RETRIES:
+                    self.approval_stats["busy_failures"] += 1
+                    print(f"❌ Booking ID {booking_id} could not be updated, the database is busy. Try again.")
+                    return False
+                self.approval_stats["retries"] += 1
+                time.sleep(min(APPROVAL_BACKOFF * (2 ** attempt), APPROVAL_MAX_BACKOFF) * random.uniform(0.5, 1.0))
+
+    def _manage_booking_once(self, booking_id, approve):
         status = 'approved' if approve else 'rejected'
-        self.cursor.execute("SELECT customer_name, car_id, days FROM bookings WHERE id = ?", (booking_id,))
-        booking = self.cursor.fetchone() # Fetch the booking details based on the provided booking ID
-        if not booking:
-            print(f"❌ Booking ID {booking_id} not found.")
-            return
-        customer_name, car_id, days = booking
-        self.cursor.execute("SELECT make, model FROM cars WHERE id = ?", (car_id,))
-        car = self.cursor.fetchone()
-        car_desc = f"{car[0]} {car[1]}" if car else "your car"
+        self._begin()
+        try:
+            self.cursor.execute("""
+                SELECT b.customer_name, b.car_id, b.days, b.start_date, b.end_date, b.status, b.total_fee, c.make
+                FROM bookings b JOIN cars c ON c.id = b.car_id WHERE b.id = ?
+            """, (booking_id,))
+            booking = self.cursor.fetchone() # Fetch the booking details based on the provided booking ID
+            if not booking:
+                self._rollback()
+                print(f"❌ Booking ID {booking_id} not found.")
+                return False
+            customer_name, car_id, days, start_date, end_date, current_status, total_fee, make = booking
+            if current_status != 'pending':
+                self._rollback()
+                self.approval_stats["conflicts"] += 1
+                print(f"⚠️ Booking ID {booking_id} is already {current_status}.")
+                return False
 
-        if approve:
-            self.cursor.execute("UPDATE cars SET available = 0 WHERE id = ?", (car_id,))
+            # Compare-and-set: only a still-pending booking changes, and an approval only succeeds
+            # while no approved rental of the same car overlaps its dates
+            if approve:
+                self.cursor.execute("""
+                    UPDATE bookings SET status = 'approved'
+                    WHERE id = ? AND status = 'pending' AND NOT EXISTS (
+                        SELECT 1 FROM bookings other
+                        WHERE other.car_id = ? AND other.status = 'approved'
+                          AND other.start_date < ? AND other.end_date > ?)
+                """, (booking_id, car_id, end_date, start_date))
+            else:
+                self.cursor.execute("UPDATE bookings SET status = 'rejected' WHERE id = ? AND status = 'pending'", (booking_id,))
+            if self.cursor.rowcount != 1:
+                self._rollback()
+                self.approval_stats["conflicts"] += 1
+                print(f"🚫 Car {car_id} is already rented between {start_date} and {end_date}; reject this booking instead.")
+                return False
+            reports.record_decision(self.cursor, car_id, make, start_date, days, total_fee, status)
 
-        self.cursor.execute("UPDATE bookings SET status = ? WHERE id = ?", (status, booking_id))
-        self.conn.commit()
+            if approve:
+                self.cursor.execute("SELECT email FROM users WHERE username = ?", (customer_name,))
+                user_email_row = self.cursor.fetchone()
+                if user_email_row:
+                    car = self.get_car(car_id)
+                    car_desc = f"{car[1]} {car[2]}" if car else "your car"
+                    user_email = user_email_row[0]
+                    subject = "✅ Booking Approved"
+                    body = (f"Hi {customer_name},\n\n"
+                            f"Your booking for {car_desc} has been approved.\n"
+                            f"Rental Duration: {days} days ({start_date} to {end_date}).\n\nThank you for choosing us!")
+                    queue_email(self.cursor, user_email, subject, body) # Queued in the same transaction as the approval
+            self._commit()
+        except Exception:
+            self._rollback()
+            raise
+        self._after_commit(self._notify_outbox)
+        self._car_written(car_id) # Keep the car's cached record in step with its booking state
+        self.approval_stats[status] += 1
 
         if approve:
+            self._after_commit(self.availability.reserve, car_id, start_date, end_date, booking_id)
             print(f"✅ Booking ID {booking_id} approved.")
         else:
             print(f"❌ Booking ID {booking_id} rejected.")
+        return True
 
-        if approve:
-            self.cursor.execute("SELECT email FROM users WHERE username = ?", (customer_name,))
-            user_email_row = self.cursor.fetchone()
-            if user_email_row:
-                user_email = user_email_row[0]
-                subject = "✅ Booking Approved"
-                body = (f"Hi {customer_name},\n\n"
-                        f"Your booking for {car_desc} has been approved.\n"
-                        f"Rental Duration: {days} days.\n\nThank you for choosing us!")
-                send_email(user_email, subject, body, dry_run=self.dry_run)
+    def return_car(self, booking_id, final_mileage, return_date=None):
+        # Check an approved rental back in: close the booking and record the odometer reading on the
+        # car in one transaction, then free the car's reservation from the return date on
+        returned_on = to_date(return_date or date.today())
+        self._begin()
+        try:
+            self.cursor.execute("""
+                SELECT b.car_id, b.status, b.start_date, b.total_fee, c.mileage
+                FROM bookings b JOIN cars c ON c.id = b.car_id WHERE b.id = ?
+            """, (booking_id,))
+            booking = self.cursor.fetchone()
+            problem = None
+            if not booking:
+                problem = f"❌ Booking ID {booking_id} not found."
+            else:
+                car_id, status, start_date, total_fee, mileage = booking
+                if status != 'approved':
+                    problem = f"⚠️ Booking ID {booking_id} is {status}; only approved rentals can be returned."
+                elif final_mileage < mileage:
+                    problem = f"🚫 Final mileage {final_mileage} is below the recorded {mileage}."
+                elif returned_on < to_date(start_date):
+                    problem = f"🚫 Return date {returned_on} is before the rental started ({start_date})."
+            if problem:
+                self._rollback()
+                print(problem)
+                return False
+            self.cursor.execute("""
+                UPDATE bookings SET status = 'returned', returned_on = ?, final_mileage = ?
+                WHERE id = ? AND status = 'approved'
+            """, (returned_on.isoformat(), final_mileage, booking_id))
+            reports.record_return(self.cursor, total_fee)
+            self.cursor.execute("UPDATE cars SET mileage = ? WHERE id = ?", (final_mileage, car_id))
+            self._commit()
+        except Exception:
+            self._rollback()
+            raise
+        self._after_commit(self.availability.release, booking_id) # Returned rentals no longer block new bookings
+        self._car_written(car_id) # Refresh the car's cached row and search row with the new mileage
+        print(f"🔑 Booking ID {booking_id} returned on {returned_on}; car {car_id} is free to book again.")
+        return True
+
+    def archive_bookings(self, older_than_days=archive.ARCHIVE_AFTER_DAYS, archive_dir=archive.ARCHIVE_DIR):
+        # Move returned/rejected bookings older than `older_than_days` into Parquet files
+        if not self._outside_transaction("Archival"):
+            return None
+        try:
+            report = archive.archive_closed_bookings(self.conn, archive_dir, older_than_days)
+        except (OSError, ImportError) as e:
+            print(f"❌ Archival failed: {e}")
+            return None
+        print(f"🗄️ {report}")
+        return report
+
+    def view_archived_bookings(self, customer_name=None, archive_dir=archive.ARCHIVE_DIR, more=None):
+        # Stream archived bookings page by page without loading the whole archive
+        shown = 0
+        for b in archive.iter_archived_bookings(archive_dir, customer_name=customer_name):
+            if not shown:
+                print("\n🗄️ Archived Bookings:")
+            returned = f" | Returned {b['returned_on']}" if b['returned_on'] else ""
+            print(f"[{b['id']}] {b['customer_name']} → {b['make']} {b['model']} (Car {b['car_id']}) | "
+                  f"{b['days']} days from {b['start_date']} | Status: {b['status']} | Fee: ${b['total_fee']}{returned}")
+            shown += 1
+            if more is not None and shown % PAGE_SIZE == 0 and not more():
+                break
+        if not shown:
+            print("🙅🏻 No archived bookings found.")
 
     def generate_bill(self, booking_id):
         self.cursor.execute("""
@@ -178,38 +753,72 @@ class RentalService: # Main service class for car rental operations
         """, (booking_id,))
         booking = self.cursor.fetchone()
 
-        if not booking or booking[4] != 'approved':
+        if not booking or booking[4] not in reports.REVENUE_STATUSES: # Approved, or approved and since returned
             print("❌ Bill can only be generated for approved bookings.")
             return
 
         customer_name, car_id, days, total_fee, _, make, model, year, rate = booking
-        tax_rate = 0.10
-        tax_amount = total_fee * tax_rate
-        grand_total = total_fee + tax_amount
-
-        bill = f"""
-===== Car Rental Bill =====
-
-Customer Name: {customer_name}
-Car: {make} {model} ({year})
-Rental Duration: {days} days
-Rate per day: ${rate:.2f}
------------------------------
-Subtotal: ${total_fee:.2f}
-Tax (10%): ${tax_amount:.2f}
------------------------------
-Total Amount Due: ${grand_total:.2f}
-
-Status: Approved
-
-Thank you for renting with us!
-=============================
-"""
+        bill = billing.render_bill(customer_name, days, total_fee, make, model, year, rate)
         print("🧾 Generating bill...\n")
         print(bill)
         return bill
 
+    def run_batch_billing(self, output, fmt="dir", workers=4, resume=True):
+        # Render bills for every approved booking in one streamed pass
+        try:
+            report = billing.run_batch_billing(self.conn, output, fmt, workers, resume)
+        except (OSError, ValueError) as e:
+            print(f"❌ Batch billing failed: {e}")
+            return None
+        print(f"🧾 {report}")
+        return report
+
+    def show_reports(self, month=None):
+        # Print status totals, revenue by make and month, and utilization, all read from the summary tables
+        month = month or date.today().strftime("%Y-%m")
+        try:
+            datetime.strptime(month, "%Y-%m")
+        except ValueError:
+            print("❌ Month must look like YYYY-MM.")
+            return
+        totals, approval_rate = reports.status_report(self.conn)
+        print("\n📊 Bookings by status:")
+        for status, (count, fees) in sorted(totals.items()):
+            print(f"   {status:10s} {count:8d} bookings | ${fees:,.2f}")
+        if approval_rate is not None:
+            print(f"   Approval rate: {approval_rate:.1%}")
+
+        print(f"\n💰 Revenue by make ({month}):")
+        for make, bookings, approved, revenue, rented_days in reports.revenue_by_make(self.conn, month):
+            print(f"   {make:15s} {approved:6d} approved of {bookings:6d} | {rented_days:6d} days | ${revenue:,.2f}")
+
+        print("\n📅 Revenue by month:")
+        for row_month, bookings, approved, revenue, rented_days in reports.revenue_by_month(self.conn)[-12:]:
+            print(f"   {row_month} {approved:6d} approved of {bookings:6d} | {rented_days:6d} days | ${revenue:,.2f}")
+
+        print(f"\n🚗 Utilization by make ({month}):")
+        for make, cars, rented_days, utilization in reports.utilization_by_make(self.conn, month):
+            print(f"   {make:15s} {cars:5d} cars | {rented_days:6d} days rented | {utilization:.1%}")
+
+        print(f"\n🏆 Top cars ({month}):")
+        for car_id, approved, revenue, rented_days, utilization in reports.top_cars(self.conn, month):
+            print(f"   Car {car_id}: {approved} rental(s) | {rented_days} days ({utilization:.0%}) | ${revenue:,.2f}")
+
+    def rebuild_summaries(self, archive_dir=archive.ARCHIVE_DIR):
+        # Recompute the report tables from scratch and show any drift from the incremental updates;
+        # archive_dir must be the one archive_bookings() wrote to, since archived history still counts
+        if not self._outside_transaction("Summary rebuild"):
+            return None
+        differences = reports.rebuild_summaries(self.conn, archive.iter_archived_bookings(archive_dir))
+        if not differences:
+            print("✅ Report summaries verified: incremental totals match a full rebuild.")
+        else:
+            print(f"⚠️ {len(differences)} summary row(s) differed and were rebuilt:")
+            for table, key, stored, rebuilt in differences[:20]:
+                print(f"   {table} {key}: {stored} -> {rebuilt}")
+        return differences
+
     def close(self):
         self.cursor.close()
-        self.conn.close()
+        self.pool.release(self.conn) # Hand the connection back to the pool for other workers
         print("🔒 Database connection closed.")
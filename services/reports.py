@@ -0,0 +1,202 @@
+import calendar # Days per month for utilization
+from functools import lru_cache # Upsert statements are built once per shape
+
+# Summary tables (created by migration 4) are maintained row by row inside the booking and
+# approval transactions, so reports read a handful of pre-aggregated rows instead of every booking.
+# Month is the YYYY-MM of a rental's start date; revenue and rented days count approved bookings,
+# including approved rentals that have since been returned.
+SUMMARY_TABLES = ("summary_status", "summary_car_month", "summary_make_month", "summary_make_fleet")
+REVENUE_STATUSES = ("approved", "returned")
+
+# Full recomputation from bookings and cars, used by rebuild_summaries()
+REBUILD_SQL = [
+    "INSERT INTO summary_status SELECT status, COUNT(*), SUM(total_fee) FROM bookings GROUP BY status",
+    """
+    INSERT INTO summary_car_month
+    SELECT car_id, substr(start_date, 1, 7), COUNT(*), SUM(status IN ('approved', 'returned')), SUM(status = 'rejected'),
+           SUM(CASE WHEN status IN ('approved', 'returned') THEN total_fee ELSE 0 END),
+           SUM(CASE WHEN status IN ('approved', 'returned') THEN days ELSE 0 END)
+    FROM bookings GROUP BY car_id, substr(start_date, 1, 7)
+    """,
+    """
+    INSERT INTO summary_make_month
+    SELECT c.make, substr(b.start_date, 1, 7), COUNT(*), SUM(b.status IN ('approved', 'returned')), SUM(b.status = 'rejected'),
+           SUM(CASE WHEN b.status IN ('approved', 'returned') THEN b.total_fee ELSE 0 END),
+           SUM(CASE WHEN b.status IN ('approved', 'returned') THEN b.days ELSE 0 END)
+    FROM bookings b JOIN cars c ON c.id = b.car_id GROUP BY c.make, substr(b.start_date, 1, 7)
+    """,
+    "INSERT INTO summary_make_fleet SELECT make, COUNT(*) FROM cars GROUP BY make",
+]
+TABLE_KEYS = {"summary_status": 1, "summary_car_month": 2, "summary_make_month": 2, "summary_make_fleet": 1} # Leading key columns
+
+def rental_month(start_date):
+    # 'YYYY-MM' for a date or ISO date string
+    return str(start_date)[:7]
+
+def days_in_month(month):
+    # Number of days in a 'YYYY-MM' month
+    return calendar.monthrange(int(month[:4]), int(month[5:7]))[1]
+
+@lru_cache(maxsize=None)
+def _upsert_sql(table, key_columns, delta_columns):
+    columns = key_columns + delta_columns
+    updates = ", ".join(f"{column} = {column} + excluded.{column}" for column in delta_columns)
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {updates}")
+
+def _bump(cursor, table, keys, deltas):
+    # Add `deltas` to the summary row identified by `keys`, creating it if needed
+    cursor.execute(_upsert_sql(table, tuple(keys), tuple(deltas)), (*keys.values(), *deltas.values()))
+
+def record_status_change(cursor, old_status, new_status, total_fee):
+    # Move one booking between status totals (old_status None for a new booking)
+    if old_status:
+        _bump(cursor, "summary_status", {"status": old_status}, {"bookings": -1, "fees": -total_fee})
+    _bump(cursor, "summary_status", {"status": new_status}, {"bookings": 1, "fees": total_fee})
+
+def record_booking(cursor, car_id, make, start_date, total_fee):
+    """Count a new pending booking, using the caller's cursor so it commits with the booking."""
+    month = rental_month(start_date)
+    record_status_change(cursor, None, "pending", total_fee)
+    _bump(cursor, "summary_car_month", {"car_id": car_id, "month": month}, {"bookings": 1})
+    _bump(cursor, "summary_make_month", {"make": make, "month": month}, {"bookings": 1})
+
+def record_decision(cursor, car_id, make, start_date, days, total_fee, status):
+    """Count a pending booking becoming 'approved' or 'rejected', in the caller's transaction."""
+    month = rental_month(start_date)
+    record_status_change(cursor, "pending", status, total_fee)
+    if status == "approved":
+        deltas = {"approved": 1, "revenue": total_fee, "rented_days": days}
+    else:
+        deltas = {"rejected": 1}
+    _bump(cursor, "summary_car_month", {"car_id": car_id, "month": month}, deltas)
+    _bump(cursor, "summary_make_month", {"make": make, "month": month}, deltas)
+
+def record_return(cursor, total_fee):
+    # An approved rental checked back in; its revenue and rented days were counted at approval
+    record_status_change(cursor, "approved", "returned", total_fee)
+
+def _add_archived(conn, bookings):
+    # Fold archived bookings (dicts from archive.iter_archived_bookings) back into the rebuilt totals
+    status_totals, car_months, make_months = {}, {}, {}
+    for booking in bookings:
+        status, fee = booking["status"], booking["total_fee"]
+        count, fees = status_totals.get(status, (0, 0.0))
+        status_totals[status] = (count + 1, fees + fee)
+        month = rental_month(booking["start_date"])
+        earned = status in REVENUE_STATUSES
+        deltas = (1, int(earned), int(status == "rejected"), fee if earned else 0.0, booking["days"] if earned else 0)
+        for totals, key in ((car_months, (booking["car_id"], month)), (make_months, (booking["make"], month))):
+            current = totals.get(key, (0, 0, 0, 0.0, 0))
+            totals[key] = tuple(a + b for a, b in zip(current, deltas))
+    cursor = conn.cursor()
+    for status, (count, fees) in status_totals.items():
+        _bump(cursor, "summary_status", {"status": status}, {"bookings": count, "fees": fees})
+    for table, key_columns, totals in (("summary_car_month", ("car_id", "month"), car_months),
+                                       ("summary_make_month", ("make", "month"), make_months)):
+        for key, (count, approved, rejected, revenue, rented_days) in totals.items():
+            _bump(cursor, table, dict(zip(key_columns, key)),
+                  {"bookings": count, "approved": approved, "rejected": rejected,
+                   "revenue": revenue, "rented_days": rented_days})
+
+def _table_rows(conn, table):
+    # {key tuple: value tuple}, rounding money to cents and skipping all-zero rows
+    split = TABLE_KEYS[table]
+    rows = {}
+    for row in conn.execute(f"SELECT * FROM {table}"):
+        values = tuple(round(value, 2) if isinstance(value, float) else value for value in row[split:])
+        if any(values):
+            rows[row[:split]] = values
+    return rows
+
+def rebuild_summaries(conn, archived=()):
+    """Recompute every summary table from bookings and cars, plus any archived bookings.
+
+    Returns the differences between the incrementally maintained rows and the recomputed
+    ones as (table, key, stored, rebuilt) tuples; an empty list means they agreed.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        before = {table: _table_rows(conn, table) for table in SUMMARY_TABLES}
+        for table in SUMMARY_TABLES:
+            conn.execute(f"DELETE FROM {table}")
+        for statement in REBUILD_SQL:
+            conn.execute(statement)
+        _add_archived(conn, archived)
+        after = {table: _table_rows(conn, table) for table in SUMMARY_TABLES}
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    differences = []
+    for table in SUMMARY_TABLES:
+        for key in sorted(set(before[table]) | set(after[table]), key=str):
+            stored, rebuilt = before[table].get(key), after[table].get(key)
+            if stored != rebuilt:
+                differences.append((table, key, stored, rebuilt))
+    return differences
+
+def status_report(conn):
+    # {status: (bookings, fees)} plus the approval rate of decided bookings
+    totals = {status: (bookings, fees) for status, bookings, fees in
+              conn.execute("SELECT status, bookings, fees FROM summary_status WHERE bookings > 0")}
+    approved = sum(totals.get(status, (0, 0))[0] for status in REVENUE_STATUSES)
+    rejected = totals.get("rejected", (0, 0))[0]
+    decided = approved + rejected
+    return totals, (approved / decided if decided else None)
+
+def revenue_by_make(conn, month=None):
+    # (make, bookings, approved, revenue, rented_days), highest revenue first
+    if month:
+        return conn.execute("""
+            SELECT make, bookings, approved, revenue, rented_days FROM summary_make_month
+            WHERE month = ? ORDER BY revenue DESC
+        """, (month,)).fetchall()
+    return conn.execute("""
+        SELECT make, SUM(bookings), SUM(approved), SUM(revenue), SUM(rented_days) FROM summary_make_month
+        GROUP BY make ORDER BY SUM(revenue) DESC
+    """).fetchall()
+
+def revenue_by_month(conn, make=None):
+    # (month, bookings, approved, revenue, rented_days), oldest month first
+    if make:
+        return conn.execute("""
+            SELECT month, bookings, approved, revenue, rented_days FROM summary_make_month
+            WHERE make = ? ORDER BY month
+        """, (make,)).fetchall()
+    return conn.execute("""
+        SELECT month, SUM(bookings), SUM(approved), SUM(revenue), SUM(rented_days) FROM summary_make_month
+        GROUP BY month ORDER BY month
+    """).fetchall()
+
+def top_cars(conn, month, limit=10):
+    # (car_id, approved, revenue, rented_days, utilization) for one month, highest revenue first
+    month_days = days_in_month(month)
+    rows = conn.execute("""
+        SELECT car_id, approved, revenue, rented_days FROM summary_car_month
+        WHERE month = ? ORDER BY revenue DESC LIMIT ?
+    """, (month, limit)).fetchall()
+    return [(*row, row[3] / month_days) for row in rows]
+
+def utilization_by_make(conn, month):
+    # (make, fleet cars, rented_days, utilization) for one month: rented days / (cars x days in month)
+    month_days = days_in_month(month)
+    rows = conn.execute("""
+        SELECT f.make, f.cars, COALESCE(m.rented_days, 0) FROM summary_make_fleet f
+        LEFT JOIN summary_make_month m ON m.make = f.make AND m.month = ?
+        WHERE f.cars > 0 ORDER BY f.make
+    """, (month,)).fetchall()
+    return [(make, cars, days, days / (cars * month_days)) for make, cars, days in rows]
+
+def merge_totals(row_sets, key_columns=1):
+    """Sum report rows from several branch databases that share their leading `key_columns` values.
+
+    Rows keep the shape of their inputs and come back ordered by key.
+    """
+    merged = {}
+    for rows in row_sets:
+        for row in rows:
+            key, values = tuple(row[:key_columns]), row[key_columns:]
+            current = merged.get(key)
+            merged[key] = values if current is None else tuple(a + b for a, b in zip(current, values))
+    return [(*key, *values) for key, values in sorted(merged.items())]
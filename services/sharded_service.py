@@ -0,0 +1,247 @@
+# Multi-branch front end: one RentalService per branch database, behind a ShardRouter.
+# Car and booking operations run on the branch that owns the id; fleet-wide listings and
+# reports fan out to every branch in parallel and merge the per-branch results.
+import heapq # Merges per-branch pages that are already ordered
+from datetime import date, datetime # For the report month
+from db_connection import ShardRouter # Per-branch pools and the fan-out thread pool
+from services.rental_service import RentalService, PAGE_SIZE # Per-branch service
+from services import reports # Summary-table queries and cross-branch merging
+
+class ShardedRentalService:
+    def __init__(self, router=None):
+        self.router = router or ShardRouter()
+        self.services = {branch: RentalService(self.router.pool(branch)) for branch in self.router.branches}
+        self.home = self.services[self.router.branches[0]] # Sessions and logins are served by the first branch
+
+    def _owner(self, row_id):
+        # RentalService of the branch that owns a car or booking id, or None for an id outside every range
+        try:
+            return self.services[self.router.branch_for_id(row_id)]
+        except KeyError:
+            return None
+
+    def _each(self, method_name, *args, **kwargs):
+        # Call the same RentalService method on every branch in parallel; {branch: result}
+        return self.router.map(lambda branch: getattr(self.services[branch], method_name)(*args, **kwargs))
+
+    # --- users: replicated to every branch, since bookings reference customers locally ---
+
+    def register_user(self, username, password, role, email):
+        # Register on every branch or on none: a user missing from one branch could not book there,
+        # and a name left behind on some branches would make every retry fail as a duplicate
+        if not username or not password or not role or not email:
+            print("All fields are required for registration.")
+            return False
+        if any(self._each("user_exists", username).values()):
+            print(f"❌ Registration failed: username '{username}' already exists.")
+            return False
+        password_hash = self.home.auth.hash_password(password) # bcrypt once, shared by every branch
+        added = self._each("add_user", username, password_hash, role, email)
+        if all(added.values()):
+            return True
+        for branch, ok in added.items(): # Another registration raced us on some branch: undo ours
+            if ok:
+                self.services[branch].remove_user(username)
+        return False
+
+    def login_user(self, username, password):
+        return self.home.login_user(username, password)
+
+    def create_session(self, username, password):
+        return self.home.create_session(username, password)
+
+    def validate_session(self, token):
+        return self.home.validate_session(token)
+
+    # --- single-branch operations, routed by branch name or id ---
+
+    def add_car(self, branch, make, model, year, mileage, rate, min_days, max_days):
+        if branch not in self.services:
+            print(f"❌ Unknown branch '{branch}'. Branches: {', '.join(self.router.branches)}.")
+            return
+        self.services[branch].add_car(make, model, year, mileage, rate, min_days, max_days)
+
+    def import_cars(self, branch, path, fmt=None):
+        if branch not in self.services:
+            print(f"❌ Unknown branch '{branch}'. Branches: {', '.join(self.router.branches)}.")
+            return None
+        return self.services[branch].import_cars(path, fmt)
+
+    def get_car(self, car_id):
+        service = self._owner(car_id)
+        return service.get_car(car_id) if service else None
+
+    def update_car(self, car_id, mileage, rate):
+        service = self._owner(car_id)
+        if not service:
+            print(f"❌ Car ID {car_id} not found.")
+            return
+        service.update_car(car_id, mileage, rate)
+
+    def delete_car(self, car_id):
+        service = self._owner(car_id)
+        if not service:
+            print(f"❌ Car ID {car_id} not found.")
+            return
+        service.delete_car(car_id)
+
+    def book_car(self, customer_name, car_id, days, start_date=None):
+        # The booking is written to the car's branch, so its id routes back there too
+        service = self._owner(car_id)
+        if not service:
+            print("❌ Car not found or unavailable.")
+            return
+        return service.book_car(customer_name, car_id, days, start_date)
+
+    def get_booking(self, booking_id):
+        service = self._owner(booking_id)
+        return service.get_booking(booking_id) if service else None
+
+    def manage_booking(self, booking_id, approve=True):
+        service = self._owner(booking_id)
+        if not service:
+            print(f"❌ Booking ID {booking_id} not found.")
+            return False
+        return service.manage_booking(booking_id, approve)
+
+    def return_car(self, booking_id, final_mileage, return_date=None):
+        service = self._owner(booking_id)
+        if not service:
+            print(f"❌ Booking ID {booking_id} not found.")
+            return False
+        return service.return_car(booking_id, final_mileage, return_date)
+
+    def generate_bill(self, booking_id):
+        service = self._owner(booking_id)
+        if not service:
+            print("❌ Bill can only be generated for approved bookings.")
+            return
+        return service.generate_bill(booking_id)
+
+    # --- cross-branch queries, fanned out and merged ---
+
+    def list_cars_page(self, after_id=0, limit=PAGE_SIZE, **filters):
+        # One keyset page of cars across all branches, ordered by id
+        pages = self._each("list_cars_page", after_id, limit, **filters).values()
+        return list(heapq.merge(*pages))[:limit]
+
+    def find_available_cars(self, start_date, end_date):
+        # Fleet cars free for [start_date, end_date) in every branch (branch id ranges keep id order)
+        return [car for cars in self._each("find_available_cars", start_date, end_date).values() for car in cars]
+
+    def find_cars(self, limit=PAGE_SIZE, sort="rate", descending=False, start_date=None, **filters):
+        # Top `limit` cars across branches, in the same (sort key, id) order as a single database
+        per_branch = self._each("find_cars", limit, sort, descending, start_date, **filters).values()
+        attribute, sign = ("car_id" if sort == "id" else sort), (-1 if descending else 1)
+        return heapq.nsmallest(limit, (car for cars in per_branch for car in cars),
+                               key=lambda car: (sign * getattr(car, attribute), car.car_id))
+
+    def list_bookings_page(self, after_id=0, limit=PAGE_SIZE, customer_name=None, status=None):
+        # One keyset page of bookings across all branches, ordered by id
+        pages = self._each("list_bookings_page", after_id, limit, customer_name, status).values()
+        return list(heapq.merge(*pages))[:limit]
+
+    def iter_bookings(self, page_size=PAGE_SIZE, **filters):
+        after_id = 0
+        while True:
+            page = self.list_bookings_page(after_id, page_size, **filters)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after_id = page[-1][0]
+
+    def display_available_cars(self, start_date=None, end_date=None):
+        # Every branch's free cars, grouped by branch
+        if start_date and end_date:
+            per_branch = self._each("find_available_cars", start_date, end_date)
+        else:
+            per_branch = self.router.map(lambda branch: [car for page in self.services[branch].iter_cars() for car in page])
+        if not any(per_branch.values()):
+            print("⛔ No available cars found.")
+            return
+        print("\n🚘 Available Cars:")
+        for branch, cars in per_branch.items():
+            if cars:
+                print(f"📍 {branch}:")
+            for car in cars:
+                print(f"[{car[0]}] {car[1]} {car[2]} ({car[3]}) | Mileage: {car[4]} | Rate: ${car[5]}")
+
+    def view_bookings(self, customer_name=None, status=None, more=None):
+        shown = 0
+        for page in self.iter_bookings(customer_name=customer_name, status=status):
+            if not shown:
+                print("\n📋 Bookings:")
+            for b in page:
+                branch = self.router.branch_for_id(b[0])
+                print(f"[{b[0]}] {b[1]} → Car ID {b[2]} ({branch}) | {b[3]} days from {b[6]} | Status: {b[5]} | Fee: ${b[4]}")
+            shown += len(page)
+            if more is not None and len(page) == PAGE_SIZE and not more():
+                break
+        if not shown:
+            print("🙅🏻 No bookings found.")
+
+    def view_pending_bookings(self, more=None):
+        self.view_bookings(status="pending", more=more)
+
+    def report(self, month):
+        # Fleet-wide report data: every branch's summary tables read in parallel, then merged
+        def branch_report(branch):
+            conn = self.services[branch].conn
+            totals, _ = reports.status_report(conn)
+            return (totals, reports.revenue_by_make(conn, month), reports.revenue_by_month(conn),
+                    reports.utilization_by_make(conn, month), reports.top_cars(conn, month))
+        per_branch = list(self.router.map(branch_report).values())
+        totals = {}
+        for branch_totals, *_ in per_branch:
+            for status, (count, fees) in branch_totals.items():
+                current = totals.get(status, (0, 0.0))
+                totals[status] = (current[0] + count, current[1] + fees)
+        approved = sum(totals.get(status, (0, 0))[0] for status in reports.REVENUE_STATUSES)
+        decided = approved + totals.get("rejected", (0, 0))[0]
+        by_make = sorted(reports.merge_totals(r[1] for r in per_branch), key=lambda row: -row[3])
+        by_month = reports.merge_totals(r[2] for r in per_branch)
+        days_in_month = reports.days_in_month(month)
+        utilization = [(make, cars, rented_days, rented_days / (cars * days_in_month)) for make, cars, rented_days
+                       in reports.merge_totals([row[:3] for row in r[3]] for r in per_branch)]
+        top = heapq.nlargest(10, (car for r in per_branch for car in r[4]), key=lambda car: car[2])
+        return {"status": totals, "approval_rate": approved / decided if decided else None, "by_make": by_make,
+                "by_month": by_month, "utilization": utilization, "top_cars": top}
+
+    def show_reports(self, month=None):
+        month = month or date.today().strftime("%Y-%m")
+        try:
+            datetime.strptime(month, "%Y-%m")
+        except ValueError:
+            print("❌ Month must look like YYYY-MM.")
+            return
+        data = self.report(month)
+        print(f"\n🏢 All branches ({', '.join(self.router.branches)})")
+        print("\n📊 Bookings by status:")
+        for status, (count, fees) in sorted(data["status"].items()):
+            print(f"   {status:10s} {count:8d} bookings | ${fees:,.2f}")
+        if data["approval_rate"] is not None:
+            print(f"   Approval rate: {data['approval_rate']:.1%}")
+
+        print(f"\n💰 Revenue by make ({month}):")
+        for make, bookings, approved, revenue, rented_days in data["by_make"]:
+            print(f"   {make:15s} {approved:6d} approved of {bookings:6d} | {rented_days:6d} days | ${revenue:,.2f}")
+
+        print("\n📅 Revenue by month:")
+        for row_month, bookings, approved, revenue, rented_days in data["by_month"][-12:]:
+            print(f"   {row_month} {approved:6d} approved of {bookings:6d} | {rented_days:6d} days | ${revenue:,.2f}")
+
+        print(f"\n🚗 Utilization by make ({month}):")
+        for make, cars, rented_days, utilization in data["utilization"]:
+            print(f"   {make:15s} {cars:5d} cars | {rented_days:6d} days rented | {utilization:.1%}")
+
+        print(f"\n🏆 Top cars ({month}):")
+        for car_id, approved, revenue, rented_days, utilization in data["top_cars"]:
+            branch = self.router.branch_for_id(car_id)
+            print(f"   Car {car_id} ({branch}): {approved} rental(s) | {rented_days} days ({utilization:.0%}) | ${revenue:,.2f}")
+
+    def close(self):
+        for service in self.services.values():
+            service.close()
+        self.router.close()
@@ -0,0 +1,30 @@
+# Shared fixtures: every test gets its own freshly initialized database file.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Repository root
+os.environ.setdefault("EMAIL_DRY_RUN", "true") # Never talk to a real SMTP server
+os.environ.setdefault("CAR_RENTAL_METRICS", "false")
+
+import pytest
+
+from db_connection import initialize_database, ConnectionPool
+from services.rental_service import RentalService
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "car_rental.db")
+    initialize_database(path) # Tables, migrations, sample cars and the default admin/customer users
+    return path
+
+@pytest.fixture
+def pool(db_path):
+    pool = ConnectionPool(db_path)
+    yield pool
+    pool.close()
+
+@pytest.fixture
+def service(pool):
+    service = RentalService(pool)
+    yield service
+    service.close()
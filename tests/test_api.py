@@ -0,0 +1,73 @@
+# HTTP/JSON API end to end: a real server on a free port, driven with api_server.fetch.
+import asyncio
+
+from api_server import RentalApi, fetch
+from services.rental_service import RentalService
+
+def with_api(pool, scenario):
+    # Run `scenario(port)` against a started server and shut it down afterwards
+    async def main():
+        api = RentalApi(pool, workers=4)
+        await api.start(port=0)
+        try:
+            return await scenario(api.port)
+        finally:
+            await api.shutdown()
+    return asyncio.run(main())
+
+async def login(port, username, password):
+    status, body = await fetch(port, "POST", "/login", {"username": username, "password": password})
+    assert status == 200, body
+    return body["token"]
+
+def test_login_and_auth_errors(pool):
+    async def scenario(port):
+        token = await login(port, "customer", "cust123")
+        assert (await fetch(port, "POST", "/login", {"username": "customer", "password": "wrong"}))[0] == 401
+        assert (await fetch(port, "GET", "/cars"))[0] == 401
+        assert (await fetch(port, "GET", "/cars", token="not-a-token"))[0] == 401
+        assert (await fetch(port, "GET", "/cars", token=token))[0] == 200
+        assert (await fetch(port, "POST", "/bookings/1/approve", token=token))[0] == 403
+    with_api(pool, scenario)
+
+def test_bad_parameters_are_400(pool):
+    async def scenario(port):
+        token = await login(port, "customer", "cust123")
+        for path in ("/cars?limit=ten", "/cars?limit=0", "/cars?limit=-1", "/cars?max_rate=cheap",
+                     "/cars?start_date=2030-13-01&end_date=2030-12-05", "/cars?start_date=2030-01-05&end_date=2030-01-01"):
+            assert (await fetch(port, "GET", path, token=token))[0] == 400, path
+        for body in ({"car_id": 1, "days": "three"}, {"car_id": 1}, {"car_id": 1, "days": 3, "start_date": "tomorrow"},
+                     {"car_id": 1, "days": 3, "start_date": "2020-01-01"}):
+            assert (await fetch(port, "POST", "/bookings", body, token=token))[0] == 400, body
+    with_api(pool, scenario)
+
+def test_date_listing_applies_filters(pool):
+    async def scenario(port):
+        token = await login(port, "customer", "cust123")
+        status, body = await fetch(port, "GET", "/cars?start_date=2030-01-01&end_date=2030-01-05&max_rate=40", token=token)
+        assert status == 200
+        return body["cars"]
+    cars = with_api(pool, scenario)
+    assert cars and all(car["rate"] <= 40 for car in cars)
+
+def test_book_approve_bill(pool):
+    async def scenario(port):
+        customer, admin = await login(port, "customer", "cust123"), await login(port, "admin", "admin123")
+        status, body = await fetch(port, "POST", "/bookings", {"car_id": 1, "days": 3, "start_date": "2030-04-01"}, token=customer)
+        assert status == 201, body
+        booking_id = body["booking_id"]
+        assert (await fetch(port, "GET", f"/bookings/{booking_id}/bill", token=customer))[0] == 409 # Not approved yet
+        assert (await fetch(port, "POST", f"/bookings/{booking_id}/approve", token=admin))[0] == 200
+        return await fetch(port, "GET", f"/bookings/{booking_id}/bill", token=customer)
+    status, body = with_api(pool, scenario)
+    assert status == 200 and "customer" in body["bill"]
+
+def test_internal_errors_are_not_leaked(pool, monkeypatch):
+    def broken(self, text, limit):
+        raise RuntimeError("secret detail")
+    monkeypatch.setattr(RentalService, "search_cars", broken)
+    async def scenario(port):
+        token = await login(port, "customer", "cust123")
+        return await fetch(port, "GET", "/cars/search?q=toy", token=token)
+    status, body = with_api(pool, scenario)
+    assert status == 500 and body == {"error": "Internal server error."}
@@ -0,0 +1,72 @@
+# Concurrent approvals: many admins racing to approve overlapping bookings of the same cars must
+# end with exactly one approved booking per car. A scaled-down run of benchmarks/bench_approvals.py.
+import random
+import threading
+
+from benchmarks.bench_approvals import seed
+from db_connection import ConnectionPool, get_connection
+from services.availability import get_availability_index
+from services.rental_service import RentalService
+
+THREADS = 8
+CARS = 20
+COMPETING = 4 # Overlapping bookings per car
+
+def test_one_approval_per_car_under_contention(db_path):
+    booking_ids = seed(db_path, CARS, COMPETING)
+    pool = ConnectionPool(db_path, max_size=THREADS)
+    conn = get_connection(db_path)
+    get_availability_index(db_path).ensure_loaded(conn.cursor()) # Already built, as on a server that has answered a search
+    conn.close()
+    start_gate = threading.Barrier(THREADS)
+    services, errors = [], []
+
+    def approver(seed_value):
+        service = RentalService(pool)
+        services.append(service)
+        order = booking_ids[:]
+        random.Random(seed_value).shuffle(order)
+        start_gate.wait()
+        try:
+            for booking_id in order:
+                service.manage_booking(booking_id, approve=True)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=approver, args=(n,)) for n in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+
+    conn = get_connection(db_path)
+    per_car = conn.execute("SELECT car_id, COUNT(*) FROM bookings WHERE status = 'approved' GROUP BY car_id").fetchall()
+    conn.close()
+    still_free = services[0].availability.free_cars([car_id for car_id, _ in per_car], "2030-01-03", "2030-01-04")
+    approved = sum(service.approval_stats["approved"] for service in services)
+    busy_failures = sum(service.approval_stats["busy_failures"] for service in services)
+    for service in services:
+        service.close()
+    pool.close()
+
+    assert errors == []
+    assert busy_failures == 0
+    assert len(per_car) == CARS and all(count == 1 for _, count in per_car)
+    assert approved == CARS # Every winner was reported once, by the thread whose update won
+    assert still_free == [] # Each winning reservation reached the shared availability index
+
+def test_availability_index_built_on_first_query(service):
+    assert not service.availability.loaded # Constructing a service doesn't read every approved booking
+    service.book_car("customer", 1, 2, "2030-03-01")
+    assert service.availability.loaded
+
+def test_past_bookings_rejected_and_not_indexed(service):
+    assert service.book_car("customer", 1, 2, "2020-01-01") is None
+    service.conn.execute("""
+        INSERT INTO bookings (customer_name, car_id, days, total_fee, status, start_date, end_date)
+        VALUES ('customer', 2, 3, 90.0, 'approved', '2020-01-01', '2020-01-04')
+    """)
+    service.conn.commit()
+    assert service.book_car("customer", 3, 2, "2030-05-01") # Builds the index
+    assert service.availability.loaded
+    assert service.availability.free_cars([2], "2020-01-02", "2020-01-03") == [2] # Ended rentals aren't loaded
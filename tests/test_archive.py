@@ -0,0 +1,27 @@
+# Archival reruns: a run that crashed after writing Parquet files but before deleting the rows must
+# not archive those rows a second time, even when the rerun splits them into different files.
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from services import archive
+
+def close_bookings(conn, ids):
+    conn.executemany("""
+        INSERT INTO bookings (id, customer_name, car_id, days, total_fee, status, start_date, end_date, returned_on)
+        VALUES (?, 'customer', 1, 3, 90.0, 'returned', '2020-01-01', '2020-01-04', '2020-01-04')
+    """, [(booking_id,) for booking_id in ids])
+    conn.commit()
+
+def test_rerun_after_crash_archives_each_booking_once(service, tmp_path):
+    conn = service.conn
+    close_bookings(conn, [1, 2, 3])
+    archive.archive_closed_bookings(conn, str(tmp_path))
+    close_bookings(conn, [1, 2, 3]) # The delete never committed...
+    close_bookings(conn, [4]) # ...and another booking of the same month closed since
+
+    report = archive.archive_closed_bookings(conn, str(tmp_path))
+
+    assert report.archived == 4 and report.files == 1
+    assert sorted(row["id"] for row in archive.iter_archived_bookings(str(tmp_path))) == [1, 2, 3, 4]
+    assert conn.execute("SELECT COUNT(*) FROM bookings").fetchone()[0] == 0
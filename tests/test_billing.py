@@ -0,0 +1,78 @@
+# Batch billing into a directory, a zip archive and a JSONL file: full runs, resumed runs that only
+# bill new bookings, and a run interrupted between writing a chunk and checkpointing it.
+import json
+import os
+import zipfile
+
+import pytest
+
+from services import billing
+
+FORMATS = ["dir", "zip", "jsonl"]
+
+def approve_bookings(conn, count):
+    conn.executemany("""
+        INSERT INTO bookings (customer_name, car_id, days, total_fee, status, start_date, end_date)
+        VALUES ('customer', 1, 3, 137.97, 'approved', '2030-01-01', '2030-01-04')
+    """, [()] * count)
+    conn.commit()
+
+def billed_ids(output, fmt):
+    # Booking ids with a bill in the output, duplicates included
+    if fmt == "dir":
+        names = os.listdir(output)
+    elif fmt == "zip":
+        with zipfile.ZipFile(output) as archive:
+            names = archive.namelist()
+    else:
+        with open(output, encoding="utf-8") as f:
+            return sorted(json.loads(line)["booking_id"] for line in f)
+    return sorted(int(name[len("bill_booking_"):-len(".txt")]) for name in names)
+
+def output_path(tmp_path, fmt):
+    return str(tmp_path / ("bills" if fmt == "dir" else f"bills.{fmt}"))
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_full_run_then_resume_bills_only_new_bookings(service, tmp_path, fmt):
+    output = output_path(tmp_path, fmt)
+    approve_bookings(service.conn, 25)
+    report = service.run_batch_billing(output, fmt)
+    assert report.bills == 25
+    assert billed_ids(output, fmt) == list(range(1, 26))
+    if fmt == "dir":
+        with open(os.path.join(output, billing.bill_filename(1))) as f:
+            assert "Total Amount Due: $151.77" in f.read()
+
+    approve_bookings(service.conn, 5)
+    report = billing.run_batch_billing(service.conn, output, fmt, resume=True, chunk_size=10)
+    assert (report.resumed_after, report.bills) == (25, 5)
+    assert billed_ids(output, fmt) == list(range(1, 31))
+
+@pytest.mark.parametrize("fmt", FORMATS)
+def test_resume_after_interrupted_checkpoint_repeats_nothing(service, tmp_path, monkeypatch, fmt):
+    output = output_path(tmp_path, fmt)
+    approve_bookings(service.conn, 50)
+    write_checkpoint, calls = billing._write_checkpoint, []
+
+    def interrupted(*args): # The third chunk is written, then the run dies before checkpointing it
+        calls.append(args)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        write_checkpoint(*args)
+
+    monkeypatch.setattr(billing, "_write_checkpoint", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        billing.run_batch_billing(service.conn, output, fmt, chunk_size=10)
+    monkeypatch.setattr(billing, "_write_checkpoint", write_checkpoint)
+
+    billing.run_batch_billing(service.conn, output, fmt, resume=True, chunk_size=10)
+    assert billed_ids(output, fmt) == list(range(1, 51))
+
+def test_unknown_format_is_rejected(service, tmp_path):
+    assert service.run_batch_billing(str(tmp_path / "bills.tar"), "tar") is None
+
+def test_tax_rule_day_limits_are_cast():
+    rules = billing.load_tax_rules('[{"name": "Sales tax", "rate": "0.1"}, {"name": "Short stay", "rate": 0.05, "max_days": "2"}]')
+    assert rules[1].max_days == 2
+    assert billing.tax_rate_for(2, rules) == pytest.approx(0.15)
+    assert billing.tax_rate_for(3, rules) == pytest.approx(0.1)
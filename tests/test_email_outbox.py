@@ -0,0 +1,152 @@
+# OutboxWorker batching, per-message retries, backoff, lost sessions and batch claims, against a fake SMTP transport.
+import smtplib
+import threading
+import time
+
+import pytest
+
+from services.email_service import OutboxWorker, queue_email
+
+class FakeSMTP:
+    """Stand-in for an SMTP_SSL session: records what was sent and fails on request."""
+
+    def __init__(self, refuse=(), disconnect_at=None):
+        self.sent = []
+        self.refuse = set(refuse) # Recipients rejected one message at a time
+        self.disconnect_at = disconnect_at # Recipient whose send finds the session dropped
+        self.quit_called = False
+
+    def send_message(self, msg):
+        to_address = msg["To"]
+        if to_address == self.disconnect_at:
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        if to_address in self.refuse:
+            raise smtplib.SMTPRecipientsRefused({to_address: (550, b"No such user")})
+        self.sent.append(to_address)
+
+    def quit(self):
+        self.quit_called = True
+
+def make_worker(pool, sessions, **options):
+    # Worker whose every SMTP session comes from `sessions` (a list of FakeSMTP, used in order)
+    opened = []
+
+    def factory():
+        session = sessions[len(opened)]
+        opened.append(session)
+        return session
+
+    worker = OutboxWorker(pool, smtp_factory=factory, **options)
+    worker.opened = opened
+    return worker
+
+def queue(pool, *addresses):
+    with pool.connection() as conn:
+        ids = [queue_email(conn.cursor(), address, "Subject", "Body") for address in addresses]
+        conn.commit()
+    return ids
+
+def outbox(pool):
+    # {to_address: (status, attempts, next_attempt_at)}
+    with pool.connection() as conn:
+        return {row[0]: row[1:] for row in conn.execute(
+            "SELECT to_address, status, attempts, next_attempt_at FROM email_outbox")}
+
+def test_batches_share_one_session(pool):
+    queue(pool, *(f"user{n}@example.com" for n in range(5)))
+    sessions = [FakeSMTP() for _ in range(3)]
+    worker = make_worker(pool, sessions, batch_size=2)
+    assert [worker.drain_once() for _ in range(4)] == [2, 2, 1, 0]
+    assert len(worker.opened) == 3 # One session per batch, not per message
+    assert [len(session.sent) for session in sessions] == [2, 2, 1]
+    assert all(session.quit_called for session in sessions)
+    assert {status for status, _, _ in outbox(pool).values()} == {"sent"}
+    assert worker.stats["sent"] == 5 and worker.stats["batches"] == 3
+
+def test_refused_message_backs_off_then_fails(pool):
+    queue(pool, "good@example.com", "bad@example.com")
+    sessions = [FakeSMTP(refuse={"bad@example.com"}) for _ in range(3)]
+    worker = make_worker(pool, sessions, base_backoff=60, max_attempts=3)
+    started = time.time()
+    worker.drain_once()
+    rows = outbox(pool)
+    assert rows["good@example.com"][:2] == ("sent", 1)
+    status, attempts, next_attempt_at = rows["bad@example.com"]
+    assert (status, attempts) == ("pending", 1)
+    assert started + 60 <= next_attempt_at <= time.time() + 60
+    assert worker.drain_once() == 0 # Not due yet
+
+    delays = []
+    for _ in range(2):
+        with pool.connection() as conn:
+            conn.execute("UPDATE email_outbox SET next_attempt_at = 0 WHERE status = 'pending'")
+            conn.commit()
+        before = time.time()
+        worker.drain_once()
+        delays.append(outbox(pool)["bad@example.com"][2] - before)
+    assert delays[0] == pytest.approx(120, abs=5) # Doubled after the second attempt
+    assert outbox(pool)["bad@example.com"][:2] == ("failed", 3)
+    assert worker.stats == {"sent": 1, "retried": 2, "failed": 1, "batches": 3}
+
+def test_lost_session_retries_the_rest_of_the_batch_once(pool):
+    queue(pool, "a@example.com", "refused@example.com", "b@example.com", "drop@example.com", "c@example.com")
+    session = FakeSMTP(refuse={"refused@example.com"}, disconnect_at="drop@example.com")
+    worker = make_worker(pool, [session])
+    assert worker.drain_once() == 5
+    assert session.sent == ["a@example.com", "b@example.com"]
+    rows = outbox(pool)
+    assert {address for address, (status, _, _) in rows.items() if status == "pending"} == {
+        "refused@example.com", "drop@example.com", "c@example.com"}
+    assert all(attempts == 1 for _, attempts, _ in rows.values()) # Nobody counted twice
+    assert worker.stats["retried"] == 3 and worker.stats["sent"] == 2
+
+def test_connection_failure_retries_whole_batch(pool):
+    queue(pool, "a@example.com", "b@example.com")
+
+    def unreachable():
+        raise OSError("Connection refused")
+
+    worker = OutboxWorker(pool, smtp_factory=unreachable)
+    assert worker.drain_once() == 2
+    assert {row[:2] for row in outbox(pool).values()} == {("pending", 1)}
+    assert worker.stats["retried"] == 2
+
+class SlowSMTP(FakeSMTP):
+    # Gives a competing worker time to poll while this batch is still being sent
+    def send_message(self, msg):
+        time.sleep(0.002)
+        super().send_message(msg)
+
+def test_two_workers_never_send_the_same_message(pool):
+    addresses = [f"user{n}@example.com" for n in range(60)]
+    queue(pool, *addresses)
+    workers = [make_worker(pool, [SlowSMTP() for _ in range(60)], batch_size=5) for _ in range(2)]
+    start_gate = threading.Barrier(len(workers))
+
+    def drain(worker):
+        start_gate.wait()
+        while worker.drain_once():
+            pass
+
+    threads = [threading.Thread(target=drain, args=(worker,)) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    sent = [address for worker in workers for session in worker.opened for address in session.sent]
+    assert sorted(sent) == sorted(addresses) # Every message exactly once
+    assert all(worker.stats["sent"] for worker in workers) # Both workers really took part
+    assert {status for status, _, _ in outbox(pool).values()} == {"sent"}
+
+def test_expired_lease_is_taken_over(pool):
+    stuck, fresh = queue(pool, "stuck@example.com", "fresh@example.com")
+    with pool.connection() as conn: # One sender died after claiming, another claimed a moment ago
+        conn.execute("UPDATE email_outbox SET status = 'sending', next_attempt_at = ? WHERE id = ?", (time.time() - 1, stuck))
+        conn.execute("UPDATE email_outbox SET status = 'sending', next_attempt_at = ? WHERE id = ?", (time.time() + 300, fresh))
+        conn.commit()
+    session = FakeSMTP()
+    worker = make_worker(pool, [session])
+    assert worker.drain_once() == 1
+    assert session.sent == ["stuck@example.com"]
+    assert outbox(pool)["fresh@example.com"][0] == "sending" # Still leased to the other sender
@@ -0,0 +1,22 @@
+# A read that overlaps an invalidation must not put the row it read back into the cache.
+import threading
+
+from services.inventory_cache import InventoryCache
+
+def test_load_overlapping_invalidation_is_not_cached():
+    cache = InventoryCache()
+    loading, release = threading.Event(), threading.Event()
+
+    def slow_loader(): # Reads the row, then stalls while a writer commits and invalidates
+        loading.set()
+        release.wait(5)
+        return ("old row",)
+
+    reader = threading.Thread(target=cache.get_car, args=(1, slow_loader))
+    reader.start()
+    assert loading.wait(5)
+    cache.invalidate_car(1)
+    release.set()
+    reader.join(5)
+    assert cache.get_car(1, lambda: ("new row",)) == ("new row",)
+    assert cache.get_car(1, lambda: ("unused",)) == ("new row",) # A clean load is cached as before
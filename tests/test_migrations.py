@@ -0,0 +1,37 @@
+# Several processes starting on the same new database file must set it up exactly once.
+import sqlite3
+import threading
+
+import pytest
+
+from db_connection import initialize_database, SAMPLE_CARS, DEFAULT_USERS
+from migrations import SCHEMA_VERSION
+
+STARTERS = 4
+
+@pytest.mark.parametrize("attempt", range(5))
+def test_concurrent_first_starts_initialize_once(tmp_path, attempt):
+    # Threads with their own connections contend for SQLite's file lock exactly as processes do
+    db_path = str(tmp_path / "fresh.db")
+    start_gate = threading.Barrier(STARTERS)
+    errors = []
+
+    def starter():
+        start_gate.wait()
+        try:
+            initialize_database(db_path)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=starter) for _ in range(STARTERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+
+    assert errors == []
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM cars").fetchone()[0] == len(SAMPLE_CARS)
+    assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == len(DEFAULT_USERS)
+    conn.close()
@@ -0,0 +1,79 @@
+# Every query on the RentalService hot paths must be answered through an index. Each case runs a
+# service call with SQLite tracing on, then EXPLAINs the statements it ran (with their bound
+# values) and fails on a full table scan. Scanning an index is allowed: the availability load
+# reads the partial index of approved bookings, which holds only the rows it wants.
+import pytest
+
+def full_table_scans(conn, statements):
+    scans = []
+    for sql in statements:
+        if sql.lstrip().split(None, 1)[0].upper() not in ("SELECT", "UPDATE", "DELETE", "WITH"):
+            continue # Plain INSERT ... VALUES and transaction control have no plan to check
+        for row in conn.execute("EXPLAIN QUERY PLAN " + sql):
+            detail = row[3]
+            if detail.startswith("SCAN ") and "INDEX" not in detail:
+                scans.append(f"{detail}: {' '.join(sql.split())}")
+    return scans
+
+def traced(service, action):
+    statements = []
+    service.conn.set_trace_callback(statements.append)
+    try:
+        action(service)
+    finally:
+        service.conn.set_trace_callback(None)
+    assert statements, "the service call ran no SQL"
+    return statements
+
+@pytest.fixture
+def pending_booking(service):
+    return service.book_car("customer", 1, 3, "2030-01-01")
+
+@pytest.fixture
+def approved_booking(service, pending_booking):
+    assert service.manage_booking(pending_booking)
+    return pending_booking
+
+# name -> (service call, index its filtered query must use, or None when a primary key lookup is enough).
+# Naming the index matters for keyset pages: without it SQLite still "searches" rowid > ?, which
+# from the first page on reads every row.
+CASES = {
+    "cars first page": (lambda s, booking: s.list_cars_page(0), "idx_cars_available"),
+    "cars next page, filtered": (lambda s, booking: s.list_cars_page(3, make="Toyota", max_rate=100.0), "idx_cars_available"),
+    "all cars page": (lambda s, booking: s.list_cars_page(0, available_only=False), None),
+    "bookings first page": (lambda s, booking: s.list_bookings_page(0), None),
+    "bookings next page": (lambda s, booking: s.list_bookings_page(booking), None),
+    "customer bookings": (lambda s, booking: s.list_bookings_page(0, customer_name="customer"), "idx_bookings_customer"),
+    "pending bookings": (lambda s, booking: s.list_bookings_page(0, status="pending"), "idx_bookings_pending"),
+    "login": (lambda s, booking: s.login_user("customer", "cust123"), "sqlite_autoindex_users_1"),
+    "car by id": (lambda s, booking: s.get_car(1), None),
+    "book car": (lambda s, booking: s.book_car("customer", 2, 3, "2030-02-01"), None),
+    "availability load": (lambda s, booking: s.availability.load(s.conn.cursor()), "idx_bookings_approved_dates"),
+    "bill": (lambda s, booking: s.generate_bill(booking), None),
+}
+
+def plan_details(conn, statements):
+    return [row[3] for sql in statements if sql.lstrip().split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE", "WITH")
+            for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+
+@pytest.mark.parametrize("name", CASES)
+def test_query_uses_an_index(service, approved_booking, name):
+    action, index = CASES[name]
+    service.inventory.invalidate_all() # Cached reads would skip the queries under test
+    statements = traced(service, lambda s: action(s, approved_booking))
+    assert full_table_scans(service.conn, statements) == []
+    if index:
+        assert any(index in detail for detail in plan_details(service.conn, statements))
+
+@pytest.mark.parametrize("approve", [True, False], ids=["approve", "reject"])
+def test_approval_compare_and_set_uses_indexes(service, pending_booking, approve):
+    # The approval UPDATE checks for overlapping approved rentals in a correlated subquery
+    statements = traced(service, lambda s: s.manage_booking(pending_booking, approve=approve))
+    assert any(sql.lstrip().startswith("UPDATE bookings SET status") for sql in statements)
+    assert full_table_scans(service.conn, statements) == []
+    if approve:
+        assert any("idx_bookings_approved_dates" in detail for detail in plan_details(service.conn, statements))
+
+def test_scan_is_detected(service):
+    # Guard against the check silently passing: an unindexed filter must be reported
+    assert full_table_scans(service.conn, ["SELECT * FROM bookings WHERE total_fee > 10"])
@@ -0,0 +1,15 @@
+# Startup regression check: launching main.py on an already set-up database must reach the first
+# menu within the budget (CAR_RENTAL_STARTUP_BUDGET_MS, default 150 ms; raise it on slow machines).
+import os
+import statistics
+
+from benchmarks.bench_startup import measure, STARTUP_BUDGET_MS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_warm_start_within_budget():
+    cold, cold_report, warm, report = measure(ROOT, runs=5)
+    assert "database initialized" in cold_report # The first launch did the full setup...
+    assert "setup skipped" in report # ...and later launches only checked the fingerprint
+    median = statistics.median(warm) * 1000
+    assert median <= STARTUP_BUDGET_MS, f"warm start {median:.1f} ms is over the {STARTUP_BUDGET_MS:.0f} ms budget ({report})"